@@ -2,6 +2,8 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
+from .llm_cache import cache_llms
+from .scheduler import DagCrew
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
@@ -16,19 +18,23 @@ class Debate():
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
+    def __init__(self, verbose: bool = True):
+        # False for quiet batch runs
+        self.verbose = verbose
+
     
     @agent
     def debater(self) -> Agent:
         return Agent(
             config=self.agents_config['debater'], # type: ignore[index]
-            verbose=True
+            verbose=self.verbose
         )
 
     @agent
     def judge(self) -> Agent:
         return Agent(
             config=self.agents_config['judge'], # type: ignore[index]
-            verbose=True
+            verbose=self.verbose
         )
 
     # To learn more about structured task outputs,
@@ -60,10 +66,10 @@ class Debate():
         # To learn how to add knowledge sources to your crew, check out the documentation:
         # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
 
-        return Crew(
+        return cache_llms(DagCrew(
             agents=self.agents, # Automatically created by the @agent decorator
             tasks=self.tasks, # Automatically created by the @task decorator
             process=Process.sequential,
-            verbose=True,
+            verbose=self.verbose,
             # process=Process.hierarchical, # In case you wanna use that instead https://docs.crewai.com/how-to/Hierarchical/
-        )
+        ))
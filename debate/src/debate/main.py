@@ -1,9 +1,11 @@
 #!/usr/bin/env python
+import os
 import sys
 import warnings
 from dotenv import load_dotenv
 
 from datetime import datetime
+from functools import partial
 
 from debate.crew import Debate
 
@@ -20,7 +22,7 @@ def run():
     """
     inputs = {
         'motion': 'There needs to be strict laws to regulate LLMs',
-        
+        'output_dir': 'output'
     }
 
     try:
@@ -30,13 +32,36 @@ def run():
         raise Exception(f"An error occurred while running the crew: {e}")
 
 
+def tournament():
+    """
+    Run a debate for every motion in a file, several at a time.
+    Usage: tournament [motions_file] [output_dir]
+    """
+    from debate.tournament import new_crew, run_from_file
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'motions.txt'
+    output_root = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        'output', 'tournament', datetime.now().strftime('%Y%m%d-%H%M%S'))
+    verbose = os.getenv('DEBATE_VERBOSE', 'false').lower() == 'true'
+    try:
+        summary = run_from_file(path, output_root,
+                                max_concurrency=int(os.getenv('DEBATE_CONCURRENCY', '4')),
+                                timeout=float(os.getenv('DEBATE_TIMEOUT', '900')),
+                                make_crew=partial(new_crew, verbose=verbose))
+    except Exception as e:
+        raise Exception(f"An error occurred while running the tournament: {e}")
+    if summary['failed']:
+        sys.exit(1)
+
+
 def train():
     """
     Train the crew for a given number of iterations.
     """
     inputs = {
         "topic": "AI LLMs",
-        'current_year': str(datetime.now().year)
+        'current_year': str(datetime.now().year),
+        'output_dir': 'output'
     }
     try:
         Debate().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
@@ -60,7 +85,8 @@ def test():
     """
     inputs = {
         "topic": "AI LLMs",
-        "current_year": str(datetime.now().year)
+        "current_year": str(datetime.now().year),
+        "output_dir": "output"
     }
 
     try:
@@ -86,7 +112,8 @@ def run_with_trigger():
     inputs = {
         "crewai_trigger_payload": trigger_payload,
         "topic": "",
-        "current_year": ""
+        "current_year": "",
+        "output_dir": "output"
     }
 
     try:
@@ -0,0 +1,151 @@
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Set, Tuple
+
+from crewai import Crew, Task
+from crewai.crews.utils import check_conditional_skip
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.tasks.task_output import TaskOutput
+from crewai.utilities.constants import NOT_SPECIFIED
+from pydantic import Field
+
+# Dependency-graph scheduling for sequential crews.
+# A task depends on the tasks in its `context`; a task without a `context`
+# gets every earlier task's output (crewAI's sequential behaviour), so it
+# depends on all of them, and `context: []` makes a task independent.
+# Tasks writing the same output_file run in task order. Each task starts as
+# soon as its dependencies have finished, at most `max_parallel` at a time
+# (CREW_MAX_PARALLEL, default 4), so a run takes as long as its critical
+# path. Outputs, the crew's result and the files written are the same as in
+# a sequential run. This module is mirrored in every crew; engineering_team's
+# tests/test_mirrors.py checks that the copies match this one.
+
+
+def _default_max_parallel() -> int:
+    return int(os.getenv("CREW_MAX_PARALLEL", "4"))
+
+
+def task_dependencies(tasks: List[Task]) -> List[Set[int]]:
+    """
+    For each task, the indexes of the tasks that must finish before it starts.
+    """
+    index = {id(task): i for i, task in enumerate(tasks)}
+    dependencies = []
+    for i, task in enumerate(tasks):
+        if task.context is NOT_SPECIFIED or isinstance(task, ConditionalTask):
+            needs = set(range(i))
+        else:
+            needs = {index[id(context)] for context in task.context or [] if id(context) in index}
+        if task.output_file:
+            path = os.path.abspath(task.output_file)
+            needs |= {j for j in range(i) if tasks[j].output_file and os.path.abspath(tasks[j].output_file) == path}
+        dependencies.append(needs)
+    return dependencies
+
+
+def check_schedulable(tasks: List[Task], dependencies: List[Set[int]]) -> None:
+    """
+    Raises ValueError naming the tasks that can never start: their context
+    includes themselves, forms a cycle or waits on such a task.
+    """
+    ready: Set[int] = set()
+    while True:
+        startable = {i for i, needs in enumerate(dependencies) if i not in ready and needs <= ready}
+        if not startable:
+            break
+        ready |= startable
+    stuck = [tasks[i].name or tasks[i].description for i in range(len(tasks)) if i not in ready]
+    if stuck:
+        raise ValueError(f"These tasks cannot be scheduled, their context never finishes first: {', '.join(stuck)}")
+
+
+def critical_path(tasks: List[Task], durations: Dict[str, float]) -> float:
+    """
+    Length of the longest dependency chain, given each task's duration by name.
+    """
+    finish: List[float] = []
+    for i, needs in enumerate(task_dependencies(tasks)):
+        finish.append(max((finish[j] for j in needs), default=0.0) + durations.get(tasks[i].name, 0.0))
+    return max(finish, default=0.0)
+
+
+class DagCrew(Crew):
+    """
+    Crew whose sequential process runs independent tasks concurrently.
+    The hierarchical process is unchanged.
+    """
+    max_parallel: int = Field(default_factory=_default_max_parallel, ge=1,
+                              description="Maximum number of tasks running at once")
+
+    def _run_sequential_process(self):
+        return self._execute_dag()
+
+    def _start(self, task: Task, index: int, outputs: Dict[int, TaskOutput], busy: Set[int],
+               pool: ThreadPoolExecutor) -> Tuple[Future, int]:
+        agent = self._get_agent_to_use(task)
+        if agent is None:
+            raise ValueError(f"No agent available for task: {task.description}. "
+                             f"Ensure that either the task has an assigned agent or a manager agent is provided.")
+        if id(agent) in busy:
+            # An agent keeps per-task state, so a second concurrent task gets its own
+            # copy, made before the tools are prepared so that they belong to it.
+            crew = agent.crew
+            agent = agent.copy()
+            agent.crew = crew
+        busy.add(id(agent))
+        tools = self._prepare_tools(agent, task, task.tools or agent.tools or [])
+        self._log_task_start(task, agent.role)
+        context = self._get_context(task, [outputs[i] for i in sorted(outputs) if i < index])
+        future = pool.submit(contextvars.copy_context().run, task.execute_sync, agent, context, tools)
+        return future, id(agent)
+
+    def _execute_dag(self):
+        tasks = self.tasks
+        dependencies = task_dependencies(tasks)
+        check_schedulable(tasks, dependencies)
+        outputs: Dict[int, TaskOutput] = {}
+        pending = list(range(len(tasks)))
+        running: Dict[Future, Tuple[int, int]] = {}
+        busy: Set[int] = set()
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="task") as pool:
+            while True:
+                progressed = False
+                for index in [i for i in pending if dependencies[i] <= outputs.keys()]:
+                    if error is not None or len(running) >= self.max_parallel:
+                        break
+                    pending.remove(index)
+                    progressed = True
+                    task = tasks[index]
+                    if isinstance(task, ConditionalTask):
+                        previous = [outputs[i] for i in sorted(outputs)]
+                        skipped = check_conditional_skip(self, task, previous, index, False)
+                        if skipped:
+                            # Its dependents may be ready now
+                            outputs[index] = skipped
+                            continue
+                    future, agent_id = self._start(task, index, outputs, busy, pool)
+                    running[future] = (index, agent_id)
+                if not running:
+                    if progressed and error is None:
+                        continue
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda future: running[future][0]):
+                    index, agent_id = running.pop(future)
+                    busy.discard(agent_id)
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    outputs[index] = output
+                    self._process_task_result(tasks[index], output)
+                    self._store_execution_log(tasks[index], output, index)
+
+        if error is not None:
+            raise error
+        return self._create_crew_output([outputs[i] for i in sorted(outputs)])
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from crewai import Crew
+from pydantic import BaseModel
+
+from .crew import Debate
+
+# Tournament mode: many motions, each debated by its own crew, at most
+# `max_concurrency` debates at a time. Within a debate, propose and oppose
+# run concurrently, so up to twice that many LLM calls can be in flight.
+# Every debate writes propose.md, oppose.md and decide.md to its own
+# directory under the tournament's output directory, next to summary.json.
+
+
+class DebateResult(BaseModel):
+    """ The outcome of one debate in a tournament"""
+    index: int
+    motion: str
+    directory: str
+    seconds: float
+    decision: Optional[str] = None
+    total_tokens: int = 0
+    error: Optional[str] = None
+
+
+def new_crew(verbose: bool = True) -> Crew:
+    return Debate(verbose=verbose).crew()
+
+
+def read_motions(path: str) -> List[str]:
+    """
+    One motion per line; blank lines and lines starting with # are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        motions = [line.strip() for line in f]
+    return [motion for motion in motions if motion and not motion.startswith("#")]
+
+
+def debate_directory(output_root: str, index: int, motion: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", motion.lower()).strip("-")[:48].rstrip("-")
+    return os.path.join(output_root, f"{index:03d}-{slug or 'motion'}")
+
+
+def run_debate(motion: str, directory: str, make_crew: Callable[[], Crew] = new_crew):
+    os.makedirs(directory, exist_ok=True)
+    return make_crew().kickoff(inputs={"motion": motion, "output_dir": directory})
+
+
+async def run_tournament(motions: List[str], output_root: str, max_concurrency: int = 4, timeout: float = 900.0,
+                         make_crew: Callable[[], Crew] = new_crew) -> List[DebateResult]:
+    """
+    Debates every motion, at most `max_concurrency` at a time, and returns the
+    results in motion order. A debate that raises or takes longer than
+    `timeout` seconds is recorded with its error and the others carry on. A
+    timed-out debate is abandoned, not interrupted: it finishes in the background
+    and keeps its slot until then, so at most `max_concurrency` debates ever run.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="debate")
+    finished = 0
+
+    def release(job: asyncio.Future) -> None:
+        semaphore.release()
+        if not job.cancelled():
+            job.exception()  # retrieved here too, in case the debate timed out
+
+    async def debate(index: int, motion: str) -> DebateResult:
+        nonlocal finished
+        directory = debate_directory(output_root, index, motion)
+        await semaphore.acquire()
+        start = time.perf_counter()
+        job = loop.run_in_executor(executor, run_debate, motion, directory, make_crew)
+        # The slot is freed when the thread returns, not when the wait below gives up.
+        job.add_done_callback(release)
+        try:
+            output = await asyncio.wait_for(asyncio.shield(job), timeout)
+            result = DebateResult(index=index, motion=motion, directory=directory,
+                                  seconds=time.perf_counter() - start, decision=output.raw,
+                                  total_tokens=output.token_usage.total_tokens if output.token_usage else 0)
+        except Exception as e:
+            reason = f"timed out after {timeout:g}s" if isinstance(e, asyncio.TimeoutError) else repr(e)
+            result = DebateResult(index=index, motion=motion, directory=directory,
+                                  seconds=time.perf_counter() - start, error=reason)
+        finished += 1
+        status = f"failed: {result.error}" if result.error else "done"
+        print(f"[{finished}/{len(motions)}] {motion} - {status} in {result.seconds:.1f}s")
+        return result
+
+    try:
+        return list(await asyncio.gather(*(debate(i, motion) for i, motion in enumerate(motions, 1))))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile (q in 0..100) of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+
+def summarize(results: List[DebateResult], elapsed: float, max_concurrency: int) -> dict:
+    """
+    Throughput, per-debate latency percentiles (seconds) and token totals.
+    """
+    completed = [result for result in results if result.error is None]
+    latencies = [result.seconds for result in completed]
+    tokens = sum(result.total_tokens for result in completed)
+    return {
+        "debates": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "max_concurrency": max_concurrency,
+        "elapsed_seconds": elapsed,
+        "debates_per_minute": len(completed) / elapsed * 60 if elapsed else 0.0,
+        "latency_seconds": {
+            "mean": sum(latencies) / len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        } if latencies else None,
+        "total_tokens": tokens,
+        "tokens_per_debate": tokens / len(completed) if completed else 0.0,
+    }
+
+
+def print_summary(summary: dict) -> None:
+    print(f"\n{summary['completed']}/{summary['debates']} debates completed in {summary['elapsed_seconds']:.1f}s "
+          f"(concurrency {summary['max_concurrency']}): {summary['debates_per_minute']:.2f} debates/min")
+    latency = summary["latency_seconds"]
+    if latency:
+        print(f"latency per debate: mean {latency['mean']:.1f}s, p50 {latency['p50']:.1f}s, "
+              f"p95 {latency['p95']:.1f}s, max {latency['max']:.1f}s")
+    print(f"tokens: {summary['total_tokens']:,} total, {summary['tokens_per_debate']:,.0f} per debate")
+
+
+def run_from_file(path: str, output_root: str, max_concurrency: int = 4, timeout: float = 900.0,
+                  make_crew: Callable[[], Crew] = new_crew) -> dict:
+    """
+    Runs a tournament on a motions file and writes summary.json (statistics
+    and every debate's result) to the output directory. Returns the summary.
+    """
+    motions = read_motions(path)
+    if not motions:
+        raise ValueError(f"No motions in {path}")
+    os.makedirs(output_root, exist_ok=True)
+    start = time.perf_counter()
+    results = asyncio.run(run_tournament(motions, output_root, max_concurrency, timeout, make_crew))
+    summary = summarize(results, time.perf_counter() - start, max_concurrency)
+    with open(os.path.join(output_root, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump({**summary, "results": [result.model_dump() for result in results]}, f, indent=2)
+    print_summary(summary)
+    return summary
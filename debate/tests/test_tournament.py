@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from crewai.llms.base_llm import BaseLLM
+
+# The debate's agents are built with crewAI's default LLM before the test swaps it.
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+from debate.crew import Debate
+from debate.tournament import (debate_directory, new_crew, percentile, read_motions, run_debate, run_from_file,
+                               run_tournament)
+
+
+class FakeLLM(BaseLLM):
+    """
+    Offline LLM: each call takes `latency` seconds (`slow_latency` for motions
+    containing "filibuster"), motions containing "unwinnable" fail, and
+    overlapping calls are counted (copies share the counters).
+    """
+    def __init__(self, latency=0.2, slow_latency=1.0, **kwargs):
+        super().__init__(model="fake-model", **kwargs)
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.overlap = {"active": 0, "peak": 0}
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        prompt = messages if isinstance(messages, str) else "\n".join(str(m["content"]) for m in messages)
+        with self._lock:
+            self.overlap["active"] += 1
+            self.overlap["peak"] = max(self.overlap["peak"], self.overlap["active"])
+            self.prompts.append(prompt)
+        try:
+            time.sleep(self.slow_latency if "filibuster" in prompt else self.latency)
+            if "unwinnable" in prompt:
+                raise RuntimeError("provider unavailable")
+        finally:
+            with self._lock:
+                self.overlap["active"] -= 1
+        return f"Thought: I now know the final answer\nFinal Answer: {from_task.name} argument"
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 8192
+
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.llm = FakeLLM()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def make_crew(self):
+        crew = Debate(verbose=False).crew()
+        for agent in crew.agents:
+            agent.llm = self.llm
+            agent.max_retry_limit = 0
+        return crew
+
+    def test_propose_and_oppose_run_concurrently(self):
+        result = run_debate("Cats are better than dogs", "output", self.make_crew)
+        self.assertEqual(self.llm.overlap["peak"], 2)
+        self.assertEqual([output.name for output in result.tasks_output], ["propose", "oppose", "decide"])
+        judge_prompt = self.llm.prompts[-1]
+        self.assertIn("propose argument", judge_prompt)
+        self.assertIn("oppose argument", judge_prompt)
+        for name in ("propose", "oppose", "decide"):
+            with open(os.path.join("output", f"{name}.md")) as f:
+                self.assertEqual(f.read(), f"{name} argument")
+
+    def test_tournament_writes_each_debate_to_its_own_directory(self):
+        motions = ["Cats are better than dogs", "Tea beats coffee", "This motion is unwinnable", "Winter is best"]
+        with open("motions.txt", "w") as f:
+            f.write("# motions\n\n" + "\n".join(motions) + "\n")
+        self.assertEqual(read_motions("motions.txt"), motions)
+
+        root = os.path.join("output", "tournament")
+        start = time.perf_counter()
+        summary = run_from_file("motions.txt", root, max_concurrency=2, make_crew=self.make_crew)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual((summary["debates"], summary["completed"], summary["failed"]), (4, 3, 1))
+        # Two rounds of two debates, each two LLM rounds deep, instead of twelve calls in a row
+        self.assertLess(elapsed, 12 * self.llm.latency)
+        self.assertEqual(self.llm.overlap["peak"], 4)
+        self.assertGreater(summary["debates_per_minute"], 0)
+        self.assertLessEqual(summary["latency_seconds"]["p50"], summary["latency_seconds"]["max"])
+
+        for index, motion in enumerate(motions, 1):
+            directory = debate_directory(root, index, motion)
+            if "unwinnable" in motion:
+                continue
+            with open(os.path.join(directory, "decide.md")) as f:
+                self.assertEqual(f.read(), "decide argument")
+        with open(os.path.join(root, "summary.json")) as f:
+            results = json.load(f)["results"]
+        self.assertEqual([result["motion"] for result in results], motions)
+        self.assertIn("provider unavailable", results[2]["error"])
+
+    def test_concurrency_bound_holds(self):
+        motions = ["Cats are better than dogs", "Tea beats coffee", "Winter is best"]
+        results = asyncio.run(run_tournament(motions, "output", max_concurrency=1, make_crew=self.make_crew))
+        self.assertEqual([result.error for result in results], [None, None, None])
+        # One debate at a time, its propose and oppose side by side
+        self.assertEqual(self.llm.overlap["peak"], 2)
+
+    def test_timed_out_debate_keeps_its_slot_until_its_thread_returns(self):
+        self.llm.slow_latency = 1.5
+        motions = ["This motion is a filibuster", "Tea beats coffee"]
+        start = time.perf_counter()
+        results = asyncio.run(run_tournament(motions, "output", max_concurrency=1, timeout=1.0,
+                                             make_crew=self.make_crew))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(results[0].error, "timed out after 1s")
+        self.assertLess(results[0].seconds, self.llm.slow_latency)
+        self.assertIsNone(results[1].error)
+        # The second debate only started once the abandoned one let go of the single slot.
+        self.assertEqual(self.llm.overlap["peak"], 2)
+        self.assertGreaterEqual(elapsed, self.llm.slow_latency)
+
+    def test_verbose_is_passed_to_the_crew(self):
+        self.assertTrue(all(agent.verbose for agent in new_crew().agents))
+        quiet = new_crew(verbose=False)
+        self.assertFalse(quiet.verbose)
+        self.assertFalse(any(agent.verbose for agent in quiet.agents))
+        self.assertTrue(Debate().verbose)
+
+    def test_percentile(self):
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertEqual(percentile(values, 95), 5.0)
+        self.assertEqual(percentile(values, 40), 2.0)
+        self.assertEqual(percentile([7.0], 99), 7.0)
@@ -1,18 +1,27 @@
-
+import bisect
 import datetime
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+import threading
+import time
+from array import array
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import List, Dict, Deque, Optional, Iterator, Mapping, Union
+
+from price_provider import DEFAULT_PRICES, FunctionPriceProvider, PriceProvider
 
 def get_share_price(symbol: str) -> float:
-    prices = {
-        'AAPL': 150.0,
-        'TSLA': 200.0,
-        'GOOGL': 2800.0
-    }
-    return prices.get(symbol.upper(), 0.0)
+    """
+    A helper function to retrieve the current market price of a specific stock symbol.
+    """
+    return DEFAULT_PRICES.get(symbol.upper(), 0.0)
 
 @dataclass
 class Transaction:
+    """
+    Represents a single financial event (Deposit, Withdrawal, Buy, Sell).
+    """
     timestamp: datetime.datetime
     type: str
     amount: float
@@ -20,107 +29,1009 @@ class Transaction:
     quantity: Optional[int] = None
     price: Optional[float] = None
 
+# Transaction types are stored as small integer codes in the ledger.
+TRANSACTION_TYPES = ("DEPOSIT", "WITHDRAWAL", "BUY", "SELL")
+_TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+_DEPOSIT, _WITHDRAWAL, _BUY, _SELL = range(len(TRANSACTION_TYPES))
+
+_NO_SYMBOL = -1
+_NO_QUANTITY = 0
+_NO_PRICE = 0
+
+# Default spacing, in transactions, of the point-in-time checkpoint index.
+DEFAULT_CHECKPOINT_INTERVAL = 1024
+
+# Money and prices are held as integer minor units: value * 10 ** decimals.
+# They are rounded once on the way in and converted back to float on the way
+# out, so all arithmetic in between is exact.
+DEFAULT_MONEY_DECIMALS = 4
+
+# How sells are matched against open tax lots.
+COST_BASIS_METHODS = ("FIFO", "LIFO", "AVERAGE")
+
+# Largest amount, price or running total in minor units: the ledger and the
+# store keep them as int64.
+MAX_UNITS = 2 ** 63 - 1
+
+
+def to_units(value: float, decimals: int = DEFAULT_MONEY_DECIMALS) -> int:
+    """
+    Converts an amount or price to integer minor units (nearest unit).
+    """
+    return round(value * 10 ** decimals)
+
+
+def from_units(units: int, decimals: int = DEFAULT_MONEY_DECIMALS) -> float:
+    """
+    Converts integer minor units back to a float amount or price.
+    """
+    return units / 10 ** decimals
+
+
+_OUT_OF_RANGE = "Amount exceeds the supported range."
+
+
+def _check_range(*units: int) -> None:
+    """
+    Raises ValueError, before anything changes, if an amount or the total it
+    leads to would not fit the ledger's int64 columns.
+    """
+    if max(units) > MAX_UNITS:
+        raise ValueError(_OUT_OF_RANGE)
+
+
+def _datetime_to_ns(value: datetime.datetime) -> int:
+    seconds = int(value.timestamp())
+    return seconds * 1_000_000_000 + value.microsecond * 1_000
+
+
+def _ns_to_datetime(value: int) -> datetime.datetime:
+    seconds, ns = divmod(value, 1_000_000_000)
+    return datetime.datetime.fromtimestamp(seconds).replace(microsecond=ns // 1_000)
+
+
+class TransactionView(Sequence):
+    """
+    A lazy, sliceable, read-only window onto a TransactionLedger.
+    Transaction objects are only built when an element is accessed.
+    """
+    def __init__(self, ledger: "TransactionLedger", rows: range):
+        self._ledger = ledger
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Transaction, "TransactionView"]:
+        if isinstance(index, slice):
+            return TransactionView(self._ledger, self._rows[index])
+        return self._ledger._materialize(self._rows[index])
+
+    def __iter__(self) -> Iterator[Transaction]:
+        materialize = self._ledger._materialize
+        for row in self._rows:
+            yield materialize(row)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"TransactionView(rows={self._rows.start}..{self._rows.stop}, len={len(self)})"
+
+
+class TransactionLedger(TransactionView):
+    """
+    Append-only, column-oriented transaction store.
+    Each field lives in its own growable typed array (int64 nanosecond timestamps,
+    uint8 type codes, int64 amounts and prices in minor units, interned int32
+    symbol ids and int64 quantities), so a record costs a few dozen bytes instead
+    of a full object. record() and record_many() take minor units; Transaction
+    objects carry floats. Rows they stamp themselves never go back in time, even
+    if the clock does; rows given explicit (or restored) timestamps may.
+    """
+    def __init__(self, decimals: int = DEFAULT_MONEY_DECIMALS):
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self.timestamps = array("q")
+        self.types = array("B")
+        self.amounts = array("q")
+        self.symbol_ids = array("i")
+        self.quantities = array("q")
+        self.prices = array("q")
+        self.symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        # Rows [0, _ordered_rows) have been checked for decreasing timestamps.
+        self._ordered_rows = 0
+        self._first_late: Optional[int] = None
+
+    def __len__(self) -> int:
+        # prices is the last column written, so a row only counts once it is complete.
+        return len(self.prices)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Transaction, TransactionView]:
+        return self.view()[index]
+
+    def __iter__(self) -> Iterator[Transaction]:
+        return iter(self.view())
+
+    def __repr__(self) -> str:
+        return f"TransactionLedger(len={len(self)})"
+
+    def view(self) -> TransactionView:
+        """
+        Returns a lazy view over every transaction recorded so far.
+        """
+        return TransactionView(self, range(len(self)))
+
+    def symbol_id(self, symbol: str) -> int:
+        """
+        Returns the interned id for a symbol, assigning a new one if needed.
+        """
+        sid = self._symbol_index.get(symbol)
+        if sid is None:
+            sid = len(self.symbols)
+            self.symbols.append(symbol)
+            self._symbol_index[symbol] = sid
+        return sid
+
+    def record(self, type: str, amount: int, symbol: Optional[str] = None,
+               quantity: Optional[int] = None, price: Optional[int] = None,
+               timestamp_ns: Optional[int] = None) -> int:
+        """
+        Appends one transaction without building a Transaction object.
+        `amount` and `price` are in minor units. Returns the row index of the new entry.
+        The row is appended whole or not at all: a value that does not fit its
+        column raises (OverflowError for int64) and leaves the ledger unchanged.
+        """
+        code = _TYPE_CODES[type]
+        sid = _NO_SYMBOL if symbol is None else self.symbol_id(symbol)
+        start = len(self.prices)
+        timestamps = self.timestamps
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+            if timestamps and timestamp_ns < timestamps[-1]:
+                timestamp_ns = timestamps[-1]
+        try:
+            timestamps.append(timestamp_ns)
+            self.types.append(code)
+            self.amounts.append(amount)
+            self.symbol_ids.append(sid)
+            self.quantities.append(_NO_QUANTITY if quantity is None else quantity)
+            self.prices.append(_NO_PRICE if price is None else price)
+        except BaseException:
+            self._truncate(start)
+            raise
+        return start
+
+    def record_many(self, entries: Sequence[tuple], timestamp_ns: Optional[int] = None) -> int:
+        """
+        Appends several (type, amount, symbol, quantity, price) entries in one
+        operation, all sharing one timestamp. Returns the row index of the first entry.
+        Like record(), either every entry is appended or none is.
+        """
+        start = len(self.prices)
+        timestamp = timestamp_ns
+        if timestamp is None:
+            timestamp = time.time_ns()
+            if self.timestamps and timestamp < self.timestamps[-1]:
+                timestamp = self.timestamps[-1]
+        codes = [_TYPE_CODES[e[0]] for e in entries]
+        sids = [_NO_SYMBOL if e[2] is None else self.symbol_id(e[2]) for e in entries]
+        try:
+            self.timestamps.extend([timestamp] * len(entries))
+            self.types.extend(codes)
+            self.amounts.extend([e[1] for e in entries])
+            self.symbol_ids.extend(sids)
+            self.quantities.extend([_NO_QUANTITY if e[3] is None else e[3] for e in entries])
+            self.prices.extend([_NO_PRICE if e[4] is None else e[4] for e in entries])
+        except BaseException:
+            self._truncate(start)
+            raise
+        return start
+
+    def _truncate(self, rows: int) -> None:
+        # Drops a partly appended row or batch, so every column has `rows` entries again.
+        for column in (self.timestamps, self.types, self.amounts, self.symbol_ids, self.quantities,
+                       self.prices):
+            if len(column) > rows:
+                del column[rows:]
+        self._ordered_rows = min(self._ordered_rows, rows)
+        if self._first_late is not None and self._first_late >= rows:
+            self._first_late = None
+
+    def first_late_row(self) -> Optional[int]:
+        """
+        Index of the first row stamped earlier than the row before it, or None
+        while timestamps never decrease. Only rows added since the last call
+        are checked.
+        """
+        if self._first_late is None:
+            timestamps = self.timestamps
+            rows = len(self)
+            row = max(self._ordered_rows, 1)
+            while row < rows and timestamps[row] >= timestamps[row - 1]:
+                row += 1
+            self._ordered_rows = row
+            if row < rows:
+                self._first_late = row
+        return self._first_late
+
+    def append(self, tx: Transaction) -> None:
+        """
+        Appends an existing Transaction object (list-compatible API).
+        """
+        scale = self.scale
+        self.record(tx.type, round(tx.amount * scale), tx.symbol, tx.quantity,
+                    None if tx.price is None else round(tx.price * scale),
+                    timestamp_ns=_datetime_to_ns(tx.timestamp))
+
+    def _materialize(self, row: int) -> Transaction:
+        sid = self.symbol_ids[row]
+        quantity = self.quantities[row]
+        price = self.prices[row]
+        return Transaction(
+            timestamp=_ns_to_datetime(self.timestamps[row]),
+            type=TRANSACTION_TYPES[self.types[row]],
+            amount=self.amounts[row] / self.scale,
+            symbol=None if sid == _NO_SYMBOL else self.symbols[sid],
+            quantity=None if quantity == _NO_QUANTITY else quantity,
+            price=None if price == _NO_PRICE else price / self.scale
+        )
+
+
+@dataclass
+class Order:
+    """
+    A market order for Account.execute_batch(); `side` is "BUY" or "SELL".
+    """
+    side: str
+    symbol: str
+    quantity: int
+
+
+@dataclass
+class OrderResult:
+    """
+    Outcome of one order in a batch. `error` is None when the order was filled.
+    """
+    order: Order
+    filled: bool
+    price: Optional[float] = None
+    amount: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """
+    A consistent, read-only view of an account's state at one version.
+    `rows` is the number of ledger entries the state reflects. Money is kept
+    in minor units (`scale` per currency unit); the properties convert it.
+    """
+    version: int
+    balance_units: int
+    total_deposited_units: int
+    total_withdrawn_units: int
+    holdings: Mapping[str, int]
+    holdings_value_units: int
+    rows: int
+    scale: int = 10 ** DEFAULT_MONEY_DECIMALS
+
+    @property
+    def balance(self) -> float:
+        return self.balance_units / self.scale
+
+    @property
+    def total_deposited(self) -> float:
+        return self.total_deposited_units / self.scale
+
+    @property
+    def total_withdrawn(self) -> float:
+        return self.total_withdrawn_units / self.scale
+
+    @property
+    def holdings_value(self) -> float:
+        return self.holdings_value_units / self.scale
+
+    @property
+    def net_invested_units(self) -> int:
+        return self.total_deposited_units - self.total_withdrawn_units
+
+    @property
+    def net_invested(self) -> float:
+        return self.net_invested_units / self.scale
+
+
+@dataclass
+class PositionReport:
+    """
+    Cost basis and profit/loss of one symbol, from Account.get_position_report().
+    """
+    symbol: str
+    quantity: int
+    cost_basis: float
+    average_cost: float
+    price: float
+    market_value: float
+    unrealized_pnl: float
+    realized_pnl: float
+
+
+class TaxLots:
+    """
+    Open tax lots of one symbol, with running cost basis and realized P&L.
+    Sells consume lots oldest first (FIFO), newest first (LIFO), or at the
+    pooled average cost (AVERAGE). Every lot is added once and consumed at most
+    once, so trades cost amortized O(1). Prices and money are in minor units.
+    """
+    def __init__(self, method: str = "FIFO"):
+        self.method = method
+        self.lots: Deque[List[int]] = deque()  # [quantity, price], oldest first
+        self.quantity: int = 0
+        self.cost_basis: int = 0
+        self.realized_pnl: int = 0
+
+    def buy(self, quantity: int, price: int) -> None:
+        self.quantity += quantity
+        self.cost_basis += quantity * price
+        if self.method != "AVERAGE":
+            self.lots.append([quantity, price])
+
+    def sell(self, quantity: int, price: int) -> int:
+        """
+        Closes `quantity` shares at `price`. Returns the realized P&L.
+        """
+        if quantity > self.quantity:
+            raise ValueError("Insufficient holdings.")
+        if self.method == "AVERAGE":
+            # Rounded down to a minor unit; the remainder stays with the open shares.
+            cost = self.cost_basis * quantity // self.quantity
+        else:
+            fifo = self.method == "FIFO"
+            cost = 0
+            remaining = quantity
+            while remaining:
+                lot = self.lots[0] if fifo else self.lots[-1]
+                used = min(remaining, lot[0])
+                cost += used * lot[1]
+                remaining -= used
+                if used == lot[0]:
+                    if fifo:
+                        self.lots.popleft()
+                    else:
+                        self.lots.pop()
+                else:
+                    lot[0] -= used
+
+        self.quantity -= quantity
+        self.cost_basis -= cost
+        realized = quantity * price - cost
+        self.realized_pnl += realized
+        return realized
+
+
+@dataclass
+class _Checkpoint:
+    """
+    Account state after the first `rows` ledger entries, in minor units.
+    `marks` holds the last traded price of each symbol up to that point.
+    """
+    rows: int
+    balance: int = 0
+    total_deposited: int = 0
+    total_withdrawn: int = 0
+    holdings: Dict[str, int] = field(default_factory=dict)
+    marks: Dict[str, int] = field(default_factory=dict)
+
+    def copy(self) -> "_Checkpoint":
+        return _Checkpoint(self.rows, self.balance, self.total_deposited, self.total_withdrawn,
+                           dict(self.holdings), dict(self.marks))
+
+    def replay(self, ledger: "TransactionLedger", stop: int, until: Optional[int] = None) -> None:
+        """
+        Applies ledger rows [rows, stop) to this state in place; with `until`,
+        only the rows stamped at or before it.
+        """
+        types, amounts, symbol_ids = ledger.types, ledger.amounts, ledger.symbol_ids
+        quantities, prices, symbols = ledger.quantities, ledger.prices, ledger.symbols
+        timestamps = ledger.timestamps
+        holdings, marks = self.holdings, self.marks
+        for row in range(self.rows, stop):
+            if until is not None and timestamps[row] > until:
+                continue
+            code = types[row]
+            amount = amounts[row]
+            self.balance += amount
+            if code == _DEPOSIT:
+                self.total_deposited += amount
+            elif code == _WITHDRAWAL:
+                self.total_withdrawn -= amount
+            else:
+                symbol = symbols[symbol_ids[row]]
+                quantity = quantities[row] if code == _BUY else -quantities[row]
+                quantity += holdings.get(symbol, 0)
+                if quantity:
+                    holdings[symbol] = quantity
+                else:
+                    del holdings[symbol]
+                marks[symbol] = prices[row]
+        self.rows = stop
+
+
 class Account:
-    def __init__(self):
-        self.balance: float = 0.0
+    """
+    The core class managing user funds and portfolio state.
+    Money and prices are kept as integer minor units (`money_decimals` decimal
+    places) and exposed as floats: amounts and prices are rounded to a minor
+    unit once when they come in, and everything derived from them is exact.
+    """
+    def __init__(self, price_provider: Optional[PriceProvider] = None,
+                 incremental_valuation: bool = False, verify_valuation: bool = False,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+                 cost_basis_method: str = "FIFO", money_decimals: int = DEFAULT_MONEY_DECIMALS):
+        if cost_basis_method not in COST_BASIS_METHODS:
+            raise ValueError(f"cost_basis_method must be one of {COST_BASIS_METHODS}.")
+        if not 0 <= money_decimals <= 9:
+            raise ValueError("money_decimals must be between 0 and 9.")
+        # Resolve get_share_price at call time so it can be swapped out (e.g. in tests).
+        self.price_provider: PriceProvider = price_provider or FunctionPriceProvider(
+            lambda symbol: get_share_price(symbol))
+        self.money_decimals = money_decimals
+        self.scale = 10 ** money_decimals
+        self.balance_units: int = 0
         self.holdings: Dict[str, int] = {}
-        self.transactions: List[Transaction] = []
-        self.total_deposited: float = 0.0
-        self.total_withdrawn: float = 0.0
+        self.transactions: TransactionLedger = TransactionLedger(money_decimals)
+        self.total_deposited_units: int = 0
+        self.total_withdrawn_units: int = 0
+
+        # Mark-to-market state: last known price per held symbol and the running
+        # value of all holdings at those prices, updated in O(1) per trade or tick.
+        self.incremental_valuation = incremental_valuation
+        self.verify_valuation = verify_valuation
+        self.marks: Dict[str, int] = {}
+        self._holdings_value: int = 0
+        if incremental_valuation:
+            self.price_provider.subscribe(self.on_price_tick)
+
+        # Point-in-time index: checkpoints[i] is the state after i * checkpoint_interval rows.
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoints: List[_Checkpoint] = [_Checkpoint(rows=0)]
+
+        # Tax lots per symbol ever traded, with the realized P&L of all closed lots.
+        self.cost_basis_method = cost_basis_method
+        self.positions: Dict[str, TaxLots] = {}
+        self.realized_pnl_units: int = 0
+
+    @property
+    def balance(self) -> float:
+        return self.balance_units / self.scale
+
+    @property
+    def total_deposited(self) -> float:
+        return self.total_deposited_units / self.scale
+
+    @property
+    def total_withdrawn(self) -> float:
+        return self.total_withdrawn_units / self.scale
+
+    @property
+    def realized_pnl(self) -> float:
+        return self.realized_pnl_units / self.scale
 
     def deposit(self, amount: float) -> None:
-        if amount <= 0:
+        """
+        Adds funds to the balance.
+        """
+        units = round(amount * self.scale)
+        if units <= 0:
             raise ValueError("Deposit amount must be positive.")
-        
-        self.balance += amount
-        self.total_deposited += amount
-        
-        tx = Transaction(
-            timestamp=datetime.datetime.now(),
-            type="DEPOSIT",
-            amount=amount
-        )
-        self.transactions.append(tx)
+        _check_range(self.balance_units + units, self.total_deposited_units + units)
+
+        self._record("DEPOSIT", units)
+        self.balance_units += units
+        self.total_deposited_units += units
 
     def withdraw(self, amount: float) -> None:
-        if amount <= 0:
+        """
+        Subtracts funds from the balance.
+        """
+        units = round(amount * self.scale)
+        if units <= 0:
             raise ValueError("Withdrawal amount must be positive.")
-        if amount > self.balance:
+        if units > self.balance_units:
             raise ValueError("Insufficient funds.")
-            
-        self.balance -= amount
-        self.total_withdrawn += amount
-        
-        tx = Transaction(
-            timestamp=datetime.datetime.now(),
-            type="WITHDRAWAL",
-            amount=-amount
-        )
-        self.transactions.append(tx)
+        _check_range(self.total_withdrawn_units + units)
+
+        self._record("WITHDRAWAL", -units)
+        self.balance_units -= units
+        self.total_withdrawn_units += units
 
     def buy(self, symbol: str, quantity: int) -> None:
+        """
+        Buys shares of a stock.
+        """
         if quantity <= 0:
             raise ValueError("Quantity must be positive.")
             
-        price = get_share_price(symbol)
-        if price <= 0.0:
+        price = self.price_provider.get_share_price(symbol)
+        self._buy_at(symbol, quantity, round(price * self.scale))
+
+    def _buy_at(self, symbol: str, quantity: int, price: int) -> None:
+        if price <= 0:
             raise ValueError(f"Invalid symbol '{symbol}' or price unavailable.")
 
         cost = price * quantity
-        if cost > self.balance:
+        if cost > self.balance_units:
             raise ValueError("Insufficient funds.")
-            
-        self.balance -= cost
-        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
-        
-        tx = Transaction(
-            timestamp=datetime.datetime.now(),
-            type="BUY",
-            amount=-cost,
-            symbol=symbol,
-            quantity=quantity,
-            price=price
-        )
-        self.transactions.append(tx)
+
+        self._record("BUY", -cost, symbol, quantity, price)
+        current_holding = self.holdings.get(symbol, 0)
+        self.balance_units -= cost
+        self.holdings[symbol] = current_holding + quantity
+        self._remark(symbol, current_holding, current_holding + quantity, price)
+        self._update_lots(_BUY, symbol, quantity, price)
 
     def sell(self, symbol: str, quantity: int) -> None:
+        """
+        Sells shares of a stock.
+        """
         if quantity <= 0:
             raise ValueError("Quantity must be positive.")
             
+        price = self.price_provider.get_share_price(symbol)
+        self._sell_at(symbol, quantity, round(price * self.scale))
+
+    def _sell_at(self, symbol: str, quantity: int, price: int) -> None:
         current_holding = self.holdings.get(symbol, 0)
         if current_holding < quantity:
             raise ValueError("Insufficient holdings.")
             
-        price = get_share_price(symbol)
         revenue = price * quantity
-        
-        self.balance += revenue
+        _check_range(price, self.balance_units + revenue)
+
+        self._record("SELL", revenue, symbol, quantity, price)
+        self.balance_units += revenue
         self.holdings[symbol] = current_holding - quantity
         if self.holdings[symbol] == 0:
             del self.holdings[symbol]
-            
-        tx = Transaction(
-            timestamp=datetime.datetime.now(),
-            type="SELL",
-            amount=revenue,
-            symbol=symbol,
-            quantity=quantity,
-            price=price
-        )
-        self.transactions.append(tx)
+        self._remark(symbol, current_holding, current_holding - quantity, price)
+        self._update_lots(_SELL, symbol, quantity, price)
+
+    def execute_batch(self, orders: Sequence[Order], atomic: bool = True,
+                      prices: Optional[Dict[str, float]] = None) -> List[OrderResult]:
+        """
+        Executes many market orders at once.
+        All prices are fetched in one bulk call (unless given as `prices`) and
+        every order is validated against the projected balance and holdings,
+        with sells settling before buys. If `atomic`, any rejected order rejects
+        the whole batch and nothing changes; otherwise valid orders are filled
+        and invalid ones skipped. The new state is published in one step and
+        the ledger entries appended together. Returns one OrderResult per order,
+        in the original order.
+        """
+        if prices is None:
+            prices = self.price_provider.get_share_prices({order.symbol for order in orders})
+        return self._execute_batch_at(orders, prices, atomic)
+
+    def _execute_batch_at(self, orders: Sequence[Order], prices: Dict[str, float],
+                          atomic: bool) -> List[OrderResult]:
+        scale = self.scale
+        results: List[Optional[OrderResult]] = [None] * len(orders)
+        balance = self.balance_units
+        holdings = dict(self.holdings)
+        fills = []
+
+        sequence = sorted(range(len(orders)), key=lambda i: orders[i].side != "SELL")
+        for i in sequence:
+            order = orders[i]
+            price = round(prices[order.symbol] * scale)
+            current_holding = holdings.get(order.symbol, 0)
+            error = None
+            if order.side not in ("BUY", "SELL"):
+                error = f"Unknown order side '{order.side}'."
+            elif order.quantity <= 0:
+                error = "Quantity must be positive."
+            elif order.side == "SELL" and current_holding < order.quantity:
+                error = "Insufficient holdings."
+            elif order.side == "BUY" and price <= 0:
+                error = f"Invalid symbol '{order.symbol}' or price unavailable."
+            elif order.side == "BUY" and price * order.quantity > balance:
+                error = "Insufficient funds."
+            elif order.side == "SELL" and max(price, balance + price * order.quantity) > MAX_UNITS:
+                error = _OUT_OF_RANGE
+            if error is not None:
+                results[i] = OrderResult(order, False, price / scale, error=error)
+                if atomic:
+                    break
+                continue
+
+            if order.side == "BUY":
+                amount = -price * order.quantity
+                new_holding = current_holding + order.quantity
+            else:
+                amount = price * order.quantity
+                new_holding = current_holding - order.quantity
+            balance += amount
+            if new_holding:
+                holdings[order.symbol] = new_holding
+            else:
+                del holdings[order.symbol]
+            fills.append((order, price, amount, current_holding, new_holding))
+            results[i] = OrderResult(order, True, price / scale, amount / scale)
+
+        if atomic and len(fills) != len(orders):
+            reason = next(r.error for r in results if r is not None and not r.filled)
+            return [r if r is not None and not r.filled else
+                    OrderResult(order, False, error=f"Batch rejected: {reason}")
+                    for order, r in zip(orders, results)]
+
+        if fills:
+            self.balance_units = balance
+            self.holdings = holdings
+            for order, price, _, old_holding, new_holding in fills:
+                self._remark(order.symbol, old_holding, new_holding, price)
+                self._update_lots(_TYPE_CODES[order.side], order.symbol, order.quantity, price)
+            self.transactions.record_many([(order.side, amount, order.symbol, order.quantity, price)
+                                           for order, price, amount, _, _ in fills])
+            rows = len(self.transactions)
+            if rows - self._checkpoints[-1].rows >= self.checkpoint_interval:
+                self._extend_checkpoints(rows)
+        return results
+
+    def _record(self, type: str, amount: int, symbol: Optional[str] = None,
+                quantity: Optional[int] = None, price: Optional[int] = None) -> None:
+        rows = self.transactions.record(type, amount, symbol, quantity, price) + 1
+        if rows - self._checkpoints[-1].rows >= self.checkpoint_interval:
+            self._extend_checkpoints(rows)
+
+    def _extend_checkpoints(self, rows: int) -> None:
+        # Each new checkpoint replays one interval from the previous one: amortized O(1) per row.
+        interval = self.checkpoint_interval
+        while self._checkpoints[-1].rows + interval <= rows:
+            checkpoint = self._checkpoints[-1].copy()
+            checkpoint.replay(self.transactions, checkpoint.rows + interval)
+            self._checkpoints.append(checkpoint)
+
+    def _remark(self, symbol: str, old_quantity: int, new_quantity: int, price: int) -> None:
+        # Integer arithmetic: the running value never drifts from a full recompute.
+        self._holdings_value += new_quantity * price - old_quantity * self.marks.get(symbol, 0)
+        if new_quantity:
+            self.marks[symbol] = price
+        else:
+            self.marks.pop(symbol, None)
+
+    def _recompute_holdings_value(self) -> int:
+        return sum(quantity * self.marks[symbol] for symbol, quantity in self.holdings.items())
+
+    def _update_lots(self, code: int, symbol: str, quantity: int, price: int) -> None:
+        lots = self.positions.get(symbol)
+        if lots is None:
+            lots = self.positions[symbol] = TaxLots(self.cost_basis_method)
+        if code == _BUY:
+            lots.buy(quantity, price)
+        else:
+            self.realized_pnl_units += lots.sell(quantity, price)
+
+    def rebuild_positions(self, start: int = 0) -> None:
+        """
+        Folds the trades from ledger row `start` on into the tax lots, e.g.
+        after the ledger was restored from disk. With `start` 0 the lots are
+        rebuilt from scratch; otherwise they must already hold the earlier rows.
+        """
+        if not start:
+            self.positions = {}
+            self.realized_pnl_units = 0
+        ledger = self.transactions
+        symbols = ledger.symbols
+        for code, sid, quantity, price in zip(ledger.types[start:], ledger.symbol_ids[start:],
+                                              ledger.quantities[start:], ledger.prices[start:]):
+            if code == _BUY or code == _SELL:
+                self._update_lots(code, symbols[sid], quantity, price)
+
+    def on_price_tick(self, symbol: str, price: float) -> None:
+        """
+        Re-marks a held position to a new price in O(1).
+        Ticks for symbols the account does not hold are ignored.
+        """
+        quantity = self.holdings.get(symbol)
+        if quantity:
+            self._remark(symbol, quantity, quantity, round(price * self.scale))
+
+    def mark_to_market(self, prices: Optional[Dict[str, float]] = None) -> None:
+        """
+        Re-marks every holding from scratch, e.g. after state was restored.
+        Prices default to a bulk lookup from the price provider.
+        """
+        if prices is None:
+            prices = self.price_provider.get_share_prices(list(self.holdings))
+        scale = self.scale
+        self.marks = {symbol: round(prices[symbol] * scale) for symbol in self.holdings}
+        self._holdings_value = self._recompute_holdings_value()
+
+    def get_holdings_value(self) -> float:
+        """
+        Returns the value of all holdings at their last marked prices.
+        With verify_valuation set, the running total is checked against a full recompute.
+        """
+        if self.verify_valuation:
+            self._verify_valuation()
+        return self._holdings_value / self.scale
+
+    def _verify_valuation(self) -> None:
+        expected = self._recompute_holdings_value()
+        if self._holdings_value != expected:
+            raise AssertionError(
+                f"Incremental holdings value {self._holdings_value!r} != recomputed {expected!r}")
+
+    def _portfolio_value_units(self) -> int:
+        if self.incremental_valuation:
+            if self.verify_valuation:
+                self._verify_valuation()
+            return self.balance_units + self._holdings_value
+        scale = self.scale
+        prices = self.price_provider.get_share_prices(list(self.holdings))
+        return self.balance_units + sum(quantity * round(prices[symbol] * scale)
+                                        for symbol, quantity in self.holdings.items())
 
     def get_portfolio_value(self) -> float:
-        holdings_value = 0.0
-        for symbol, quantity in self.holdings.items():
-            holdings_value += quantity * get_share_price(symbol)
-        return self.balance + holdings_value
+        """
+        Calculates the total liquid value of the account.
+        """
+        if self.incremental_valuation and not self.verify_valuation:
+            return (self.balance_units + self._holdings_value) / self.scale
+        return self._portfolio_value_units() / self.scale
 
     def get_profit_loss(self) -> float:
-        net_invested = self.total_deposited - self.total_withdrawn
-        return self.get_portfolio_value() - net_invested
+        """
+        Calculates performance relative to actual cash invested.
+        """
+        net_invested = self.total_deposited_units - self.total_withdrawn_units
+        if self.incremental_valuation and not self.verify_valuation:
+            return (self.balance_units + self._holdings_value - net_invested) / self.scale
+        return (self._portfolio_value_units() - net_invested) / self.scale
 
     def get_holdings(self) -> dict:
+        """
+        Returns the current state of the share portfolio.
+        """
         return self.holdings
 
-    def get_transaction_history(self) -> list:
-        return self.transactions
+    def get_position_report(self, prices: Optional[Dict[str, float]] = None) -> Dict[str, PositionReport]:
+        """
+        Returns cost basis and realized/unrealized P&L for every symbol traded,
+        in O(symbols). Open positions are valued at `prices` if given, otherwise
+        at a bulk lookup from the price provider.
+        """
+        if prices is None:
+            prices = self.price_provider.get_share_prices(
+                [symbol for symbol, lots in self.positions.items() if lots.quantity])
+        return self._position_report(prices)
+
+    def _position_report(self, prices: Dict[str, float]) -> Dict[str, PositionReport]:
+        scale = self.scale
+        report = {}
+        for symbol, lots in self.positions.items():
+            price = round(prices.get(symbol, 0.0) * scale) if lots.quantity else 0
+            market_value = lots.quantity * price
+            report[symbol] = PositionReport(
+                symbol=symbol,
+                quantity=lots.quantity,
+                cost_basis=lots.cost_basis / scale,
+                average_cost=lots.cost_basis / lots.quantity / scale if lots.quantity else 0.0,
+                price=price / scale,
+                market_value=market_value / scale,
+                unrealized_pnl=(market_value - lots.cost_basis) / scale,
+                realized_pnl=lots.realized_pnl / scale,
+            )
+        return report
+
+    def snapshot(self) -> "AccountSnapshot":
+        """
+        Returns an immutable copy of the balance, totals and holdings.
+        """
+        return AccountSnapshot(
+            version=len(self.transactions),
+            balance_units=self.balance_units,
+            total_deposited_units=self.total_deposited_units,
+            total_withdrawn_units=self.total_withdrawn_units,
+            holdings=MappingProxyType(dict(self.holdings)),
+            holdings_value_units=self._holdings_value,
+            rows=len(self.transactions),
+            scale=self.scale,
+        )
+
+    def _state_at(self, timestamp: Union[datetime.datetime, int]) -> _Checkpoint:
+        """
+        Rebuilds the state as of `timestamp` (a datetime or epoch nanoseconds) from
+        the nearest checkpoint: O(log n) to locate it plus O(k) replayed rows.
+        Rows from the ledger's first late row on (explicitly stamped or imported
+        out of order) are not sorted, so they are all replayed, skipping the
+        ones stamped after `timestamp`.
+        """
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = _datetime_to_ns(timestamp)
+        ledger = self.transactions
+        late = ledger.first_late_row()
+        sorted_rows = len(ledger) if late is None else late
+        rows = bisect.bisect_right(ledger.timestamps, timestamp, 0, sorted_rows)
+
+        # The ledger may have been filled without going through _record (e.g. restored).
+        self._extend_checkpoints(rows)
+
+        state = self._checkpoints[rows // self.checkpoint_interval].copy()
+        state.replay(ledger, rows)
+        if late is not None:
+            # Rows [rows, late) are stamped after `timestamp`: the prefix is sorted.
+            state.rows = late
+            state.replay(ledger, len(ledger), until=timestamp)
+        return state
+
+    def get_holdings_at(self, timestamp: Union[datetime.datetime, int]) -> Dict[str, int]:
+        """
+        Returns the share portfolio as it was at the given point in time.
+        """
+        return self._state_at(timestamp).holdings
+
+    def get_profit_loss_at(self, timestamp: Union[datetime.datetime, int],
+                           prices: Optional[Dict[str, float]] = None) -> float:
+        """
+        Calculates profit/loss at the given point in time. Holdings are valued at
+        `prices` if given, otherwise at each symbol's last traded price up to then.
+        """
+        state = self._state_at(timestamp)
+        scale = self.scale
+        marks = state.marks if prices is None else {symbol: round(prices[symbol] * scale)
+                                                    for symbol in state.holdings}
+        holdings_value = sum(quantity * marks[symbol] for symbol, quantity in state.holdings.items())
+        net_invested = state.total_deposited - state.total_withdrawn
+        return (state.balance + holdings_value - net_invested) / scale
+
+    def get_transaction_history(self) -> TransactionView:
+        """
+        Returns a lazy, sliceable view of all transactions recorded.
+        """
+        return self.transactions.view()
+
+
+class ConcurrentAccount(Account):
+    """
+    An Account that is safe to share between threads.
+    Mutations run under a lock in short critical sections (price lookups happen
+    before the lock is taken), and each one publishes a new immutable
+    AccountSnapshot. Readers use the latest snapshot without taking the lock,
+    so they always see a consistent balance and holdings and never block writers.
+    With verify_valuation set, valuation reads take the lock to run the check.
+    """
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(threading.Lock())
+        super().__init__(*args, **kwargs)
+        self._snapshot = replace(super().snapshot(), version=0)
+
+    def _publish(self) -> None:
+        # Versions count publications, so price ticks produce new versions too.
+        snapshot = replace(super().snapshot(), version=self._snapshot.version + 1)
+        with self._changed:
+            self._snapshot = snapshot
+            self._changed.notify_all()
+
+    def wait_for_change(self, version: Optional[int], timeout: Optional[float] = None) -> AccountSnapshot:
+        """
+        Blocks until a snapshot newer than `version` is published (or the timeout
+        expires) and returns the latest snapshot.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._snapshot.version != version, timeout)
+            return self._snapshot
+
+    def deposit(self, amount: float) -> None:
+        with self._lock:
+            super().deposit(amount)
+            self._publish()
+
+    def withdraw(self, amount: float) -> None:
+        with self._lock:
+            super().withdraw(amount)
+            self._publish()
+
+    def buy(self, symbol: str, quantity: int) -> None:
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        price = round(self.price_provider.get_share_price(symbol) * self.scale)
+        with self._lock:
+            self._buy_at(symbol, quantity, price)
+            self._publish()
+
+    def sell(self, symbol: str, quantity: int) -> None:
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        price = round(self.price_provider.get_share_price(symbol) * self.scale)
+        with self._lock:
+            self._sell_at(symbol, quantity, price)
+            self._publish()
+
+    def execute_batch(self, orders: Sequence[Order], atomic: bool = True,
+                      prices: Optional[Dict[str, float]] = None) -> List[OrderResult]:
+        if prices is None:
+            prices = self.price_provider.get_share_prices({order.symbol for order in orders})
+        with self._lock:
+            results = self._execute_batch_at(orders, prices, atomic)
+            self._publish()
+        return results
+
+    def on_price_tick(self, symbol: str, price: float) -> None:
+        with self._lock:
+            super().on_price_tick(symbol, price)
+            self._publish()
+
+    def mark_to_market(self, prices: Optional[Dict[str, float]] = None) -> None:
+        if prices is None:
+            prices = self.price_provider.get_share_prices(list(self._snapshot.holdings))
+        with self._lock:
+            missing = [symbol for symbol in self.holdings if symbol not in prices]
+            if missing:
+                # Bought since the lookup, or restored but not yet published.
+                prices = {**prices, **self.price_provider.get_share_prices(missing)}
+            super().mark_to_market(prices)
+            self._publish()
+
+    def _state_at(self, timestamp: Union[datetime.datetime, int]) -> _Checkpoint:
+        with self._lock:
+            return super()._state_at(timestamp)
+
+    def rebuild_positions(self, start: int = 0) -> None:
+        with self._lock:
+            super().rebuild_positions(start)
+
+    def get_position_report(self, prices: Optional[Dict[str, float]] = None) -> Dict[str, PositionReport]:
+        if prices is None:
+            prices = self.price_provider.get_share_prices(list(self._snapshot.holdings))
+        with self._lock:
+            missing = [symbol for symbol in self.holdings if symbol not in prices]
+            if missing:
+                prices = {**prices, **self.price_provider.get_share_prices(missing)}
+            return self._position_report(prices)
+
+    def snapshot(self) -> AccountSnapshot:
+        """
+        Returns the latest published state without locking.
+        """
+        return self._snapshot
+
+    def _valued_snapshot(self) -> AccountSnapshot:
+        """
+        Returns the latest snapshot. With verify_valuation set, it is taken under
+        the lock, where it matches the live state, once the running holdings
+        value has been checked against a full recompute.
+        """
+        if not self.verify_valuation:
+            return self._snapshot
+        with self._lock:
+            self._verify_valuation()
+            return self._snapshot
+
+    def get_holdings_value(self) -> float:
+        return self._valued_snapshot().holdings_value
+
+    def _portfolio_value(self, snapshot: AccountSnapshot) -> int:
+        if self.incremental_valuation:
+            return snapshot.balance_units + snapshot.holdings_value_units
+        scale = self.scale
+        prices = self.price_provider.get_share_prices(list(snapshot.holdings))
+        return snapshot.balance_units + sum(quantity * round(prices[symbol] * scale)
+                                            for symbol, quantity in snapshot.holdings.items())
+
+    def get_portfolio_value(self) -> float:
+        return self._portfolio_value(self._valued_snapshot()) / self.scale
+
+    def get_profit_loss(self) -> float:
+        snapshot = self._valued_snapshot()
+        return (self._portfolio_value(snapshot) - snapshot.net_invested_units) / self.scale
+
+    def get_holdings(self) -> Mapping[str, int]:
+        return self._snapshot.holdings
+
+    def get_transaction_history(self) -> TransactionView:
+        return TransactionView(self.transactions, range(self._snapshot.rows))
@@ -0,0 +1,340 @@
+"""
+Benchmark suite for the accounts hot paths and the app's handlers:
+deposit/buy/sell throughput, get_portfolio_value latency against the number
+of holdings, memory per transaction, and get_dashboard_data /
+get_transaction_log as the history grows. Every timing is the median of
+`--repeat` runs, recorded with its spread. Results are written as JSON and
+compared with a stored baseline taken with the same --ops, --repeat and
+--sizes (a baseline taken otherwise is refused, exit status 2); any metric
+worse than the baseline by more than its threshold, widened to stay above
+the measured spread, is reported and the exit status is 1.
+
+    python benchmarks/bench_accounts.py [--sizes 1e3,1e4,1e5,1e6] [--ops N]
+        [--output results.json] [--baseline benchmarks/baseline.json]
+        [--threshold FRACTION] [--update-baseline]
+
+Everything runs offline: prices come from the stub provider and handler
+sessions are stored in a temporary directory. Sizes up to 1e7 work, but the
+formatted history of a 1e7-row session needs about 5 GB of memory.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "output"))
+
+from accounts import Account, ConcurrentAccount, Order, _BUY, _DEPOSIT, _SELL
+from persistence import RECORD_DTYPE, _apply_records
+from price_provider import DEFAULT_PRICES, StubPriceProvider
+from transaction_log import TransactionLog
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS, "baseline.json")
+DEFAULT_SIZES = "1e3,1e4,1e5,1e6"
+SYMBOLS = ["AAPL", "TSLA", "GOOGL"]
+HOLDINGS = [1, 10, 100, 1000]
+
+# Allowed relative regression per kind of metric: single-shot timings are
+# noisier than repeated ones, memory is nearly deterministic.
+THRESHOLDS = {"throughput": 0.25, "latency": 0.25, "cold": 0.5, "memory": 0.1}
+
+# A metric only regresses when it moves by more than this many times its
+# spread (in the baseline or the current run), whatever its threshold.
+NOISE_MARGIN = 3.0
+
+
+class Results:
+    """
+    Collects metrics as {name: {"value", "unit", "better", "threshold", "noise"}}.
+    `noise` is the relative spread of a timing's runs, see spread().
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better, kind, noise=0.0):
+        self.metrics[name] = {"value": value, "unit": unit, "better": better, "threshold": THRESHOLDS[kind],
+                              "noise": noise}
+        print(f"{name:<52}{value:>16,.3f} {unit}  ±{noise:.0%}", flush=True)
+
+    def rate(self, name, ops, times):
+        self.add(name, ops / statistics.median(times), "ops/s", "higher", "throughput", spread(times))
+
+    def latency(self, name, times, kind="latency", calls=1):
+        self.add(name, statistics.median(times) / calls * 1e6, "us", "lower", kind, spread(times))
+
+
+def timings(repeat, func, *args):
+    """
+    Wall times of `repeat` calls of func(*args), with the GC paused as in timeit.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return times
+
+
+def spread(times):
+    """
+    Median absolute deviation of the runs over their median: unlike max - min,
+    one run disturbed by the machine does not widen it.
+    """
+    median = statistics.median(times)
+    return statistics.median(abs(t - median) for t in times) / median if len(times) > 1 else 0.0
+
+
+# --- accounts ----------------------------------------------------------
+
+def bench_trades(results, ops, repeat):
+    prices = StubPriceProvider()
+
+    def deposits():
+        account = Account()
+        for _ in range(ops):
+            account.deposit(100.0)
+
+    def trades(account_class, side):
+        account = account_class(price_provider=prices, incremental_valuation=True)
+        account.deposit(1e9)
+        if side == "sell":
+            account.buy("AAPL", ops)
+        trade = getattr(account, side)
+        return lambda: [trade("AAPL", 1) for _ in range(ops)]
+
+    results.rate("account.deposit", ops, timings(repeat, deposits))
+    for side in ("buy", "sell"):
+        results.rate(f"account.{side}", ops, [timings(1, trades(Account, side))[0] for _ in range(repeat)])
+    results.rate("concurrent_account.buy", ops,
+                 [timings(1, trades(ConcurrentAccount, "buy"))[0] for _ in range(repeat)])
+
+
+def bench_valuation(results, repeat, calls=20_000):
+    for n in HOLDINGS:
+        symbols = [f"S{i:04d}" for i in range(n)]
+        prices = StubPriceProvider({symbol: 10.0 + i for i, symbol in enumerate(symbols)})
+        for incremental in (True, False):
+            account = Account(price_provider=prices, incremental_valuation=incremental)
+            account.deposit(1e9)
+            account.execute_batch([Order("BUY", symbol, 1) for symbol in symbols])
+            value = account.get_portfolio_value
+            mode = "incremental" if incremental else "lookup"
+            times = timings(repeat, lambda: [value() for _ in range(calls)])
+            results.latency(f"account.get_portfolio_value[{mode},holdings={n}]", times, calls=calls)
+
+
+def bench_memory(results, ops):
+    account = Account(price_provider=StubPriceProvider())
+    account.deposit(1e9)
+    tracemalloc.start()
+    for i in range(ops):
+        if i % 3 == 2:
+            account.sell(SYMBOLS[i % 2], 1)
+        else:
+            account.buy(SYMBOLS[i % 2], 1)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add("account.bytes_per_tx", current / ops, "B", "lower", "memory")
+
+    seeded = seed(Account(price_provider=StubPriceProvider()), ops)
+    log = TransactionLog(seeded)
+    tracemalloc.start()
+    log.refresh()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.add("transaction_log.bytes_per_row", current / ops, "B", "lower", "memory")
+
+
+# --- app handlers ------------------------------------------------------
+
+def history(account, n):
+    """
+    `n` ledger records: a deposit every 10th row, a sale of one share every
+    10th, buys otherwise, cycling through the default symbols at their prices.
+    """
+    for symbol in SYMBOLS:
+        account.transactions.symbol_id(symbol)
+    rows = np.arange(n)
+    sid = rows % len(SYMBOLS)
+    price = np.array([round(DEFAULT_PRICES[symbol] * account.scale) for symbol in SYMBOLS])[sid]
+    deposit = rows % 10 == 0
+    sell = rows % 10 == 7
+    quantity = np.where(sell, 1, rows % 10 + 1)
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    records["timestamp"] = time.time_ns() - (n - rows) * 1_000_000
+    records["type"] = np.select([deposit, sell], [_DEPOSIT, _SELL], _BUY)
+    records["amount"] = np.select([deposit, sell], [1_000_000 * account.scale, price], -quantity * price)
+    records["symbol_id"] = np.where(deposit, -1, sid)
+    records["quantity"] = np.where(deposit, 0, quantity)
+    records["price"] = np.where(deposit, 0, price)
+    return records
+
+
+def seed(account, n):
+    """
+    Loads a synthetic history into an account as a WAL replay would.
+    """
+    _apply_records(account, history(account, n))
+    account.rebuild_positions()
+    if account.incremental_valuation:
+        account.mark_to_market()
+    if isinstance(account, ConcurrentAccount):
+        account._publish()
+    return account
+
+
+def bench_handlers(results, sizes, repeat, store):
+    os.environ["ACCOUNT_STORE_DIR"] = store
+    try:
+        import app
+    except ImportError as e:
+        print(f"app handlers skipped: {e}")
+        return
+
+    for n in sizes:
+        request = SimpleNamespace(session_hash=f"bench-{n}")
+        with app.sessions.session(request.session_hash) as session:
+            with session.account._lock:
+                seed(session.account, n)
+            session.store.flush()
+
+            start = time.perf_counter()
+            app.get_dashboard_data(request=request)
+            results.latency(f"app.get_dashboard_data.cold[n={n}]", [time.perf_counter() - start], "cold")
+
+            calls = 200
+            times = timings(repeat, lambda: [app.get_dashboard_data(request=request) for _ in range(calls)])
+            results.latency(f"app.get_dashboard_data[n={n}]", times, calls=calls)
+            times = timings(repeat, lambda: [app.get_dashboard_data(9 ** 9, "SELL", "AAPL", request=request)
+                                             for _ in range(calls)])
+            results.latency(f"app.get_dashboard_data[filtered,last_page,n={n}]", times, calls=calls)
+            times = timings(repeat, lambda: [app.get_transaction_log(session.log, 9 ** 9)
+                                             for _ in range(calls)])
+            results.latency(f"app.get_transaction_log[last_page,n={n}]", times, calls=calls)
+            times = timings(repeat, lambda: [app.handle_trade_operation("AAPL", 1, "Buy", 1, "All", "All",
+                                                                        request=request)
+                                             for _ in range(calls)])
+            results.latency(f"app.handle_trade_operation[n={n}]", times, calls=calls)
+
+        with app.sessions._lock:
+            victims = [app.sessions._take(app.sessions._sessions[request.session_hash])]
+        app.sessions._evict(victims)
+        gc.collect()
+    app.sessions.close()
+
+
+# --- results -----------------------------------------------------------
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(metrics, baseline, threshold=None):
+    """
+    Compares metrics with a baseline's. Returns the names that regressed by
+    more than their threshold (or `threshold`, when given), widened to
+    NOISE_MARGIN times the larger of the two runs' spreads, and the baseline
+    metrics this run did not measure.
+    """
+    regressions = []
+    print(f"\n{'metric':<52}{'baseline':>14}{'current':>14}{'change':>9}{'limit':>8}")
+    for name, base in baseline.items():
+        current = metrics.get(name)
+        if current is None:
+            regressions.append(name)
+            print(f"{name:<52}{base['value']:>14,.3f}{'-':>14}{'':>17}  MISSING")
+            continue
+        change = current["value"] / base["value"] - 1 if base["value"] else 0.0
+        worse = change if base["better"] == "lower" else -change
+        limit = threshold if threshold is not None else base.get("threshold", THRESHOLDS["latency"])
+        limit = max(limit, NOISE_MARGIN * max(base.get("noise", 0.0), current.get("noise", 0.0)))
+        regressed = worse > limit
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<52}{base['value']:>14,.3f}{current['value']:>14,.3f}{change:>+9.1%}{limit:>8.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="history sizes for the handler benchmarks (comma-separated)")
+    parser.add_argument("--ops", type=int, default=100_000, help="operations per throughput run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing; the median is kept")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed relative regression for every metric (default: per metric)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+    sizes = [int(float(size)) for size in args.sizes.split(",") if size]
+
+    results = Results()
+    bench_trades(results, args.ops, args.repeat)
+    bench_valuation(results, args.repeat)
+    bench_memory(results, args.ops)
+    store = tempfile.mkdtemp(prefix="bench-accounts-")
+    try:
+        bench_handlers(results, sizes, args.repeat, store)
+    finally:
+        shutil.rmtree(store, ignore_errors=True)
+
+    config = {"ops": args.ops, "repeat": args.repeat, "sizes": sizes}
+    report = {"environment": environment(), "config": config, "metrics": results.metrics}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --update-baseline to store one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"\n{args.baseline} was taken with {baseline.get('config')}, not {config}; "
+              f"rerun with the same options or --update-baseline")
+        return 2
+    regressions = compare(results.metrics, baseline["metrics"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) or missing metric(s) against {args.baseline}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Arrow/Parquet export and import of a large ledger: chunked zero-copy
+export against building a table from get_transaction_history(), plus the
+streaming Parquet round trip and the Arrow memory it needed.
+
+    python benchmarks/bench_arrow_io.py [ROWS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account, _BUY, _DEPOSIT
+from arrow_io import iter_record_batches, read_parquet, to_parquet
+from persistence import RECORD_DTYPE, _apply_records
+
+SYMBOLS = ["AAPL", "TSLA", "GOOGL", "MSFT", "AMZN"]
+
+
+def build(n, seed=1):
+    rng = np.random.default_rng(seed)
+    account = Account()
+    for symbol in SYMBOLS:
+        account.transactions.symbol_id(symbol)
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    deposit = np.arange(n) % 10 == 0
+    quantity = rng.integers(1, 100, n)
+    price = np.round(rng.uniform(50.0, 500.0, n) * 10_000).astype(np.int64)  # minor units
+    records["timestamp"] = 1_700_000_000_000_000_000 + np.arange(n) * 1_000
+    records["type"] = np.where(deposit, _DEPOSIT, _BUY)
+    records["amount"] = np.where(deposit, 1_000_000 * 10_000, -quantity * price)
+    records["symbol_id"] = np.where(deposit, -1, rng.integers(0, len(SYMBOLS), n))
+    records["quantity"] = np.where(deposit, 0, quantity)
+    records["price"] = np.where(deposit, 0, price)
+    _apply_records(account, records)
+    return account
+
+
+def naive_table(account):
+    return pa.Table.from_pylist([
+        {"timestamp": tx.timestamp, "type": tx.type, "amount": tx.amount,
+         "symbol": tx.symbol, "quantity": tx.quantity, "price": tx.price}
+        for tx in account.get_transaction_history()])
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    account = build(n)
+    pool = pa.default_memory_pool()
+    next(iter_record_batches(account, chunk_rows=1))  # pyarrow initializes lazily
+
+    begin = time.perf_counter()
+    rows = sum(batch.num_rows for batch in iter_record_batches(account))
+    export = time.perf_counter() - begin
+    print(f"record batches:  {rows:>10,} rows  {export * 1000:8.1f} ms  ({rows / export / 1e6:.0f}M rows/s)")
+
+    # Nothing trades on the benchmark account, so it may lend out its arrays.
+    begin = time.perf_counter()
+    rows = sum(batch.num_rows for batch in iter_record_batches(account, zero_copy=True))
+    export = time.perf_counter() - begin
+    print(f"  zero-copy:     {rows:>10,} rows  {export * 1000:8.1f} ms  ({rows / export / 1e6:.0f}M rows/s)")
+
+    sample = build(min(n, 200_000))
+    begin = time.perf_counter()
+    naive_table(sample)
+    naive = time.perf_counter() - begin
+    rows = len(sample.transactions)
+    print(f"from_pylist:     {rows:>10,} rows  {naive * 1000:8.1f} ms  ({rows / naive / 1e6:.2f}M rows/s)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.parquet")
+        begin = time.perf_counter()
+        to_parquet(account, path)
+        written = time.perf_counter() - begin
+        size = os.path.getsize(path)
+        print(f"to_parquet:      {n:>10,} rows  {written * 1000:8.1f} ms  {size / 1e6:.0f} MB "
+              f"(ledger {len(account.transactions) * 37 / 1e6:.0f} MB)")
+        begin = time.perf_counter()
+        restored = read_parquet(path)
+        read = time.perf_counter() - begin
+        print(f"read_parquet:    {n:>10,} rows  {read * 1000:8.1f} ms")
+        assert restored.balance == account.balance and restored.holdings == account.holdings
+    print(f"peak Arrow memory: {pool.max_memory() / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
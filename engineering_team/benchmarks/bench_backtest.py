@@ -0,0 +1,48 @@
+"""
+Backtest throughput: GBM path generation, single-run ticks/s for the bundled
+strategies, and a parameter scan across process pools of increasing size.
+
+    python benchmarks/bench_backtest.py [SYMBOLS] [YEARS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from backtest import (TRADING_DAYS, BuyAndHold, MovingAverageCrossover, gbm_paths,
+                      run_backtest, save_paths, scan)
+
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n_steps = years * TRADING_DAYS
+
+    start = time.perf_counter()
+    paths = gbm_paths(n_symbols, n_steps, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"GBM: {n_symbols:,} symbols x {n_steps:,} steps in {elapsed:.2f}s "
+          f"({paths.size / elapsed:,.0f} prices/s)")
+
+    print(f"{'strategy':<26}{'ticks/s':>14}{'trades':>10}")
+    for strategy_class, params in ((BuyAndHold, {}), (MovingAverageCrossover, {"fast": 10, "slow": 50})):
+        result = run_backtest(strategy_class, paths, params, initial_cash=1e7)
+        print(f"{strategy_class.__name__:<26}{result.ticks_per_second:>14,.0f}{result.trades:>10,}")
+
+    grid = [{"fast": fast, "slow": slow} for fast in (5, 10, 20, 40) for slow in (50, 100, 200)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "paths.npy")
+        save_paths(path, paths)
+        print(f"scan of {len(grid)} parameter sets:")
+        for processes in sorted({1, 2, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            results = scan(MovingAverageCrossover, grid, path, processes=processes, initial_cash=1e7)
+            elapsed = time.perf_counter() - start
+            ticks = sum(r.ticks for r in results)
+            print(f"  {processes:>3} processes: {elapsed:6.2f}s  {ticks / elapsed:>14,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares the columnar TransactionLedger with the old list-of-dataclasses
+transaction log: memory per transaction and append throughput.
+
+    python benchmarks/bench_ledger.py [N]
+"""
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Transaction, TransactionLedger
+
+
+def fill_list(n):
+    txs = []
+    for i in range(n):
+        txs.append(Transaction(
+            timestamp=datetime.datetime.now(),
+            type="BUY",
+            amount=-150.0 * (i % 7 + 1),
+            symbol="AAPL",
+            quantity=i % 7 + 1,
+            price=150.0
+        ))
+    return txs
+
+
+def fill_ledger(n):
+    ledger = TransactionLedger()
+    for i in range(n):
+        ledger.record("BUY", -1_500_000 * (i % 7 + 1), "AAPL", i % 7 + 1, 1_500_000)
+    return ledger
+
+
+def measure(fill, n):
+    start = time.perf_counter()
+    store = fill(n)
+    elapsed = time.perf_counter() - start
+    del store
+
+    # Memory is traced on a separate run so tracing overhead does not skew timing.
+    tracemalloc.start()
+    store = fill(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / n, n / elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{'store':<22}{'bytes/tx':>12}{'appends/s':>16}")
+    for name, fill in (("list[Transaction]", fill_list), ("TransactionLedger", fill_ledger)):
+        per_tx, rate = measure(fill, n)
+        print(f"{name:<22}{per_tx:>12.1f}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Load generator for the trading app: N concurrent users, each with its own
+session, issue a weighted mix of cash, trade and dashboard requests for a
+fixed duration. Reports throughput and p50/p95/p99 latency per operation.
+
+    python benchmarks/bench_load.py [--users 50] [--duration 30]
+        [--mix dashboard=40,history=10,buy=20,sell=10,deposit=15,withdraw=5]
+        [--mode inprocess|http] [--url http://127.0.0.1:7860/]
+        [--think-time SECONDS] [--output results.json]
+
+In `inprocess` mode users call the app's handlers directly from threads,
+as Gradio's worker pool would. In `http` mode each user is a gradio_client
+Client talking to the app's HTTP API, either at --url or on a server
+launched locally for the run (GRADIO_CONCURRENCY sizes its worker pool).
+Sessions are stored in a temporary directory unless --url is given.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+OUTPUT = os.path.join(BENCHMARKS, "..", "output")
+sys.path.insert(0, OUTPUT)
+
+DEFAULT_MIX = "dashboard=40,history=10,buy=20,sell=10,deposit=15,withdraw=5"
+SYMBOLS = ["AAPL", "TSLA", "GOOGL"]
+TYPES = ["All", "DEPOSIT", "WITHDRAWAL", "BUY", "SELL"]
+
+
+# Each operation maps a user's RNG to (API endpoint, handler inputs).
+OPERATIONS = {
+    "dashboard": lambda rng: ("dashboard", (1, "All", "All")),
+    "history": lambda rng: ("dashboard", (rng.randint(1, 5), rng.choice(TYPES), rng.choice(["All"] + SYMBOLS))),
+    "buy": lambda rng: ("trade_operation", (rng.choice(SYMBOLS), rng.randint(1, 5), "Buy", 1, "All", "All")),
+    "sell": lambda rng: ("trade_operation", (rng.choice(SYMBOLS), rng.randint(1, 3), "Sell", 1, "All", "All")),
+    "deposit": lambda rng: ("cash_operation", (round(rng.uniform(100, 5000), 2), "Deposit", 1, "All", "All")),
+    "withdraw": lambda rng: ("cash_operation", (round(rng.uniform(10, 500), 2), "Withdraw", 1, "All", "All")),
+    "delta": lambda rng: ("transaction_delta", (-1,)),
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class InProcessTarget:
+    """
+    Calls the app's handlers directly; each user is a distinct session id.
+    """
+    def __init__(self, store):
+        os.environ["ACCOUNT_STORE_DIR"] = store
+        import app
+        self.app = app
+        self.handlers = {
+            "dashboard": app.get_dashboard_data,
+            "trade_operation": app.handle_trade_operation,
+            "cash_operation": app.handle_cash_operation,
+            "transaction_delta": app.get_transaction_delta,
+        }
+
+    def connect(self, user_id):
+        request = SimpleNamespace(session_hash=f"load-{user_id}")
+        return lambda endpoint, args: self.handlers[endpoint](*args, request=request)
+
+    def close(self):
+        self.app.sessions.close()
+
+
+class HttpTarget:
+    """
+    Calls the app's Gradio API; each gradio_client Client is its own session.
+    """
+    def __init__(self, url):
+        from gradio_client import Client
+        self.client_class = Client
+        self.url = url
+
+    def connect(self, user_id):
+        client = self.client_class(self.url, verbose=False, analytics_enabled=False, download_files=False)
+        return lambda endpoint, args: client.predict(*args, api_name=f"/{endpoint}")
+
+    def close(self):
+        pass
+
+
+def launch_server(store):
+    """
+    Starts the app on a free local port. Returns (process, url) once it answers.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, GRADIO_SERVER_NAME="127.0.0.1", GRADIO_SERVER_PORT=str(port),
+               GRADIO_ANALYTICS_ENABLED="False", ACCOUNT_STORE_DIR=store)
+    process = subprocess.Popen([sys.executable, "app.py"], cwd=OUTPUT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with status {process.returncode} before serving.")
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return process, url
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"app.py did not answer on {url} within 120s.")
+
+
+def classify(result):
+    """
+    "ok", "rejected" or "error" for a handler's outputs. Cash and trade
+    handlers report validation failures ("❌ Error: ...") and any other
+    exception they caught ("❌ Unexpected Error: ...") in their status text.
+    """
+    status = result[0] if isinstance(result, (tuple, list)) and result else None
+    if not isinstance(status, str) or not status.startswith("❌"):
+        return "ok"
+    return "error" if status.startswith("❌ Unexpected Error") else "rejected"
+
+
+def run_user(call, rng, mix, deadline, think_time, samples):
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        endpoint, args = OPERATIONS[name](rng)
+        begin = time.perf_counter()
+        try:
+            outcome = classify(call(endpoint, args))
+        except Exception:
+            outcome = "error"
+        samples.append((name, time.perf_counter() - begin, outcome))
+        if think_time:
+            time.sleep(rng.expovariate(1 / think_time))
+
+
+def run(target, users, duration, mix, think_time=0.0, seed=1):
+    """
+    Runs the load and returns {operation: [(latency, outcome), ...]} and the elapsed time.
+    """
+    calls = [target.connect(i) for i in range(users)]
+    for call in calls:
+        # Funds for the run; not measured.
+        call("cash_operation", (1_000_000, "Deposit", 1, "All", "All"))
+    samples = [[] for _ in range(users)]
+    start = time.monotonic()
+    deadline = start + duration
+    threads = [threading.Thread(target=run_user, daemon=True,
+                                args=(call, random.Random(seed + i), mix, deadline, think_time, samples[i]))
+               for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    by_operation = defaultdict(list)
+    for user_samples in samples:
+        for name, latency, outcome in user_samples:
+            by_operation[name].append((latency, outcome))
+    return by_operation, elapsed
+
+
+def summarize(by_operation, elapsed):
+    """
+    Per-operation counts, throughput and latency percentiles (ms), plus a "total" row.
+    """
+    rows = dict(by_operation)
+    rows["total"] = [sample for samples in by_operation.values() for sample in samples]
+    report = {}
+    for name, samples in rows.items():
+        latencies = np.array([latency for latency, _ in samples]) * 1000
+        outcomes = [outcome for _, outcome in samples]
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+        report[name] = {
+            "requests": len(samples),
+            "rejected": outcomes.count("rejected"),
+            "errors": outcomes.count("error"),
+            "throughput": len(samples) / elapsed,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(latencies.max()) if len(latencies) else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'operation':<12}{'requests':>10}{'rejected':>10}{'errors':>8}{'req/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in report.items():
+        print(f"{name:<12}{row['requests']:>10,}{row['rejected']:>10,}{row['errors']:>8,}{row['throughput']:>10,.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=50, help="concurrent users (one session each)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. dashboard=3,buy=1")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", help="app to load in http mode (default: launch one locally)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean pause between a user's requests, in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    store = tempfile.mkdtemp(prefix="bench-load-")
+    server = None
+    try:
+        if args.mode == "inprocess":
+            target = InProcessTarget(store)
+        else:
+            url = args.url
+            if url is None:
+                server, url = launch_server(store)
+            target = HttpTarget(url)
+        try:
+            by_operation, elapsed = run(target, args.users, args.duration, mix, args.think_time, args.seed)
+        finally:
+            target.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(store, ignore_errors=True)
+
+    report = summarize(by_operation, elapsed)
+    print(f"{args.users} users, {args.mode}, {elapsed:.1f}s")
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"users": args.users, "mode": args.mode, "duration": elapsed, "mix": mix,
+                       "think_time": args.think_time, "operations": report}, f, indent=2)
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Account money arithmetic: trade and valuation throughput, ledger aggregation
+with NumPy, and accumulated error over a long run. Only the public API and
+the ledger's amount column are used, so the same script measures the float
+ledger of earlier revisions and the integer minor-unit one.
+
+    python benchmarks/bench_money.py [OPS]
+"""
+import os
+import random
+import sys
+import time
+from fractions import Fraction
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account, Order
+from price_provider import StubPriceProvider
+
+SYMBOLS = ["AAPL", "TSLA", "GOOGL"]
+
+
+def rate(label, n, seconds):
+    print(f"{label:<28} {n / seconds:>12,.0f} /s")
+
+
+def trades(n):
+    prices = StubPriceProvider()
+    account = Account(price_provider=prices, incremental_valuation=True)
+    account.deposit(1e10)
+    rng = random.Random(1)
+    moves = [(rng.choice(SYMBOLS), round(rng.uniform(50.0, 500.0), 2)) for _ in range(1024)]
+
+    start = time.perf_counter()
+    for i in range(n):
+        account.buy(SYMBOLS[i % 3], 3)
+        account.sell(SYMBOLS[i % 3], 1)
+    rate("buy + sell", 2 * n, time.perf_counter() - start)
+
+    orders = [Order("BUY" if i % 2 else "SELL", SYMBOLS[i % 3], 1) for i in range(100)]
+    start = time.perf_counter()
+    for _ in range(n // 100):
+        account.execute_batch(orders, atomic=False)
+    rate("execute_batch orders", n // 100 * 100, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(n):
+        symbol, price = moves[i & 1023]
+        account.on_price_tick(symbol, price)
+        account.get_profit_loss()
+    rate("tick + get_profit_loss", n, time.perf_counter() - start)
+    return account
+
+
+def aggregation(account):
+    ledger = account.transactions
+    column = np.frombuffer(ledger.amounts, dtype=ledger.amounts.typecode)
+    start = time.perf_counter()
+    for _ in range(100):
+        total = column.sum()
+    seconds = (time.perf_counter() - start) / 100
+    rate(f"ledger sum ({column.dtype.name}) rows", len(column), seconds)
+    print(f"  ledger sum - balance: {float(total) / getattr(ledger, 'scale', 1) - account.balance:.3g}")
+
+
+def drift(n):
+    account = Account()
+    for _ in range(n):
+        account.deposit(0.1)
+    expected = Fraction(n, 10)
+    print(f"{n:,} deposits of 0.1: balance {account.balance!r}, off by {float(abs(Fraction(account.balance) - expected)):.3g}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    account = trades(n)
+    aggregation(account)
+    drift(n * 5)
+
+
+if __name__ == "__main__":
+    main()
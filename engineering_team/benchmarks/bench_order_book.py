@@ -0,0 +1,55 @@
+"""
+Order book matching cost as the number of resting orders grows. Only crossed
+orders are touched, so the cost per fill stays flat; the cost per tick grows
+only with the number of orders each tick crosses.
+
+    python benchmarks/bench_order_book.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account
+from order_book import OrderBook
+from price_provider import StubPriceProvider
+
+
+def run(n_orders, n_ticks=10_000, seed=1):
+    rng = random.Random(seed)
+    prices = StubPriceProvider({'AAPL': 100.0})
+    account = Account(price_provider=prices)
+    account.deposit(1e12)
+    account.buy('AAPL', 10 * n_orders)
+    book = OrderBook(account)
+    ids = []
+    for _ in range(n_orders):
+        side = rng.choice(('BUY', 'SELL'))
+        if rng.random() < 0.5:
+            order = book.submit(side, 'AAPL', 1, limit_price=rng.uniform(50.0, 150.0))
+        else:
+            order = book.submit(side, 'AAPL', 1, stop_price=rng.uniform(50.0, 150.0))
+        ids.append(order.order_id)
+
+    price = 100.0
+    filled = 0
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        price = min(160.0, max(40.0, price + rng.gauss(0.0, 0.05)))
+        filled += len(book.on_price_tick('AAPL', price))
+        book.cancel(rng.choice(ids))
+    elapsed = time.perf_counter() - start
+    return elapsed / n_ticks * 1e6, elapsed / max(filled, 1) * 1e6, filled
+
+
+def main():
+    print(f"{'resting orders':>16}{'us/tick':>12}{'us/fill':>12}{'fills':>10}")
+    for n_orders in (1_000, 10_000, 100_000, 1_000_000):
+        per_tick, per_fill, filled = run(n_orders)
+        print(f"{n_orders:>16,}{per_tick:>12.1f}{per_fill:>12.1f}{filled:>10,}")
+
+
+if __name__ == "__main__":
+    main()
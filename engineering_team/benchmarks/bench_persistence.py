@@ -0,0 +1,74 @@
+"""
+Measures AccountStore write throughput (WAL with group commit) and recovery
+time, both from the WAL alone and from a snapshot plus WAL tail.
+
+    python benchmarks/bench_persistence.py [N]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account
+from persistence import AccountStore
+
+
+def write(directory, n, **store_kwargs):
+    store = AccountStore(directory, **store_kwargs)
+    account = store.open()
+    account.deposit(1e12)
+    start = time.perf_counter()
+    for i in range(n // 2):
+        account.buy("AAPL", 1)
+        store.commit()
+        account.sell("AAPL", 1)
+        store.commit()
+    store.close()
+    return n / (time.perf_counter() - start), account.balance
+
+
+def baseline(n):
+    account = Account()
+    account.deposit(1e12)
+    start = time.perf_counter()
+    for i in range(n // 2):
+        account.buy("AAPL", 1)
+        account.sell("AAPL", 1)
+    return n / (time.perf_counter() - start)
+
+
+def recover(directory):
+    start = time.perf_counter()
+    store = AccountStore(directory)
+    account = store.open()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed, account.balance, len(account.transactions)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    configs = (
+        ("wal only, fsync=interval", dict(fsync="interval", snapshot_interval=10**12)),
+        ("wal only, fsync=never", dict(fsync="never", snapshot_interval=10**12)),
+        ("snapshot every 1M", dict(fsync="interval", snapshot_interval=1_000_000)),
+    )
+    print(f"{n:,} transactions")
+    print(f"{'config':<28}{'writes/s':>14}{'recovery s':>12}")
+    print(f"{'in-memory Account only':<28}{baseline(n):>14,.0f}{'-':>12}")
+    for name, kwargs in configs:
+        directory = tempfile.mkdtemp()
+        try:
+            rate, balance = write(directory, n, **kwargs)
+            elapsed, recovered, rows = recover(directory)
+            assert recovered == balance and rows == n + 1
+            print(f"{name:<28}{rate:>14,.0f}{elapsed:>12.3f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
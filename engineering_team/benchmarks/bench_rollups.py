@@ -0,0 +1,70 @@
+"""
+LedgerRollups against Python loops over get_transaction_history(): cost of
+folding new rows, and of a per-symbol volume query over a date range.
+
+    python benchmarks/bench_rollups.py [ROWS]
+"""
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account, to_units
+from rollups import LedgerRollups
+
+DAY = 86_400 * 1_000_000_000
+SYMBOLS = ["AAPL", "TSLA", "GOOGL", "MSFT", "AMZN"]
+
+
+def build(n, seed=1):
+    rng = random.Random(seed)
+    account = Account()
+    ledger = account.transactions
+    start = 19_000 * DAY
+    for i in range(n):
+        timestamp = start + i * (3 * 365 * DAY // n)
+        if i % 10 == 0:
+            ledger.record("DEPOSIT", to_units(1000.0), timestamp_ns=timestamp)
+        else:
+            quantity = rng.randint(1, 100)
+            price = to_units(rng.uniform(50.0, 500.0))
+            ledger.record("BUY", -quantity * price, rng.choice(SYMBOLS), quantity, price, timestamp_ns=timestamp)
+    return account, start
+
+
+def naive_volume(account, start, end):
+    volumes = {}
+    for tx in account.get_transaction_history():
+        if tx.symbol and start <= tx.timestamp < end:
+            volumes[tx.symbol] = volumes.get(tx.symbol, 0) + tx.quantity
+    return volumes
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    account, base = build(n)
+    rollups = LedgerRollups(account.transactions)
+    begin = time.perf_counter()
+    rollups.refresh()
+    fold = time.perf_counter() - begin
+    print(f"{n:,} rows: folded in {fold:.2f}s ({n / fold:,.0f} rows/s)")
+
+    start, end = base + 200 * DAY, base + 500 * DAY
+    begin = time.perf_counter()
+    for _ in range(1000):
+        fast = rollups.volume_by_symbol(start, end)
+    query = (time.perf_counter() - begin) / 1000
+    begin = time.perf_counter()
+    slow = naive_volume(account, datetime.datetime.fromtimestamp(start // 10**9),
+                        datetime.datetime.fromtimestamp(end // 10**9))
+    loop = time.perf_counter() - begin
+    assert fast == slow, (fast, slow)
+    print(f"volume_by_symbol over 300 days: rollups {query * 1e6:,.1f} us, "
+          f"history loop {loop * 1e3:,.0f} ms ({loop / query:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Aggregate throughput of ShardedAccountService as the shard count grows,
+against plain in-process Accounts. Each round sends a batch of deposits and
+trades spread over many accounts.
+
+    python benchmarks/bench_shards.py [OPS] [BATCH]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import Account
+from price_provider import StubPriceProvider
+from shards import ShardedAccountService
+
+N_ACCOUNTS = 10_000
+
+
+def make_requests(n, seed=1):
+    rng = random.Random(seed)
+    ops = [("deposit", (500.0,)), ("buy", ("AAPL", 1)), ("sell", ("AAPL", 1)), ("withdraw", (100.0,))]
+    return [(rng.randrange(N_ACCOUNTS),) + rng.choice(ops) for _ in range(n)]
+
+
+def run_in_process(requests):
+    provider = StubPriceProvider()
+    accounts = {}
+    start = time.perf_counter()
+    for account_id, op, args in requests:
+        account = accounts.get(account_id)
+        if account is None:
+            account = accounts[account_id] = Account(price_provider=provider)
+        try:
+            getattr(account, op)(*args)
+        except ValueError:
+            pass
+    return len(requests) / (time.perf_counter() - start)
+
+
+def run_sharded(requests, n_shards, batch):
+    with ShardedAccountService(n_shards) as service:
+        service.execute(requests[:n_shards])  # warm up the workers
+        start = time.perf_counter()
+        for i in range(0, len(requests), batch):
+            service.execute(requests[i:i + batch])
+        return len(requests) / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    requests = make_requests(n)
+    print(f"{n:,} ops over {N_ACCOUNTS:,} accounts, batches of {batch:,}, {os.cpu_count()} CPUs")
+    print(f"{'in-process':<14}{run_in_process(requests):>14,.0f} ops/s")
+    for n_shards in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+        print(f"{n_shards:>3} shards    {run_sharded(requests, n_shards, batch):>14,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
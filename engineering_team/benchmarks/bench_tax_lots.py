@@ -0,0 +1,76 @@
+"""
+Replays a stream of trades through Account with each cost-basis method and
+compares get_position_report() with rebuilding the lots from a full rescan of
+the transaction ledger.
+
+    python benchmarks/bench_tax_lots.py [N]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "output"))
+
+from accounts import COST_BASIS_METHODS, Account, to_units
+
+SYMBOLS = [f"SYM{i}" for i in range(20)]
+
+
+def make_trades(n, seed=42):
+    """Random buys and sells at minor-unit prices; a sell never exceeds the shares held."""
+    rng = random.Random(seed)
+    held = dict.fromkeys(SYMBOLS, 0)
+    prices = dict.fromkeys(SYMBOLS, 100.0)
+    trades = []
+    for _ in range(n):
+        symbol = rng.choice(SYMBOLS)
+        prices[symbol] = max(1.0, prices[symbol] * (1.0 + rng.gauss(0.0, 0.01)))
+        quantity = rng.randint(1, 50)
+        if rng.random() < 0.5 and held[symbol] >= quantity:
+            held[symbol] -= quantity
+            trades.append((False, symbol, quantity, to_units(prices[symbol])))
+        else:
+            held[symbol] += quantity
+            trades.append((True, symbol, quantity, to_units(prices[symbol])))
+    return trades, prices
+
+
+def replay(method, trades):
+    account = Account(cost_basis_method=method)
+    account.deposit(1e12)
+    buy, sell = account._buy_at, account._sell_at
+    for is_buy, symbol, quantity, price in trades:
+        if is_buy:
+            buy(symbol, quantity, price)
+        else:
+            sell(symbol, quantity, price)
+    return account
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    trades, prices = make_trades(n)
+    print(f"{n:,} trades over {len(SYMBOLS)} symbols")
+    print(f"{'method':<10}{'trades/s':>14}{'report (us)':>14}{'rescan (s)':>12}{'open lots':>12}")
+    for method in COST_BASIS_METHODS:
+        start = time.perf_counter()
+        account = replay(method, trades)
+        rate = n / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            report = account.get_position_report(prices)
+        report_us = (time.perf_counter() - start) / 100 * 1e6
+
+        start = time.perf_counter()
+        account.rebuild_positions()
+        rescan = time.perf_counter() - start
+        assert account.get_position_report(prices).keys() == report.keys()
+
+        lots = sum(len(position.lots) for position in account.positions.values())
+        print(f"{method:<10}{rate:>14,.0f}{report_us:>14.1f}{rescan:>12.2f}{lots:>12,}")
+
+
+if __name__ == "__main__":
+    main()
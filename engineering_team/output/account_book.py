@@ -0,0 +1,258 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from accounts import _OUT_OF_RANGE, DEFAULT_MONEY_DECIMALS, MAX_UNITS, get_share_price
+from price_provider import FunctionPriceProvider, PriceProvider
+
+# Operation codes accepted by AccountBook.apply().
+OP_DEPOSIT = 0
+OP_WITHDRAW = 1
+OP_BUY = 2
+OP_SELL = 3
+
+# Per-row result codes returned by every batch call. 0 means the row was applied.
+OK = 0
+ERR_NON_POSITIVE = 1
+ERR_INSUFFICIENT_FUNDS = 2
+ERR_INSUFFICIENT_HOLDINGS = 3
+ERR_INVALID_SYMBOL = 4
+ERR_OUT_OF_RANGE = 5
+
+ERROR_MESSAGES = {
+    ERR_NON_POSITIVE: "Amount or quantity must be positive.",
+    ERR_INSUFFICIENT_FUNDS: "Insufficient funds.",
+    ERR_INSUFFICIENT_HOLDINGS: "Insufficient holdings.",
+    ERR_INVALID_SYMBOL: "Invalid symbol or price unavailable.",
+    ERR_OUT_OF_RANGE: _OUT_OF_RANGE,
+}
+
+# Float magnitudes at or above this do not fit int64 minor units.
+_UNITS_LIMIT = float(2 ** 63)
+
+
+def _occurrence_rank(accounts: np.ndarray) -> np.ndarray:
+    """
+    For each row, how many earlier rows in the batch touch the same account.
+    Rows with equal rank never share an account, so each rank can be applied
+    as one vectorized step while preserving per-account ordering.
+    """
+    n = len(accounts)
+    order = np.argsort(accounts, kind="stable")
+    sorted_accounts = accounts[order]
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = sorted_accounts[1:] != sorted_accounts[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - group_start
+    return rank
+
+
+class AccountBook:
+    """
+    Many accounts held as NumPy arrays: one balance/total slot per account and a
+    dense account x symbol holdings matrix. Deposits, withdrawals and trades are
+    applied in batches with the same validation rules as Account; rejected rows
+    are reported through a per-row error code array instead of exceptions.
+    Like Account, money is held as int64 minor units (`money_decimals` decimal
+    places): amounts and prices are rounded once on the way in and converted
+    back to float on the way out.
+    """
+    def __init__(self, n_accounts: int, symbols: Sequence[str],
+                 price_provider: Optional[PriceProvider] = None,
+                 money_decimals: int = DEFAULT_MONEY_DECIMALS):
+        if not 0 <= money_decimals <= 9:
+            raise ValueError("money_decimals must be between 0 and 9.")
+        self.price_provider: PriceProvider = price_provider or FunctionPriceProvider(get_share_price)
+        self.symbols: List[str] = [s.upper() for s in symbols]
+        self._symbol_index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self.money_decimals = money_decimals
+        self.scale = 10 ** money_decimals
+        self.balance_units = np.zeros(n_accounts, dtype=np.int64)
+        self.total_deposited_units = np.zeros(n_accounts, dtype=np.int64)
+        self.total_withdrawn_units = np.zeros(n_accounts, dtype=np.int64)
+        self.holdings = np.zeros((n_accounts, len(self.symbols)), dtype=np.int64)
+
+    @property
+    def balance(self) -> np.ndarray:
+        return self.balance_units / self.scale
+
+    @property
+    def total_deposited(self) -> np.ndarray:
+        return self.total_deposited_units / self.scale
+
+    @property
+    def total_withdrawn(self) -> np.ndarray:
+        return self.total_withdrawn_units / self.scale
+
+    def __len__(self) -> int:
+        return len(self.balance_units)
+
+    def _price_units(self, prices) -> np.ndarray:
+        """
+        Converts a price per symbol column to minor units. Raises ValueError for
+        a price that does not fit int64.
+        """
+        scaled = np.rint(np.asarray(prices, dtype=np.float64) * self.scale)
+        if not (np.abs(scaled) < _UNITS_LIMIT).all():
+            raise ValueError(_OUT_OF_RANGE)
+        return scaled.astype(np.int64)
+
+    def symbol_ids(self, symbols: Sequence[str]) -> np.ndarray:
+        """
+        Maps symbol names to column ids; unknown symbols map to -1.
+        """
+        index = self._symbol_index
+        return np.array([index.get(s.upper(), -1) for s in symbols], dtype=np.int64)
+
+    def get_share_prices(self) -> np.ndarray:
+        """
+        Returns the current price of every symbol column, looked up once per batch.
+        """
+        prices = self.price_provider.get_share_prices(self.symbols)
+        return np.array([prices[s] for s in self.symbols], dtype=np.float64)
+
+    def apply(self, ops, accounts, values, symbol_ids=None,
+              prices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Applies a mixed batch of operations in row order.
+        `values` holds the cash amount for deposits/withdrawals and the share
+        quantity for buys/sells. Returns an array of result codes (OK or ERR_*).
+        Raises ValueError, without applying any row, for an unknown operation
+        code, an account id out of range, a fractional share quantity or a
+        price too large to hold in minor units.
+        """
+        ops = np.asarray(ops, dtype=np.int64)
+        accounts = np.asarray(accounts, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(accounts)
+        ops = np.broadcast_to(ops, (n,))
+        values = np.broadcast_to(values, (n,))
+        if symbol_ids is None:
+            symbol_ids = np.full(n, -1, dtype=np.int64)
+        symbol_ids = np.broadcast_to(np.asarray(symbol_ids, dtype=np.int64), (n,))
+        if prices is None:
+            prices = self.get_share_prices()
+        prices = self._price_units(prices)
+
+        errors = np.zeros(n, dtype=np.uint8)
+        if n == 0:
+            return errors
+        self._validate(ops, accounts, values)
+
+        rank = _occurrence_rank(accounts)
+        order = np.argsort(rank, kind="stable")
+        bounds = np.flatnonzero(np.diff(rank[order])) + 1
+        for rows in np.split(order, bounds):
+            errors[rows] = self._apply_round(ops[rows], accounts[rows], values[rows],
+                                             symbol_ids[rows], prices)
+        return errors
+
+    def _validate(self, ops, accounts, values) -> None:
+        # Malformed rows reject the whole batch before anything is applied.
+        unknown = ~np.isin(ops, (OP_DEPOSIT, OP_WITHDRAW, OP_BUY, OP_SELL))
+        if unknown.any():
+            row = np.flatnonzero(unknown)[0]
+            raise ValueError(f"Unknown operation code {ops[row]} at row {row}.")
+        out_of_range = (accounts < 0) | (accounts >= len(self))
+        if out_of_range.any():
+            row = np.flatnonzero(out_of_range)[0]
+            raise ValueError(f"Account id {accounts[row]} at row {row} is out of range.")
+        trade = (ops == OP_BUY) | (ops == OP_SELL)
+        fractional = trade & (values != np.floor(values))
+        if fractional.any():
+            row = np.flatnonzero(fractional)[0]
+            raise ValueError(f"Share quantity {values[row]} at row {row} is not a whole number.")
+
+    def _apply_round(self, op, acct, value, sid, prices) -> np.ndarray:
+        is_deposit = op == OP_DEPOSIT
+        is_withdraw = op == OP_WITHDRAW
+        is_buy = op == OP_BUY
+        is_sell = op == OP_SELL
+        is_trade = is_buy | is_sell
+
+        known = sid >= 0
+        col = np.where(known, sid, 0)
+        price = np.where(known, prices[col], 0)
+        positive_price = np.where(price > 0, price, 1)
+        # Cash amounts are rounded to minor units like Account.deposit(); amounts
+        # and quantities that cannot be held as int64 are flagged, never applied.
+        rounded = np.where(is_trade, value, np.rint(value * self.scale))
+        too_large = ~(np.abs(rounded) < _UNITS_LIMIT)
+        whole = np.where(too_large, 0.0, rounded).astype(np.int64)
+        quantity = np.where(is_trade, whole, 0)
+        units = np.where(is_trade, 0, whole)
+        balance = self.balance_units[acct]
+        held = np.where(known, self.holdings[acct, col], 0)
+
+        errors = np.zeros(len(acct), dtype=np.uint8)
+        # Checks run in the same order as Account, so the first failure wins.
+        # Limits are compared by division so that nothing here overflows int64.
+        checks = (
+            (rounded <= 0, ERR_NON_POSITIVE),
+            (too_large, ERR_OUT_OF_RANGE),
+            (is_deposit & (units > MAX_UNITS - np.maximum(balance, self.total_deposited_units[acct])),
+             ERR_OUT_OF_RANGE),
+            (is_withdraw & (units > balance), ERR_INSUFFICIENT_FUNDS),
+            (is_withdraw & (units > MAX_UNITS - self.total_withdrawn_units[acct]), ERR_OUT_OF_RANGE),
+            (is_buy & (price <= 0), ERR_INVALID_SYMBOL),
+            (is_buy & (quantity > balance // positive_price), ERR_INSUFFICIENT_FUNDS),
+            (is_sell & (held < quantity), ERR_INSUFFICIENT_HOLDINGS),
+            (is_sell & (price > 0) & (quantity > (MAX_UNITS - balance) // positive_price), ERR_OUT_OF_RANGE),
+        )
+        for failed, code in checks:
+            errors[(errors == OK) & failed] = code
+
+        ok = errors == OK
+        cost = np.where(ok & is_trade, price, 0) * quantity
+        cash = np.select([is_deposit, is_withdraw, is_buy, is_sell],
+                         [units, -units, -cost, cost], 0)
+        self.balance_units[acct[ok]] += cash[ok]
+        self.total_deposited_units[acct[ok & is_deposit]] += units[ok & is_deposit]
+        self.total_withdrawn_units[acct[ok & is_withdraw]] += units[ok & is_withdraw]
+
+        traded = ok & is_trade
+        shares = np.where(is_buy, quantity, -quantity)
+        self.holdings[acct[traded], col[traded]] += shares[traded]
+        return errors
+
+    def deposit(self, accounts, amounts) -> np.ndarray:
+        """
+        Adds funds to each account in the batch.
+        """
+        return self.apply(OP_DEPOSIT, accounts, amounts, prices=np.zeros(len(self.symbols)))
+
+    def withdraw(self, accounts, amounts) -> np.ndarray:
+        """
+        Subtracts funds from each account in the batch.
+        """
+        return self.apply(OP_WITHDRAW, accounts, amounts, prices=np.zeros(len(self.symbols)))
+
+    def buy(self, accounts, symbol_ids, quantities, prices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Buys shares for each (account, symbol, quantity) row in the batch.
+        """
+        return self.apply(OP_BUY, accounts, quantities, symbol_ids, prices)
+
+    def sell(self, accounts, symbol_ids, quantities, prices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Sells shares for each (account, symbol, quantity) row in the batch.
+        """
+        return self.apply(OP_SELL, accounts, quantities, symbol_ids, prices)
+
+    def get_portfolio_value(self, prices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Calculates the total liquid value of every account in one matrix-vector product.
+        """
+        return self._portfolio_value_units(prices) / self.scale
+
+    def get_profit_loss(self, prices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Calculates every account's performance relative to actual cash invested.
+        """
+        net_invested = self.total_deposited_units - self.total_withdrawn_units
+        return (self._portfolio_value_units(prices) - net_invested) / self.scale
+
+    def _portfolio_value_units(self, prices: Optional[np.ndarray]) -> np.ndarray:
+        if prices is None:
+            prices = self.get_share_prices()
+        return self.balance_units + self.holdings @ self._price_units(prices)
@@ -1,88 +1,220 @@
+import atexit
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
 import gradio as gr
-from accounts import Account, get_share_price
+from arrow_io import to_parquet
+from price_provider import CachedPriceProvider, StubPriceProvider
+from sessions import SessionRegistry
+from transaction_log import HEADERS, format_currency
+
+# Shared, cached price source for every session's account and the dashboard
+price_provider = CachedPriceProvider(StubPriceProvider(), ttl=1.0)
+
+# One account per browser, identified by a client id kept in its local
+# storage, so the account survives reloads and new tabs. Idle and least
+# recently used sessions are spilled to disk and reloaded when their owner
+# comes back; sessions unused for SESSION_RETENTION_DAYS are deleted.
+sessions = SessionRegistry(
+    os.getenv("ACCOUNT_STORE_DIR", "account_data"),
+    max_resident=int(os.getenv("MAX_RESIDENT_SESSIONS", "1000")),
+    idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "900")),
+    retention=float(os.getenv("SESSION_RETENTION_DAYS", "30")) * 86400,
+    price_provider=price_provider,
+    incremental_valuation=True
+)
+atexit.register(sessions.close)
+PAGE_SIZE = 50
+DEFAULT_SESSION = "default"
+SESSION_SWEEP_INTERVAL = 300.0
+CLIENT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Optional push mode: open sessions receive dashboard updates without polling
+STREAMING = os.getenv("DASHBOARD_STREAMING", "0") == "1"
+STREAM_POLL = 1.0
 
-# Initialize the single user account for this demo
-account = Account()
+# Open dashboard streams by tab (Gradio session hash), stopped when the tab unloads
+streams = {}
 
-def format_currency(value):
-    """Helper to format currency strings."""
-    return f"${value:,.2f}"
+def assign_client_id(client_id):
+    """Returns the browser's client id, issuing a new one on its first visit."""
+    if isinstance(client_id, str) and CLIENT_ID.match(client_id):
+        return client_id
+    return uuid.uuid4().hex
 
-def perform_cash_operation(amount, operation):
+def session_id(client_id=None, request=None):
+    """
+    Account session of a call: the browser's client id, else its Gradio
+    session (a shared default when called without either).
+    """
+    return client_id or getattr(request, "session_hash", None) or DEFAULT_SESSION
+
+def tab_id(request):
+    """Gradio session hash of the calling tab."""
+    return getattr(request, "session_hash", None) or DEFAULT_SESSION
+
+def perform_cash_operation(amount, operation, client_id=None, request: gr.Request = None):
     """Handles Deposit and Withdrawal logic."""
     try:
         amount = float(amount)
-        if operation == "Deposit":
-            account.deposit(amount)
-            return f"✅ Successfully deposited {format_currency(amount)}."
-        elif operation == "Withdraw":
-            account.withdraw(amount)
-            return f"✅ Successfully withdrew {format_currency(amount)}."
+        with sessions.session(session_id(client_id, request)) as session:
+            if operation == "Deposit":
+                session.account.deposit(amount)
+                session.store.commit()
+                return f"✅ Successfully deposited {format_currency(amount)}."
+            elif operation == "Withdraw":
+                session.account.withdraw(amount)
+                session.store.commit()
+                return f"✅ Successfully withdrew {format_currency(amount)}."
     except ValueError as e:
         return f"❌ Error: {str(e)}"
     except Exception as e:
         return f"❌ Unexpected Error: {str(e)}"
 
-def perform_trade_operation(symbol, quantity, operation):
+def perform_trade_operation(symbol, quantity, operation, client_id=None, request: gr.Request = None):
     """Handles Buy and Sell logic."""
     try:
         qty = int(quantity)
-        if operation == "Buy":
-            account.buy(symbol, qty)
-            return f"✅ Successfully bought {qty} shares of {symbol}."
-        elif operation == "Sell":
-            account.sell(symbol, qty)
-            return f"✅ Successfully sold {qty} shares of {symbol}."
+        with sessions.session(session_id(client_id, request)) as session:
+            if operation == "Buy":
+                session.account.buy(symbol, qty)
+                session.store.commit()
+                return f"✅ Successfully bought {qty} shares of {symbol}."
+            elif operation == "Sell":
+                session.account.sell(symbol, qty)
+                session.store.commit()
+                return f"✅ Successfully sold {qty} shares of {symbol}."
     except ValueError as e:
         return f"❌ Error: {str(e)}"
     except Exception as e:
         return f"❌ Unexpected Error: {str(e)}"
 
-def get_dashboard_data():
-    """Retrieves current account status for the dashboard."""
-    balance = account.balance
-    port_value = account.get_portfolio_value()
-    pl = account.get_profit_loss()
-    
-    holdings = account.get_holdings()
+def build_summary(session, snapshot):
+    """
+    Balance, value, P/L and holdings rows of one account snapshot, priced with
+    one bulk fetch.
+    """
+    holdings = snapshot.holdings
+    prices = price_provider.get_share_prices(list(holdings)) if holdings else {}
+
     holdings_data = []
-    
-    if not holdings:
-        # Return empty state if no holdings
-        pass
-    else:
-        for sym, qty in holdings.items():
-            price = get_share_price(sym)
-            total_val = qty * price
-            holdings_data.append([sym, qty, format_currency(price), format_currency(total_val)])
-            
+    holdings_value = 0.0
+    for sym, qty in holdings.items():
+        price = prices[sym]
+        total_val = qty * price
+        holdings_value += total_val
+        holdings_data.append([sym, qty, format_currency(price), format_currency(total_val)])
+
+    port_value = snapshot.balance + holdings_value
+    pl = port_value - snapshot.net_invested
     return (
-        format_currency(balance),
+        format_currency(snapshot.balance),
         format_currency(port_value),
         format_currency(pl),
         holdings_data
     )
 
-def get_transaction_log():
-    """Retrieves and formats transaction history."""
-    txs = account.get_transaction_history()
-    data = []
-    # Show newest first
-    for t in reversed(txs):
-        data.append([
-            t.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-            t.type,
-            format_currency(t.amount),
-            t.symbol if t.symbol else "-",
-            str(t.quantity) if t.quantity else "-",
-            format_currency(t.price) if t.price else "-"
-        ])
-    return data
+def build_dashboard(session, page=1, type_filter="All", symbol_filter="All"):
+    """
+    Builds the whole dashboard from one account snapshot: the summary and the
+    history page.
+    """
+    snapshot = session.account.snapshot()
+    history, history_info = get_transaction_log(session.log, page, type_filter, symbol_filter,
+                                                rows=snapshot.rows)
+    return build_summary(session, snapshot) + (history, history_info)
+
+def get_dashboard_data(page=1, type_filter="All", symbol_filter="All", client_id=None,
+                       request: gr.Request = None):
+    """Returns the current session's dashboard."""
+    with sessions.session(session_id(client_id, request)) as session:
+        return build_dashboard(session, page, type_filter, symbol_filter)
+
+def stream_dashboard(client_id=None, request: gr.Request = None):
+    """
+    Pushes a fresh summary to an open session whenever its account changes.
+    The history table belongs to its paging and filter controls, which
+    refresh it themselves. The session stays resident while the stream is
+    open, and the stream ends when the page unloads.
+    """
+    tab = tab_id(request)
+    stop = streams[tab] = threading.Event()
+    try:
+        with sessions.session(session_id(client_id, request)) as session:
+            version = None
+            while not stop.is_set():
+                snapshot = session.account.wait_for_change(version, timeout=STREAM_POLL)
+                if snapshot.version != version:
+                    version = snapshot.version
+                    yield build_summary(session, snapshot)
+    finally:
+        if streams.get(tab) is stop:
+            del streams[tab]
+
+def close_stream(request: gr.Request = None):
+    """Stops the session's dashboard stream, releasing the session."""
+    stop = streams.pop(tab_id(request), None)
+    if stop is not None:
+        stop.set()
+
+def handle_cash_operation(amount, operation, page, type_filter, symbol_filter, client_id=None,
+                          request: gr.Request = None):
+    """Runs a cash operation and returns its result with the updated dashboard."""
+    return ((perform_cash_operation(amount, operation, client_id, request),)
+            + get_dashboard_data(page, type_filter, symbol_filter, client_id, request))
+
+def handle_trade_operation(symbol, quantity, operation, page, type_filter, symbol_filter, client_id=None,
+                           request: gr.Request = None):
+    """Runs a trade and returns its result with the updated dashboard."""
+    return ((perform_trade_operation(symbol, quantity, operation, client_id, request),)
+            + get_dashboard_data(page, type_filter, symbol_filter, client_id, request))
+
+def get_transaction_log(log, page=1, type_filter="All", symbol_filter="All", rows=None):
+    """Retrieves one page of a session's transaction history, newest first."""
+    tx_type = None if type_filter == "All" else type_filter
+    symbol = None if symbol_filter == "All" else symbol_filter
+    page = max(int(page or 1), 1)
+    total = log.count(tx_type, symbol, upto=rows)
+    pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    page = min(page, pages)
+    data = log.page(page, PAGE_SIZE, tx_type, symbol, upto=rows)
+    return data, f"Page {page} of {pages} ({total} transactions)"
+
+def get_transaction_delta(last_seen_id=-1, client_id=None, request: gr.Request = None):
+    """API: returns only transactions newer than the client's last seen id."""
+    with sessions.session(session_id(client_id, request)) as session:
+        return session.log.delta(int(last_seen_id))
+
+def export_history(client_id=None, request: gr.Request = None):
+    """Streams the session's full transaction history to a Parquet file for download."""
+    with sessions.session(session_id(client_id, request)) as session:
+        path = os.path.join(tempfile.gettempdir(), f"transactions-{session.session_id}.parquet")
+        to_parquet(session.account, path)
+        return path
+
+def sweep_sessions():
+    """Evicts idle sessions and deletes expired ones, every SESSION_SWEEP_INTERVAL seconds."""
+    while True:
+        sessions.evict_idle()
+        sessions.purge_expired()
+        time.sleep(SESSION_SWEEP_INTERVAL)
+
+def get_session_stats():
+    """API: resident sessions, evictions and reload latency."""
+    return sessions.stats()
 
 # Build the Gradio UI
 with gr.Blocks(title="Trading Account Demo", theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 📈 Trading Simulation Platform")
     gr.Markdown("Manage your funds and trade stocks (AAPL, TSLA, GOOGL).")
+    # The browser's account id, kept in local storage (encrypted with
+    # BROWSER_STATE_SECRET, which must stay the same across restarts)
+    client_state = gr.BrowserState(None, storage_key="trading_client_id",
+                                   secret=os.getenv("BROWSER_STATE_SECRET"))
     
     with gr.Row():
         # Left Column: Cash Management
@@ -126,55 +258,75 @@ with gr.Blocks(title="Trading Account Demo", theme=gr.themes.Soft()) as demo:
         )
 
     with gr.Accordion("📜 Transaction History", open=False):
+        with gr.Row():
+            h_type = gr.Dropdown(["All", "DEPOSIT", "WITHDRAWAL", "BUY", "SELL"], label="Type", value="All")
+            h_symbol = gr.Dropdown(["All", "AAPL", "TSLA", "GOOGL"], label="Symbol", value="All")
+            h_page = gr.Number(label="Page", value=1, precision=0, minimum=1)
+        h_info = gr.Markdown()
         d_history = gr.Dataframe(
-            headers=["Time", "Type", "Net Amount", "Symbol", "Quantity", "Price/Share"],
+            headers=HEADERS,
             label="Log",
             interactive=False,
             datatype=["str", "str", "str", "str", "str", "str"]
         )
+        with gr.Row():
+            export_btn = gr.Button("⬇️ Export History (Parquet)")
+            export_file = gr.File(label="Export", interactive=False)
+
+    # API-only endpoint for clients that keep their own copy of the history
+    delta_last_id = gr.Number(value=-1, visible=False)
+    delta_out = gr.JSON(visible=False)
+    delta_btn = gr.Button(visible=False)
+    delta_btn.click(get_transaction_delta, inputs=[delta_last_id, client_state], outputs=[delta_out],
+                    api_name="transaction_delta")
+
+    # API-only endpoint exposing session registry metrics
+    stats_out = gr.JSON(visible=False)
+    stats_btn = gr.Button(visible=False)
+    stats_btn.click(get_session_stats, outputs=[stats_out], api_name="session_stats")
 
     # --- Event Wiring ---
+    history_controls = [h_page, h_type, h_symbol]
+    history_inputs = history_controls + [client_state]
+    dashboard_outputs = [d_balance, d_value, d_pl, d_holdings, d_history, h_info]
 
-    # 1. Cash Button Click
+    # 1. Cash Button Click (operation and dashboard refresh in one round trip)
     cash_btn.click(
-        perform_cash_operation,
-        inputs=[cash_amount, cash_action],
-        outputs=[cash_status]
-    ).success(
-        # Update dashboard after cash op
-        get_dashboard_data,
-        outputs=[d_balance, d_value, d_pl, d_holdings]
-    ).success(
-        # Update history after cash op
-        get_transaction_log,
-        outputs=[d_history]
+        handle_cash_operation,
+        inputs=[cash_amount, cash_action] + history_inputs,
+        outputs=[cash_status] + dashboard_outputs,
+        api_name="cash_operation"
     )
 
     # 2. Trade Button Click
     trade_btn.click(
-        perform_trade_operation,
-        inputs=[trade_symbol, trade_qty, trade_action],
-        outputs=[trade_status]
-    ).success(
-        get_dashboard_data,
-        outputs=[d_balance, d_value, d_pl, d_holdings]
-    ).success(
-        get_transaction_log,
-        outputs=[d_history]
+        handle_trade_operation,
+        inputs=[trade_symbol, trade_qty, trade_action] + history_inputs,
+        outputs=[trade_status] + dashboard_outputs,
+        api_name="trade_operation"
     )
 
     # 3. Refresh Button Click
-    refresh_btn.click(
-        get_dashboard_data,
-        outputs=[d_balance, d_value, d_pl, d_holdings]
-    ).success(
-        get_transaction_log,
-        outputs=[d_history]
-    )
+    refresh_btn.click(get_dashboard_data, inputs=history_inputs, outputs=dashboard_outputs,
+                      api_name="dashboard")
+
+    # 4. Initial Load (plus, in push mode, a long-lived stream of summary updates)
+    loaded = demo.load(assign_client_id, inputs=[client_state], outputs=[client_state])
+    loaded.then(get_dashboard_data, inputs=history_inputs, outputs=dashboard_outputs)
+    if STREAMING:
+        loaded.then(stream_dashboard, inputs=[client_state], outputs=dashboard_outputs[:4],
+                    concurrency_limit=None)
+        demo.unload(close_stream)
+
+    # 5. History paging and filters
+    for control in history_controls:
+        control.change(get_dashboard_data, inputs=history_inputs, outputs=dashboard_outputs)
 
-    # 4. Initial Load
-    demo.load(get_dashboard_data, outputs=[d_balance, d_value, d_pl, d_holdings])
-    demo.load(get_transaction_log, outputs=[d_history])
+    # 6. History export
+    export_btn.click(export_history, inputs=[client_state], outputs=[export_file],
+                     api_name="export_history")
 
 if __name__ == "__main__":
-    demo.launch()
\ No newline at end of file
+    threading.Thread(target=sweep_sessions, name="session-sweeper", daemon=True).start()
+    # The account is thread-safe, so handlers no longer need a single-concurrency queue.
+    demo.queue(default_concurrency_limit=int(os.getenv("GRADIO_CONCURRENCY", "16"))).launch()
\ No newline at end of file
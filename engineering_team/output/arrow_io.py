@@ -0,0 +1,220 @@
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from accounts import (Account, ConcurrentAccount, TransactionLedger, DEFAULT_MONEY_DECIMALS, TRANSACTION_TYPES,
+                      _BUY, _SELL)
+from persistence import RECORD_DTYPE, _apply_records
+
+try:  # optional dependency, only needed for Arrow/Parquet export and import
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Arrow/Parquet support requires pyarrow (pip install pyarrow).")
+
+
+def schema(decimals: int = DEFAULT_MONEY_DECIMALS) -> "pa.Schema":
+    """
+    Arrow schema of exported transactions. `type` and `symbol` are
+    dictionary-encoded; amount and price are 64-bit decimals (the ledger's
+    minor units); symbol, quantity and price are null for cash movements.
+    """
+    _require_pyarrow()
+    money = pa.decimal64(18, decimals)
+    return pa.schema([
+        ("timestamp", pa.timestamp("ns", tz="UTC")),
+        ("type", pa.dictionary(pa.uint8(), pa.string())),
+        ("amount", money),
+        ("symbol", pa.dictionary(pa.int32(), pa.string())),
+        ("quantity", pa.int64()),
+        ("price", money),
+    ])
+
+
+def _buffer(column, start: int, stop: int, zero_copy: bool) -> "pa.Buffer":
+    # A memoryview pins the array: it cannot grow until the view is released.
+    return pa.py_buffer(memoryview(column)[start:stop] if zero_copy else column[start:stop])
+
+
+def iter_record_batches(account: Account, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        zero_copy: bool = False) -> Iterator["pa.RecordBatch"]:
+    """
+    Yields the account's transaction history as Arrow record batches of up to
+    `chunk_rows` rows, so a history of any length is exported in bounded memory.
+    Each chunk's columns are copied out of the ledger. The export covers the
+    rows present when it starts.
+
+    With `zero_copy`, column data is wrapped straight from the ledger's arrays
+    instead (only the small null bitmaps are built). Such a batch, and any
+    array or table built from it without copying, pins the ledger: recording
+    a transaction while one is alive raises BufferError. Only opt in for an
+    account nothing trades on until the batches are released, such as one
+    restored from disk for analysis. It is refused for a ConcurrentAccount.
+    """
+    _require_pyarrow()
+    if zero_copy and isinstance(account, ConcurrentAccount):
+        raise ValueError("zero_copy export would block a ConcurrentAccount's trades.")
+    ledger: TransactionLedger = account.transactions
+    # Rows are read first: any symbol they reference is already interned.
+    stop = len(account.get_transaction_history())
+    types = pa.array(TRANSACTION_TYPES, pa.string())
+    symbols = pa.array(list(ledger.symbols), pa.string())
+    arrow_schema = schema(ledger.decimals)
+    money = arrow_schema.field("amount").type
+
+    for start in range(0, stop, chunk_rows):
+        end = min(start + chunk_rows, stop)
+        n = end - start
+        codes = np.frombuffer(ledger.types[start:end], dtype=np.uint8)
+        traded = (codes == _BUY) | (codes == _SELL)
+        valid = pa.py_buffer(np.packbits(traded, bitorder="little"))
+        nulls = n - int(np.count_nonzero(traded))
+        columns = [
+            pa.Array.from_buffers(pa.timestamp("ns", tz="UTC"), n,
+                                  [None, _buffer(ledger.timestamps, start, end, zero_copy)]),
+            pa.DictionaryArray.from_arrays(
+                pa.Array.from_buffers(pa.uint8(), n, [None, _buffer(ledger.types, start, end, zero_copy)]),
+                types),
+            pa.Array.from_buffers(money, n, [None, _buffer(ledger.amounts, start, end, zero_copy)]),
+            pa.DictionaryArray.from_arrays(
+                pa.Array.from_buffers(pa.int32(), n, [valid, _buffer(ledger.symbol_ids, start, end, zero_copy)],
+                                      null_count=nulls),
+                symbols),
+            pa.Array.from_buffers(pa.int64(), n, [valid, _buffer(ledger.quantities, start, end, zero_copy)],
+                                  null_count=nulls),
+            pa.Array.from_buffers(money, n, [valid, _buffer(ledger.prices, start, end, zero_copy)],
+                                  null_count=nulls),
+        ]
+        yield pa.RecordBatch.from_arrays(columns, schema=arrow_schema)
+
+
+def to_parquet(account: Account, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               compression: str = "zstd") -> int:
+    """
+    Streams the transaction history to a Parquet file, one row group per
+    chunk. Returns the number of rows written.
+    """
+    _require_pyarrow()
+    rows = 0
+    with pq.ParquetWriter(path, schema(account.money_decimals), compression=compression) as writer:
+        for batch in iter_record_batches(account, chunk_rows):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def to_ipc(account: Account, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """
+    Streams the transaction history to an Arrow IPC file (memory-mappable by
+    analytics tools). Returns the number of rows written.
+    """
+    _require_pyarrow()
+    rows = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema(account.money_decimals)) as writer:
+        for batch in iter_record_batches(account, chunk_rows):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def _to_units(column: "pa.Array", decimals: int) -> np.ndarray:
+    """
+    Minor units of a money column, null as 0. Decimals at the ledger's scale
+    are read as-is; anything else is rounded to it.
+    """
+    if pa.types.is_decimal(column.type) and column.type.bit_width == 64 and column.type.scale == decimals:
+        return column.view(pa.int64()).fill_null(0).to_numpy(zero_copy_only=False)
+    values = column.cast(pa.float64()).fill_null(0.0).to_numpy(zero_copy_only=False)
+    return np.round(values * 10 ** decimals).astype(np.int64)
+
+
+def _to_records(ledger: TransactionLedger, batch: "pa.RecordBatch") -> np.ndarray:
+    """
+    Converts one Arrow batch to WAL records, interning its symbols in the ledger.
+    """
+    n = batch.num_rows
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    records["timestamp"] = batch.column("timestamp").cast(pa.int64()).to_numpy()
+    records["amount"] = _to_units(batch.column("amount"), ledger.decimals)
+
+    type_column = batch.column("type")
+    if not pa.types.is_dictionary(type_column.type):
+        type_column = type_column.dictionary_encode()
+    type_codes = np.array([TRANSACTION_TYPES.index(name) for name in type_column.dictionary.to_pylist()],
+                          dtype=np.uint8)
+    records["type"] = type_codes[type_column.indices.to_numpy(zero_copy_only=False)]
+
+    symbol_column = batch.column("symbol")
+    if not pa.types.is_dictionary(symbol_column.type):
+        symbol_column = symbol_column.dictionary_encode()
+    symbol_ids = np.array([ledger.symbol_id(name) for name in symbol_column.dictionary.to_pylist()] or [0],
+                          dtype=np.int32)
+    indices = symbol_column.indices.fill_null(0).to_numpy(zero_copy_only=False)
+    records["symbol_id"] = np.where(symbol_column.is_valid().to_numpy(zero_copy_only=False),
+                                    symbol_ids[indices], -1)
+    records["quantity"] = batch.column("quantity").fill_null(0).to_numpy(zero_copy_only=False)
+    records["price"] = _to_units(batch.column("price"), ledger.decimals)
+    return records
+
+
+def import_batches(account: Account, batches: Iterable["pa.RecordBatch"]) -> int:
+    """
+    Appends exported transactions to an account and folds them into its
+    balances, holdings and tax lots, one batch at a time. Rows are restored as
+    recorded, without re-running trade validation. Rows older than those
+    already in the ledger are kept after them; point-in-time queries replay
+    them by timestamp. Returns the number of rows imported.
+    """
+    _require_pyarrow()
+    lock = account._lock if isinstance(account, ConcurrentAccount) else None
+    if lock is not None:
+        lock.acquire()
+    try:
+        rows = 0
+        for batch in batches:
+            _apply_records(account, _to_records(account.transactions, batch))
+            rows += batch.num_rows
+        if rows:
+            account.rebuild_positions()
+            if account.incremental_valuation and account.holdings:
+                account.mark_to_market()
+        if isinstance(account, ConcurrentAccount):
+            account._publish()
+        return rows
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def read_parquet(path: str, account: Optional[Account] = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Account:
+    """
+    Restores (or seeds) an account from a Parquet file written by
+    to_parquet(), streaming it in chunks. Returns the account.
+    """
+    _require_pyarrow()
+    account = account if account is not None else Account()
+    # Without pre-buffering, only the row group being decoded is held in memory.
+    parquet = pq.ParquetFile(path, pre_buffer=False, buffer_size=1 << 20)
+    import_batches(account, parquet.iter_batches(batch_size=chunk_rows))
+    return account
+
+
+def read_ipc(path: str, account: Optional[Account] = None) -> Account:
+    """
+    Restores (or seeds) an account from an Arrow IPC file written by to_ipc().
+    The file is memory-mapped and read one batch at a time.
+    """
+    _require_pyarrow()
+    account = account if account is not None else Account()
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        import_batches(account, (reader.get_batch(i) for i in range(reader.num_record_batches)))
+    return account
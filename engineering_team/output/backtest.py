@@ -0,0 +1,265 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from accounts import Account, Order
+from price_provider import PriceProvider
+
+# Trading days per year; GBM drift and volatility are annualized.
+TRADING_DAYS = 252
+
+
+def iter_gbm_paths(n_symbols: int, n_steps: int, s0: Union[float, np.ndarray] = 100.0,
+                   mu: Union[float, np.ndarray] = 0.05, sigma: Union[float, np.ndarray] = 0.2,
+                   dt: float = 1.0 / TRADING_DAYS, seed: Optional[int] = None,
+                   chunk_steps: int = 4096) -> Iterator[np.ndarray]:
+    """
+    Generates geometric Brownian motion price paths in (steps x symbols) chunks,
+    so long paths for many symbols never have to fit in memory at once.
+    `s0`, `mu` and `sigma` may be scalars or per-symbol arrays.
+    """
+    rng = np.random.default_rng(seed)
+    drift = (np.asarray(mu, dtype=np.float64) - 0.5 * np.asarray(sigma, dtype=np.float64) ** 2) * dt
+    scale = np.asarray(sigma, dtype=np.float64) * np.sqrt(dt)
+    log_price = np.broadcast_to(np.log(np.asarray(s0, dtype=np.float64)), (n_symbols,)).copy()
+    for start in range(0, n_steps, chunk_steps):
+        steps = min(chunk_steps, n_steps - start)
+        log_returns = drift + scale * rng.standard_normal((steps, n_symbols))
+        chunk = np.cumsum(log_returns, axis=0)
+        chunk += log_price
+        log_price = chunk[-1].copy()
+        yield np.exp(chunk, out=chunk)
+
+
+def gbm_paths(n_symbols: int, n_steps: int, **kwargs) -> np.ndarray:
+    """
+    Returns a (steps x symbols) array of GBM prices; see iter_gbm_paths().
+    """
+    return np.concatenate(list(iter_gbm_paths(n_symbols, n_steps, **kwargs)))
+
+
+def save_paths(path: str, paths: np.ndarray) -> None:
+    """
+    Saves price paths as .npy so workers can memory-map them.
+    """
+    np.save(path, paths)
+
+
+def load_paths(path: str) -> np.ndarray:
+    """
+    Memory-maps price paths saved with save_paths() (or any 2-D .npy file).
+    """
+    paths = np.load(path, mmap_mode="r")
+    if paths.ndim != 2:
+        raise ValueError(f"{path} must hold a 2-D (steps x symbols) array.")
+    return paths
+
+
+class PathPriceProvider(PriceProvider):
+    """
+    Serves the prices of one row (tick) of a price path array; the backtest
+    advances `step` as it goes. Symbols map to columns.
+    """
+    def __init__(self, paths: np.ndarray, symbols: Sequence[str]):
+        self.paths = paths
+        self.symbols = [s.upper() for s in symbols]
+        self._columns = {s: i for i, s in enumerate(self.symbols)}
+        self.step = 0
+
+    def get_share_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        row = self.paths[self.step]
+        columns = self._columns
+        prices = {}
+        for symbol in symbols:
+            column = columns.get(symbol.upper())
+            prices[symbol] = float(row[column]) if column is not None else 0.0
+        return prices
+
+
+class Strategy(ABC):
+    """
+    A trading strategy driven tick by tick. Constructor keyword arguments are
+    the parameters being scanned; a fresh instance is built for every run.
+    """
+    def __init__(self, **params):
+        self.params = params
+
+    def start(self, symbols: List[str], account: Account) -> None:
+        """
+        Called once before the first tick.
+        """
+
+    @abstractmethod
+    def on_tick(self, step: int, prices: np.ndarray, account: Account) -> Optional[Sequence[Order]]:
+        """
+        Receives the prices of every symbol at this tick and returns orders to
+        execute at those prices (or None).
+        """
+
+
+class BuyAndHold(Strategy):
+    """
+    Spends the starting cash equally across every symbol on the first tick.
+    """
+    def start(self, symbols, account):
+        self.symbols = symbols
+
+    def on_tick(self, step, prices, account):
+        if step:
+            return None
+        budget = account.balance / len(self.symbols)
+        return [Order("BUY", symbol, int(budget // price))
+                for symbol, price in zip(self.symbols, prices) if budget >= price]
+
+
+class MovingAverageCrossover(Strategy):
+    """
+    Holds `quantity` shares of each symbol while its fast exponential moving
+    average is above the slow one. Signals are computed for all symbols at once.
+    """
+    def start(self, symbols, account):
+        self.symbols = np.array(symbols, dtype=object)
+        self.fast_alpha = 2.0 / (self.params.get("fast", 10) + 1)
+        self.slow_alpha = 2.0 / (self.params.get("slow", 50) + 1)
+        self.quantity = self.params.get("quantity", 10)
+        self.fast = self.slow = None
+        self.long = np.zeros(len(symbols), dtype=bool)
+
+    def on_tick(self, step, prices, account):
+        if self.fast is None:
+            self.fast = np.array(prices, dtype=np.float64)
+            self.slow = self.fast.copy()
+            return None
+        self.fast += self.fast_alpha * (prices - self.fast)
+        self.slow += self.slow_alpha * (prices - self.slow)
+        signal = self.fast > self.slow
+        changed = np.flatnonzero(signal != self.long)
+        if not len(changed):
+            return None
+        orders = []
+        for i in changed:
+            if signal[i]:
+                orders.append(Order("BUY", self.symbols[i], self.quantity))
+            elif account.holdings.get(self.symbols[i], 0) >= self.quantity:
+                orders.append(Order("SELL", self.symbols[i], self.quantity))
+        self.long = signal
+        return orders
+
+
+@dataclass
+class BacktestResult:
+    """
+    Outcome of one strategy run. A tick is one price of one symbol;
+    `max_drawdown` is the largest fall from a peak, as a fraction of that peak.
+    """
+    params: Dict
+    final_value: float
+    profit_loss: float
+    max_drawdown: float
+    trades: int
+    rejected: int
+    ticks: int
+    seconds: float
+    realized_pnl: float = 0.0
+    equity: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.seconds if self.seconds else 0.0
+
+
+def run_backtest(strategy_class: type, paths: np.ndarray, params: Optional[Dict] = None,
+                 symbols: Optional[Sequence[str]] = None, initial_cash: float = 100_000.0,
+                 account_class: type = Account, record_equity: bool = False) -> BacktestResult:
+    """
+    Runs `strategy_class(**params)` over a (steps x symbols) price array.
+    Orders go through Account.execute_batch (non-atomic), so every Account
+    rule applies and rejected orders are counted rather than raised.
+    """
+    params = params or {}
+    n_steps, n_symbols = paths.shape
+    symbols = [s.upper() for s in symbols] if symbols else [f"S{i}" for i in range(n_symbols)]
+    provider = PathPriceProvider(paths, symbols)
+    account = account_class(price_provider=provider)
+    account.deposit(initial_cash)
+    strategy = strategy_class(**params)
+    strategy.start(symbols, account)
+
+    columns = {s: i for i, s in enumerate(symbols)}
+    trades = rejected = 0
+    peak = initial_cash
+    max_drawdown = 0.0
+    equity = []
+    start = time.perf_counter()
+    for step in range(n_steps):
+        provider.step = step
+        row = np.asarray(paths[step])
+        orders = strategy.on_tick(step, row, account)
+        if orders:
+            for result in account.execute_batch(orders, atomic=False):
+                if result.filled:
+                    trades += 1
+                else:
+                    rejected += 1
+        value = account.balance
+        for symbol, quantity in account.holdings.items():
+            value += quantity * row[columns[symbol]]
+        if value > peak:
+            peak = value
+        elif (peak - value) / peak > max_drawdown:
+            max_drawdown = (peak - value) / peak
+        if record_equity:
+            equity.append(float(value))
+    seconds = time.perf_counter() - start
+
+    final_value = float(value) if n_steps else initial_cash
+    return BacktestResult(
+        params=params,
+        final_value=final_value,
+        profit_loss=final_value - (account.total_deposited - account.total_withdrawn),
+        max_drawdown=float(max_drawdown),
+        trades=trades,
+        rejected=rejected,
+        ticks=n_steps * n_symbols,
+        seconds=seconds,
+        realized_pnl=account.realized_pnl,
+        equity=equity,
+    )
+
+
+# Price paths of the current worker process, set once by _init_worker.
+_worker_paths: Optional[np.ndarray] = None
+
+
+def _init_worker(paths: Union[str, np.ndarray]) -> None:
+    global _worker_paths
+    _worker_paths = load_paths(paths) if isinstance(paths, str) else paths
+
+
+def _run_in_worker(strategy_class: type, params: Dict, kwargs: Dict) -> BacktestResult:
+    return run_backtest(strategy_class, _worker_paths, params, **kwargs)
+
+
+def scan(strategy_class: type, param_grid: Sequence[Dict], paths: Union[str, np.ndarray],
+         processes: Optional[int] = None, **kwargs) -> List[BacktestResult]:
+    """
+    Runs one backtest per parameter set across a process pool (all cores by
+    default) and returns the results in `param_grid` order. `paths` is either
+    an array, sent once to each worker, or a .npy filename that every worker
+    memory-maps. Extra keyword arguments go to run_backtest(). The strategy
+    class must be importable by the workers (defined at module level).
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        data = load_paths(paths) if isinstance(paths, str) else paths
+        return [run_backtest(strategy_class, data, params, **kwargs) for params in param_grid]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(paths,)) as pool:
+        futures = [pool.submit(_run_in_worker, strategy_class, params, kwargs)
+                   for params in param_grid]
+        return [future.result() for future in futures]
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from accounts import Account, Order, OrderResult
+
+ORDER_KINDS = ("LIMIT", "STOP")
+
+# An order has crossed once sign * trigger <= sign * price: sell limits and
+# buy stops trigger at or above their price, buy limits and sell stops at or
+# below. Each heap is keyed on sign * trigger so the next order to trigger is
+# always on top.
+_SIGNS = {
+    ("SELL", "LIMIT"): 1,
+    ("BUY", "STOP"): 1,
+    ("BUY", "LIMIT"): -1,
+    ("SELL", "STOP"): -1,
+}
+
+
+@dataclass
+class RestingOrder:
+    """
+    A limit or stop order waiting in an OrderBook.
+    `status` is OPEN, FILLED, REJECTED or CANCELLED; `result` is set once the
+    order has been sent to the account.
+    """
+    order_id: int
+    side: str
+    symbol: str
+    quantity: int
+    kind: str
+    trigger: float
+    status: str = "OPEN"
+    result: Optional[OrderResult] = None
+
+
+class _Heap:
+    """
+    Min-heap of (key, order id) for one side and kind of one symbol. Cancelled
+    orders are dropped lazily and the heap is compacted once they make up half
+    of it, so cancellation costs O(log n) amortized.
+    """
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.entries: List[Tuple[float, int]] = []
+        self.stale = 0
+
+    def push(self, order: RestingOrder) -> None:
+        heapq.heappush(self.entries, (self.sign * order.trigger, order.order_id))
+
+    def pop_crossed(self, price: float, orders: Dict[int, RestingOrder]) -> List[RestingOrder]:
+        crossed = []
+        entries = self.entries
+        limit = self.sign * price
+        while entries and entries[0][0] <= limit:
+            order = orders.get(heapq.heappop(entries)[1])
+            if order is None:
+                self.stale -= 1  # cancelled
+            else:
+                crossed.append(order)
+        return crossed
+
+    def discard(self, orders: Dict[int, RestingOrder]) -> None:
+        self.stale += 1
+        if self.stale * 2 > len(self.entries):
+            self.entries = [entry for entry in self.entries if entry[1] in orders]
+            heapq.heapify(self.entries)
+            self.stale = 0
+
+
+class OrderBook:
+    """
+    Resting limit and stop orders for one account, matched as prices move.
+
+    Each symbol keeps one heap per side and order kind with price-time
+    priority (best trigger first, then submission order). On a price tick only
+    the orders that have crossed are popped, in O(k log n) for k crossed
+    orders, and they are sent to the account as one non-atomic
+    Account.execute_batch at the tick price, so fills go through the usual
+    validation and ledger. Limit orders fill at that price (which is at or
+    better than the limit); stop orders become market orders. Orders that the
+    account rejects are marked REJECTED.
+
+    The book subscribes to the account's price provider; orders are only
+    evaluated on ticks, not when submitted.
+    """
+    def __init__(self, account: Account, subscribe: bool = True):
+        self.account = account
+        self._books: Dict[str, Dict[Tuple[str, str], _Heap]] = {}
+        self._open: Dict[int, RestingOrder] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self.subscribed = subscribe
+        if subscribe:
+            account.price_provider.subscribe(self.on_price_tick)
+
+    def submit(self, side: str, symbol: str, quantity: int, limit_price: Optional[float] = None,
+               stop_price: Optional[float] = None) -> RestingOrder:
+        """
+        Adds a limit order (`limit_price`) or a stop order (`stop_price`).
+        Symbols are case-insensitive and kept upper-case, like the price provider's.
+        """
+        if side not in ("BUY", "SELL"):
+            raise ValueError(f"Unknown order side '{side}'.")
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        if (limit_price is None) == (stop_price is None):
+            raise ValueError("Exactly one of limit_price and stop_price is required.")
+        kind, trigger = ("LIMIT", limit_price) if limit_price is not None else ("STOP", stop_price)
+        if trigger <= 0.0:
+            raise ValueError("Order price must be positive.")
+        symbol = symbol.upper()
+
+        with self._lock:
+            order = RestingOrder(next(self._ids), side, symbol, quantity, kind, trigger)
+            self._open[order.order_id] = order
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = {key: _Heap(sign) for key, sign in _SIGNS.items()}
+            book[side, kind].push(order)
+            return order
+
+    def cancel(self, order_id: int) -> bool:
+        """
+        Cancels an open order. Returns False if it is no longer open.
+        """
+        with self._lock:
+            order = self._open.pop(order_id, None)
+            if order is None:
+                return False
+            order.status = "CANCELLED"
+            self._books[order.symbol][order.side, order.kind].discard(self._open)
+            return True
+
+    def on_price_tick(self, symbol: str, price: float) -> List[RestingOrder]:
+        """
+        Fills every order of `symbol` crossed by `price`. Returns those orders.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return []
+            triggered = []
+            for kind in ORDER_KINDS:
+                for side in ("SELL", "BUY"):
+                    triggered.extend(book[side, kind].pop_crossed(price, self._open))
+            if not triggered:
+                return []
+            for order in triggered:
+                del self._open[order.order_id]
+
+            results = self.account.execute_batch(
+                [Order(order.side, order.symbol, order.quantity) for order in triggered],
+                atomic=False, prices={symbol: price})
+            for order, result in zip(triggered, results):
+                order.result = result
+                order.status = "FILLED" if result.filled else "REJECTED"
+            return triggered
+
+    def get(self, order_id: int) -> Optional[RestingOrder]:
+        """
+        Returns an open order by id.
+        """
+        return self._open.get(order_id)
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[RestingOrder]:
+        """
+        Returns open orders in submission order, optionally for one symbol.
+        """
+        if symbol is not None:
+            symbol = symbol.upper()
+        with self._lock:
+            return [order for order in self._open.values() if symbol is None or order.symbol == symbol]
+
+    def close(self) -> None:
+        """
+        Stops listening to price ticks.
+        """
+        if self.subscribed:
+            self.account.price_provider.unsubscribe(self.on_price_tick)
+            self.subscribed = False
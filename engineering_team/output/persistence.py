@@ -0,0 +1,405 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+import numpy as np
+
+from accounts import (Account, ConcurrentAccount, TaxLots, TransactionLedger, COST_BASIS_METHODS,
+                      TRANSACTION_TYPES)
+
+# On-disk layout of an AccountStore directory:
+#
+#   wal.<seq>         append-only write-ahead log segment (current one only)
+#   snapshot.bin      account state, symbol table and tax lots, replaced atomically
+#   ledger.<column>   ledger columns, appended at every snapshot
+#
+# The WAL is a sequence of frames. Each frame carries either a batch of
+# fixed-size transaction records or newly interned symbol names, and is
+# protected by a CRC so a torn tail write is detected and dropped on recovery.
+
+_FRAME = struct.Struct("<4sIII")  # magic, item count, body length, crc32(body)
+_RECORDS = b"WALR"
+_SYMBOLS = b"WALS"
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("type", "u1"),
+    ("amount", "<i8"),
+    ("symbol_id", "<i4"),
+    ("quantity", "<i8"),
+    ("price", "<i8"),
+])
+
+# Ledger column attribute and WAL record field of each persisted column.
+_COLUMNS = (
+    ("timestamps", "timestamp"),
+    ("types", "type"),
+    ("amounts", "amount"),
+    ("symbol_ids", "symbol_id"),
+    ("quantities", "quantity"),
+    ("prices", "price"),
+)
+
+# magic, wal seq, rows, balance, deposited, withdrawn (minor units), money decimals, holdings, symbols bytes
+_SNAPSHOT = struct.Struct("<8sQQqqqIII")
+_SNAPSHOT_MAGIC = b"ACCTSNP3"
+_HOLDING = struct.Struct("<iq")
+# Tax lots after the symbols: cost basis method, realized P&L, positions; then per
+# position its symbol id, quantity, cost basis, realized P&L and open lots,
+# followed by that many (quantity, price) pairs.
+_LOTS = struct.Struct("<IqI")
+_POSITION = struct.Struct("<iqqqI")
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+_DEPOSIT, _WITHDRAWAL, _BUY, _SELL = range(len(TRANSACTION_TYPES))
+
+
+class AccountStore:
+    """
+    Durable storage for a single Account.
+
+    Transactions are appended to a binary write-ahead log with group commit:
+    commit() is cheap and only writes a frame once `group_size` transactions are
+    pending (or when flush() is called). `fsync` controls durability of those
+    writes: "always" syncs every frame, "interval" at most every
+    `fsync_interval` seconds, "never" leaves it to the OS. Every
+    `snapshot_interval` transactions the balances, holdings and ledger columns
+    are snapshotted and a fresh WAL segment is started, so recovery maps the
+    snapshot and replays only the WAL tail.
+    """
+    def __init__(self, directory: str, group_size: int = 256, fsync: str = "interval",
+                 fsync_interval: float = 0.05, snapshot_interval: int = 1_000_000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}.")
+        self.directory = directory
+        self.group_size = group_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.snapshot_interval = snapshot_interval
+        self.account: Optional[Account] = None
+        self._wal = None
+        self._wal_seq = 0
+        self._logged_rows = 0
+        self._logged_symbols = 0
+        self._snapshot_rows = 0
+        self._last_fsync = 0.0
+        # Serializes logging when the account is shared between threads.
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "AccountStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def wal_rows(self) -> int:
+        """Transactions recorded since the last snapshot, i.e. replayed from the WAL on open."""
+        return len(self.account.transactions) - self._snapshot_rows
+
+    # --- recovery ---------------------------------------------------------
+
+    def open(self, account_class: type = Account, **account_kwargs) -> Account:
+        """
+        Recovers the account from the latest snapshot plus the WAL tail,
+        or creates a new empty account. Keyword arguments go to `account_class`.
+        """
+        account = account_class(**account_kwargs)
+        lots_rows = self._load_snapshot(account)
+        self._remove_stale_segments()
+        self._replay_wal(account)
+        if len(account.transactions) > lots_rows:
+            # Only trades after the snapshot's tax lots are replayed.
+            account.rebuild_positions(lots_rows)
+        self._logged_rows = len(account.transactions)
+        self._logged_symbols = len(account.transactions.symbols)
+        self._wal = open(self._path(f"wal.{self._wal_seq}"), "ab")
+        if account.incremental_valuation and account.holdings:
+            account.mark_to_market()
+        if isinstance(account, ConcurrentAccount):
+            account._publish()
+        self.account = account
+        return account
+
+    def _load_snapshot(self, account: Account) -> int:
+        """
+        Loads the latest snapshot, if any. Returns the number of ledger rows
+        its tax lots cover: 0 when it has none for the account's cost basis method.
+        """
+        path = self._path("snapshot.bin")
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            (magic, wal_seq, rows, balance, deposited, withdrawn,
+             decimals, n_holdings, symbols_len) = _SNAPSHOT.unpack_from(mm, 0)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not an account snapshot.")
+            if decimals != account.money_decimals:
+                raise ValueError(f"{path} holds money with {decimals} decimals, "
+                                 f"not {account.money_decimals}.")
+            offset = _SNAPSHOT.size
+            holdings = [_HOLDING.unpack_from(mm, offset + i * _HOLDING.size) for i in range(n_holdings)]
+            offset += n_holdings * _HOLDING.size
+            symbols = bytes(mm[offset:offset + symbols_len]).decode("utf-8")
+            lots = bytes(mm[offset + symbols_len:])
+
+        ledger = account.transactions
+        for name in symbols.split("\n") if symbols else []:
+            ledger.symbol_id(name)
+        for attr, _ in _COLUMNS:
+            column = getattr(ledger, attr)
+            nbytes = rows * column.itemsize
+            with open(self._path(f"ledger.{attr}"), "rb") as f:
+                if nbytes:
+                    with mmap.mmap(f.fileno(), nbytes, access=mmap.ACCESS_READ) as mm:
+                        column.frombytes(mm)
+
+        account.balance_units = balance
+        account.total_deposited_units = deposited
+        account.total_withdrawn_units = withdrawn
+        account.holdings = {ledger.symbols[sid]: quantity for sid, quantity in holdings}
+        self._wal_seq = wal_seq
+        self._snapshot_rows = rows
+        return rows if lots and _decode_lots(account, lots) else 0
+
+    def _remove_stale_segments(self) -> None:
+        # Segments older than the snapshot are left behind if we crashed mid-rotation.
+        for name in os.listdir(self.directory):
+            prefix, _, seq = name.partition(".")
+            if prefix == "wal" and seq.isdigit() and int(seq) < self._wal_seq:
+                os.remove(self._path(name))
+
+    def _replay_wal(self, account: Account) -> None:
+        path = self._path(f"wal.{self._wal_seq}")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+
+        chunks = []
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            magic, count, length, crc = _FRAME.unpack_from(data, offset)
+            body = data[offset + _FRAME.size:offset + _FRAME.size + length]
+            if len(body) != length or zlib.crc32(body) != crc or magic not in (_RECORDS, _SYMBOLS):
+                break
+            if magic == _SYMBOLS:
+                for name in body.decode("utf-8").split("\n"):
+                    account.transactions.symbol_id(name)
+            else:
+                chunks.append(np.frombuffer(body, dtype=RECORD_DTYPE, count=count))
+            offset += _FRAME.size + length
+
+        if offset != len(data):
+            # Drop a torn or corrupt tail so new frames append after valid data.
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+        if chunks:
+            _apply_records(account, np.concatenate(chunks))
+
+    # --- logging ----------------------------------------------------------
+
+    def commit(self) -> None:
+        """
+        Logs transactions recorded since the last commit (group commit).
+        """
+        with self._lock:
+            pending = len(self.account.transactions) - self._logged_rows
+            if pending >= self.group_size:
+                self.flush()
+            if self.wal_rows >= self.snapshot_interval:
+                self.snapshot()
+
+    def flush(self, sync: bool = False) -> None:
+        """
+        Writes every pending transaction to the WAL, syncing per the fsync policy
+        (or unconditionally when `sync` is set).
+        """
+        with self._lock:
+            ledger = self.account.transactions
+            frames = []
+            # Rows are read first: any symbol they reference is already interned.
+            rows = len(ledger)
+            symbols = len(ledger.symbols)
+            if symbols > self._logged_symbols:
+                body = "\n".join(ledger.symbols[self._logged_symbols:symbols]).encode("utf-8")
+                frames.append(_frame(_SYMBOLS, symbols - self._logged_symbols, body))
+            if rows > self._logged_rows:
+                body = _encode_records(ledger, self._logged_rows, rows).tobytes()
+                frames.append(_frame(_RECORDS, rows - self._logged_rows, body))
+            if frames:
+                self._wal.write(b"".join(frames))
+                self._wal.flush()
+            self._logged_rows = rows
+            self._logged_symbols = symbols
+            self._sync(sync)
+
+    def _sync(self, force: bool) -> None:
+        now = time.monotonic()
+        if force or self.fsync == "always" or (
+                self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._wal.fileno())
+            self._last_fsync = now
+
+    # --- snapshots --------------------------------------------------------
+
+    def snapshot(self) -> None:
+        """
+        Persists balances, holdings, tax lots and new ledger rows, then starts
+        a new WAL segment.
+        """
+        with self._lock:
+            self.flush(sync=True)
+            # The tax lots must match the snapshot state exactly, so both are
+            # taken under the account's lock when it is shared between threads.
+            with getattr(self.account, "_lock", None) or nullcontext():
+                state = self.account.snapshot()
+                lots = _encode_lots(self.account)
+            ledger = self.account.transactions
+            rows = state.rows
+
+            for attr, _ in _COLUMNS:
+                column = getattr(ledger, attr)
+                with open(self._path(f"ledger.{attr}"), "a+b") as f:
+                    # Discard rows from a snapshot that never completed.
+                    f.truncate(self._snapshot_rows * column.itemsize)
+                    f.write(column[self._snapshot_rows:rows].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            symbol_names = list(ledger.symbols)
+            symbols = "\n".join(symbol_names).encode("utf-8")
+            holdings = b"".join(_HOLDING.pack(ledger.symbol_id(symbol), quantity)
+                                for symbol, quantity in state.holdings.items())
+            header = _SNAPSHOT.pack(_SNAPSHOT_MAGIC, self._wal_seq + 1, rows, state.balance_units,
+                                    state.total_deposited_units, state.total_withdrawn_units,
+                                    self.account.money_decimals, len(state.holdings), len(symbols))
+            tmp = self._path("snapshot.bin.tmp")
+            with open(tmp, "wb") as f:
+                f.write(header + holdings + symbols + lots)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path("snapshot.bin"))
+            _fsync_directory(self.directory)
+
+            old_wal = self._path(f"wal.{self._wal_seq}")
+            self._wal.close()
+            self._wal_seq += 1
+            self._wal = open(self._path(f"wal.{self._wal_seq}"), "ab")
+            os.remove(old_wal)
+            self._snapshot_rows = rows
+            # Rows recorded concurrently after the snapshot state go to the new segment.
+            self._logged_rows = rows
+            self._logged_symbols = len(symbol_names)
+
+    def close(self) -> None:
+        """
+        Flushes and syncs pending transactions and closes the WAL.
+        """
+        with self._lock:
+            if self._wal is not None:
+                self.flush(sync=True)
+                self._wal.close()
+                self._wal = None
+
+
+def _frame(magic: bytes, count: int, body: bytes) -> bytes:
+    return _FRAME.pack(magic, count, len(body), zlib.crc32(body)) + body
+
+
+def _encode_lots(account: Account) -> bytes:
+    ledger = account.transactions
+    parts = [_LOTS.pack(COST_BASIS_METHODS.index(account.cost_basis_method), account.realized_pnl_units,
+                        len(account.positions))]
+    for symbol, lots in account.positions.items():
+        parts.append(_POSITION.pack(ledger.symbol_id(symbol), lots.quantity, lots.cost_basis,
+                                    lots.realized_pnl, len(lots.lots)))
+        if lots.lots:
+            parts.append(np.array(lots.lots, dtype="<i8").tobytes())
+    return b"".join(parts)
+
+
+def _decode_lots(account: Account, data: bytes) -> bool:
+    """
+    Restores the tax lots written by _encode_lots. Returns False, leaving the
+    account's lots empty, if they were kept with another cost basis method.
+    """
+    method, realized, n_positions = _LOTS.unpack_from(data, 0)
+    if COST_BASIS_METHODS[method] != account.cost_basis_method:
+        return False
+    symbols = account.transactions.symbols
+    positions = {}
+    offset = _LOTS.size
+    for _ in range(n_positions):
+        sid, quantity, cost_basis, realized_pnl, n_lots = _POSITION.unpack_from(data, offset)
+        offset += _POSITION.size
+        lots = positions[symbols[sid]] = TaxLots(account.cost_basis_method)
+        lots.quantity, lots.cost_basis, lots.realized_pnl = quantity, cost_basis, realized_pnl
+        if n_lots:
+            pairs = np.frombuffer(data, dtype="<i8", count=2 * n_lots, offset=offset)
+            lots.lots = deque(pairs.reshape(-1, 2).tolist())
+            offset += pairs.nbytes
+    account.positions = positions
+    account.realized_pnl_units = realized
+    return True
+
+
+def _encode_records(ledger: TransactionLedger, start: int, stop: int) -> np.ndarray:
+    records = np.empty(stop - start, dtype=RECORD_DTYPE)
+    for attr, field in _COLUMNS:
+        # Slice first: a NumPy view of the live array would block concurrent appends.
+        chunk = getattr(ledger, attr)[start:stop]
+        records[field] = np.frombuffer(chunk, dtype=RECORD_DTYPE[field])
+    return records
+
+
+def _apply_records(account: Account, records: np.ndarray) -> None:
+    """
+    Appends replayed records to the ledger and folds them into the account state.
+    Amounts are integer minor units, so vectorized sums match the live values exactly.
+    """
+    ledger = account.transactions
+    for attr, field in _COLUMNS:
+        getattr(ledger, attr).frombytes(np.ascontiguousarray(records[field]).tobytes())
+
+    types = records["type"]
+    amounts = records["amount"]
+    account.balance_units += int(amounts.sum())
+    account.total_deposited_units += int(amounts[types == _DEPOSIT].sum())
+    account.total_withdrawn_units -= int(amounts[types == _WITHDRAWAL].sum())
+
+    is_buy = types == _BUY
+    is_sell = types == _SELL
+    traded = is_buy | is_sell
+    delta = np.zeros(len(ledger.symbols), dtype=np.int64)
+    np.add.at(delta, records["symbol_id"][traded],
+              np.where(is_buy, records["quantity"], -records["quantity"])[traded])
+    holdings: Dict[str, int] = dict(account.holdings)
+    for sid in np.flatnonzero(delta):
+        symbol = ledger.symbols[sid]
+        quantity = holdings.get(symbol, 0) + int(delta[sid])
+        if quantity:
+            holdings[symbol] = quantity
+        else:
+            holdings.pop(symbol, None)
+    account.holdings = holdings
+
+
+def _fsync_directory(directory: str) -> None:
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
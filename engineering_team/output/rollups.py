@@ -0,0 +1,313 @@
+import bisect
+import datetime
+import threading
+from typing import Dict, List, Tuple, Union
+
+from accounts import TransactionLedger, _datetime_to_ns, _BUY, _DEPOSIT, _WITHDRAWAL
+
+Timestamp = Union[datetime.datetime, int, None]
+
+# Prefix-summed per-bucket series kept for the whole ledger.
+_SERIES = ("deposits", "withdrawals", "bought", "sold")
+
+
+class _SymbolSeries:
+    """
+    Running totals of one symbol's trades, per time bucket it traded in.
+    """
+    def __init__(self):
+        self.buckets: List[int] = []
+        self.shares: List[int] = []  # cumulative shares bought + sold
+        self.notional: List[int] = []  # cumulative traded value, minor units
+
+    def add(self, bucket: int, quantity: int, value: int) -> None:
+        if self.buckets and self.buckets[-1] == bucket:
+            self.shares[-1] += quantity
+            self.notional[-1] += value
+            return
+        self.buckets.append(bucket)
+        self.shares.append((self.shares[-1] if self.shares else 0) + quantity)
+        self.notional.append((self.notional[-1] if self.notional else 0) + value)
+
+    def between(self, first: int, stop: int) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.buckets, first)
+        hi = bisect.bisect_left(self.buckets, stop)
+        if lo == hi:
+            return 0, 0
+        shares = self.shares[hi - 1] - (self.shares[lo - 1] if lo else 0)
+        notional = self.notional[hi - 1] - (self.notional[lo - 1] if lo else 0)
+        return shares, notional
+
+
+class LedgerRollups:
+    """
+    Per-symbol and per-time-bucket aggregates over a TransactionLedger.
+
+    Like TransactionLog, every query first folds in only the rows appended
+    since the previous one (O(1) per row), so the rollups stay current however
+    the ledger grew, including rows restored from disk. Buckets are
+    `bucket_seconds` wide and aligned to the Unix epoch (UTC days by default).
+    Totals are stored as prefix sums, so range queries cost O(log buckets)
+    per series or symbol regardless of how many rows fall in the range. Like
+    the ledger they are kept in integer minor units, so they are exact and
+    match a full recompute; queries return floats.
+
+    Ranges are [start, end) and resolved at bucket granularity: a bucket is
+    included when it overlaps the range; buckets are reported by their UTC
+    start. P&L is measured against each symbol's last traded price, as in
+    Account.get_profit_loss_at().
+
+    Rows are folded in bucket order, ledger order within a bucket. Ledger
+    timestamps normally only grow, but one stamped before the newest bucket
+    (after the clock stepped back, say) makes the next refresh rebuild the
+    rollups from the whole ledger in that order. verify() recomputes
+    everything from the ledger for tests.
+    """
+    def __init__(self, ledger: TransactionLedger, bucket_seconds: int = 86_400):
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive.")
+        self.ledger = ledger
+        self.scale = ledger.scale
+        self.bucket_ns = bucket_seconds * 1_000_000_000
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.rows = 0
+        self.buckets: List[int] = []
+        self.totals: Dict[str, List[int]] = {name: [] for name in _SERIES}
+        self.equity: List[int] = []  # account value at each bucket's last row
+        self.net_invested: List[int] = []
+        self.symbols: Dict[str, _SymbolSeries] = {}
+
+        # Running state folded from the ledger, for bucket-close equity.
+        self._balance = 0
+        self._holdings: Dict[str, int] = {}
+        self._marks: Dict[str, int] = {}
+        self._holdings_value = 0
+
+    def refresh(self) -> int:
+        """
+        Folds in rows appended since the last call. Returns the number of rows covered.
+        """
+        with self._lock:
+            ledger = self.ledger
+            stop = len(ledger)
+            for row in range(self.rows, stop):
+                if not self._fold(ledger, row):
+                    self._rebuild(ledger, stop)
+                    break
+            self.rows = stop
+            return stop
+
+    def _rebuild(self, ledger: TransactionLedger, stop: int) -> None:
+        self._reset()
+        self.rebuilds += 1
+        bucket_ns = self.bucket_ns
+        for row in sorted(range(stop), key=lambda row: ledger.timestamps[row] // bucket_ns):
+            self._fold(ledger, row)
+
+    def _fold(self, ledger: TransactionLedger, row: int) -> bool:
+        """
+        Folds one row into the newest bucket or a new one. Returns False,
+        changing nothing, if the row belongs before the newest bucket.
+        """
+        bucket = ledger.timestamps[row] // self.bucket_ns
+        if not self.buckets or self.buckets[-1] < bucket:
+            self._open_bucket(bucket)
+        elif self.buckets[-1] > bucket:
+            return False
+
+        code = ledger.types[row]
+        amount = ledger.amounts[row]
+        self._balance += amount
+        totals = self.totals
+        if code == _DEPOSIT:
+            totals["deposits"][-1] += amount
+            self.net_invested[-1] += amount
+        elif code == _WITHDRAWAL:
+            totals["withdrawals"][-1] -= amount
+            self.net_invested[-1] += amount
+        else:
+            symbol = ledger.symbols[ledger.symbol_ids[row]]
+            quantity = ledger.quantities[row]
+            price = ledger.prices[row]
+            value = quantity * price
+            totals["bought" if code == _BUY else "sold"][-1] += value
+            series = self.symbols.get(symbol)
+            if series is None:
+                series = self.symbols[symbol] = _SymbolSeries()
+            series.add(bucket, quantity, value)
+
+            old = self._holdings.get(symbol, 0)
+            new = old + quantity if code == _BUY else old - quantity
+            self._holdings_value += new * price - old * self._marks.get(symbol, 0)
+            if new:
+                self._holdings[symbol] = new
+                self._marks[symbol] = price
+            else:
+                self._holdings.pop(symbol, None)
+                self._marks.pop(symbol, None)
+        self.equity[-1] = self._balance + self._holdings_value
+        return True
+
+    def _open_bucket(self, bucket: int) -> None:
+        # Each series is cumulative, so a new bucket starts from the previous total.
+        self.buckets.append(bucket)
+        for values in self.totals.values():
+            values.append(values[-1] if values else 0)
+        self.net_invested.append(self.net_invested[-1] if self.net_invested else 0)
+        self.equity.append(self.equity[-1] if self.equity else 0)
+
+    def _range(self, start: Timestamp, end: Timestamp) -> Tuple[int, int]:
+        """
+        Bucket ids [first, stop) covering [start, end).
+        """
+        first = -(2 ** 63) if start is None else _to_ns(start) // self.bucket_ns
+        stop = 2 ** 63 if end is None else -(-_to_ns(end) // self.bucket_ns)
+        return first, stop
+
+    def _slice(self, start: Timestamp, end: Timestamp) -> Tuple[int, int]:
+        first, stop = self._range(start, end)
+        return bisect.bisect_left(self.buckets, first), bisect.bisect_left(self.buckets, stop)
+
+    def _total(self, name: str, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return 0
+        values = self.totals[name]
+        return values[hi - 1] - (values[lo - 1] if lo else 0)
+
+    def volume_by_symbol(self, start: Timestamp = None, end: Timestamp = None) -> Dict[str, int]:
+        """
+        Returns shares traded (bought + sold) per symbol in [start, end).
+        """
+        self.refresh()
+        first, stop = self._range(start, end)
+        volumes = {}
+        for symbol, series in self.symbols.items():
+            shares, _ = series.between(first, stop)
+            if shares:
+                volumes[symbol] = shares
+        return volumes
+
+    def notional_by_symbol(self, start: Timestamp = None, end: Timestamp = None) -> Dict[str, float]:
+        """
+        Returns traded value per symbol in [start, end).
+        """
+        self.refresh()
+        first, stop = self._range(start, end)
+        notional = {}
+        for symbol, series in self.symbols.items():
+            shares, value = series.between(first, stop)
+            if shares:
+                notional[symbol] = value / self.scale
+        return notional
+
+    def turnover(self, start: Timestamp = None, end: Timestamp = None) -> float:
+        """
+        Returns the total value bought and sold in [start, end).
+        """
+        self.refresh()
+        lo, hi = self._slice(start, end)
+        return (self._total("bought", lo, hi) + self._total("sold", lo, hi)) / self.scale
+
+    def cashflow_by_bucket(self, start: Timestamp = None,
+                           end: Timestamp = None) -> List[Tuple[datetime.datetime, float, float, float]]:
+        """
+        Returns (bucket start, deposits, withdrawals, net) for every bucket with
+        activity in [start, end).
+        """
+        self.refresh()
+        lo, hi = self._slice(start, end)
+        deposits, withdrawals = self.totals["deposits"], self.totals["withdrawals"]
+        scale = self.scale
+        rows = []
+        for i in range(lo, hi):
+            deposited = deposits[i] - (deposits[i - 1] if i else 0)
+            withdrawn = withdrawals[i] - (withdrawals[i - 1] if i else 0)
+            rows.append((self._bucket_start(i), deposited / scale, withdrawn / scale,
+                         (deposited - withdrawn) / scale))
+        return rows
+
+    def pnl_by_bucket(self, start: Timestamp = None,
+                      end: Timestamp = None) -> List[Tuple[datetime.datetime, float]]:
+        """
+        Returns (bucket start, profit/loss made during the bucket) for every
+        bucket with activity in [start, end): the change in account value less
+        the cash deposited or withdrawn.
+        """
+        self.refresh()
+        lo, hi = self._slice(start, end)
+        rows = []
+        for i in range(lo, hi):
+            pnl = self.equity[i] - self.net_invested[i]
+            if i:
+                pnl -= self.equity[i - 1] - self.net_invested[i - 1]
+            rows.append((self._bucket_start(i), pnl / self.scale))
+        return rows
+
+    def _bucket_start(self, i: int) -> datetime.datetime:
+        seconds = self.buckets[i] * self.bucket_ns // 1_000_000_000
+        return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+    def verify(self) -> None:
+        """
+        Recomputes every aggregate with a plain pass over the ledger (no prefix
+        sums, no incremental valuation) and raises AssertionError if any rollup
+        differs.
+        """
+        self.refresh()
+        ledger = self.ledger
+        totals: Dict[int, List[int]] = {}
+        volumes: Dict[Tuple[str, int], List[int]] = {}
+        equity: Dict[int, int] = {}
+        invested: Dict[int, int] = {}
+        balance = net_invested = 0
+        holdings: Dict[str, int] = {}
+        marks: Dict[str, int] = {}
+        for row in sorted(range(self.rows), key=lambda row: ledger.timestamps[row] // self.bucket_ns):
+            bucket = ledger.timestamps[row] // self.bucket_ns
+            bucket_totals = totals.setdefault(bucket, [0] * len(_SERIES))
+            code = ledger.types[row]
+            amount = ledger.amounts[row]
+            balance += amount
+            if code in (_DEPOSIT, _WITHDRAWAL):
+                net_invested += amount
+                bucket_totals[0 if code == _DEPOSIT else 1] += abs(amount)
+            else:
+                symbol = ledger.symbols[ledger.symbol_ids[row]]
+                quantity = ledger.quantities[row]
+                price = ledger.prices[row]
+                bucket_totals[2 if code == _BUY else 3] += quantity * price
+                volume = volumes.setdefault((symbol, bucket), [0, 0])
+                volume[0] += quantity
+                volume[1] += quantity * price
+                holdings[symbol] = holdings.get(symbol, 0) + (quantity if code == _BUY else -quantity)
+                marks[symbol] = price
+            equity[bucket] = balance + sum(q * marks[s] for s, q in holdings.items())
+            invested[bucket] = net_invested
+
+        if list(totals) != self.buckets:
+            raise AssertionError("Rollup buckets differ from a full recompute.")
+        checks = []
+        for i, bucket in enumerate(self.buckets):
+            for j, name in enumerate(_SERIES):
+                checks.append((f"{name}[{i}]", self._total(name, i, i + 1), totals[bucket][j]))
+            checks.append((f"equity[{i}]", self.equity[i], equity[bucket]))
+            checks.append((f"net_invested[{i}]", self.net_invested[i], invested[bucket]))
+        if sorted(self.symbols) != sorted({symbol for symbol, _ in volumes}):
+            raise AssertionError("Rollup symbols differ from a full recompute.")
+        for symbol, series in self.symbols.items():
+            for k, bucket in enumerate(series.buckets):
+                shares, notional = series.between(bucket, bucket + 1)
+                expected_shares, expected_notional = volumes[symbol, bucket]
+                checks.append((f"{symbol} shares[{k}]", shares, expected_shares))
+                checks.append((f"{symbol} notional[{k}]", notional, expected_notional))
+        for name, actual, expected in checks:
+            if actual != expected:
+                raise AssertionError(f"Rollup {name} {actual!r} != recomputed {expected!r}")
+
+
+def _to_ns(value: Union[datetime.datetime, int]) -> int:
+    return _datetime_to_ns(value) if isinstance(value, datetime.datetime) else value
@@ -0,0 +1,272 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from accounts import Account, ConcurrentAccount
+from persistence import AccountStore
+from transaction_log import TransactionLog
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+@dataclass
+class Session:
+    """A resident session: its account, durable store and formatted history."""
+    session_id: str
+    store: AccountStore
+    account: Account
+    log: TransactionLog
+    last_used: float
+    pins: int = 0
+
+
+class SessionRegistry:
+    """
+    Per-session accounts with bounded memory.
+
+    At most `max_resident` sessions are kept in memory; the least recently used
+    one is evicted beyond that, and sessions idle for more than `idle_timeout`
+    seconds are evicted as well. Each session's account lives in its own
+    AccountStore directory under `directory`; eviction closes the store (the
+    WAL is already on disk) and drops the account from memory, so the next
+    request for that session reloads it from disk. Sessions with at least
+    `compact_rows` transactions in their WAL are snapshotted first, keeping
+    reloads cheap. Sessions that never recorded a transaction leave nothing on
+    disk, and purge_expired() deletes the directories of sessions nobody has
+    written to for `retention` seconds.
+
+    Use session() to work with an account: a session is pinned while the
+    context is open and is never evicted under a running request. Stores are
+    opened, snapshotted and closed outside the registry lock, so a slow
+    session never holds up requests for the others; a request for a session
+    that is being loaded or closed waits for that to finish.
+    """
+    def __init__(self, directory: str, max_resident: int = 1000, idle_timeout: float = 900.0,
+                 account_class: type = ConcurrentAccount, group_size: int = 1,
+                 compact_rows: int = 4096, retention: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, **account_kwargs):
+        if max_resident < 1:
+            raise ValueError("max_resident must be at least 1.")
+        self.directory = directory
+        self.max_resident = max_resident
+        self.idle_timeout = idle_timeout
+        self.account_class = account_class
+        self.group_size = group_size
+        self.compact_rows = compact_rows
+        self.retention = retention
+        self.clock = clock
+        self.account_kwargs = account_kwargs
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Session id -> future resolved when its load, eviction or purge finishes
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self.created = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.eviction_errors = 0
+        self.purged = 0
+        self._reload_seconds = 0.0
+        self._reload_seconds_max = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Session]:
+        """
+        Yields the session, loading or creating it as needed, and keeps it
+        resident until the block exits.
+        """
+        session = self._acquire(session_id)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.pins -= 1
+                session.last_used = self.clock()
+                self._sessions.move_to_end(session.session_id)
+                victims = self._take_excess()
+            self._evict(victims)
+
+    def _acquire(self, session_id: str) -> Session:
+        """
+        Returns the session pinned, opening its store outside the lock if it is
+        not resident.
+        """
+        path = self._path(session_id)
+        while True:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is not None:
+                    self._sessions.move_to_end(session_id)
+                    session.last_used = self.clock()
+                    session.pins += 1
+                    return session
+                pending = self._pending.get(session_id)
+                if pending is None:
+                    pending = self._pending[session_id] = Future()
+                    break
+            wait([pending])
+
+        try:
+            reloading = os.path.isdir(path)
+            start = time.perf_counter()
+            store = AccountStore(path, group_size=self.group_size)
+            account = store.open(account_class=self.account_class, **self.account_kwargs)
+        except BaseException:
+            with self._lock:
+                del self._pending[session_id]
+            pending.set_result(None)
+            raise
+        session = Session(session_id, store, account, TransactionLog(account), self.clock(), pins=1)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            del self._pending[session_id]
+            if reloading:
+                self.reloads += 1
+                self._reload_seconds += elapsed
+                self._reload_seconds_max = max(self._reload_seconds_max, elapsed)
+            else:
+                self.created += 1
+            self._sessions[session_id] = session
+        pending.set_result(None)
+        return session
+
+    def _take_excess(self) -> List[Tuple[Session, Future]]:
+        """
+        Takes idle sessions and, beyond `max_resident`, the least recently used
+        ones out of the registry, for _evict() once the lock is released.
+        """
+        deadline = self.clock() - self.idle_timeout
+        excess = len(self._sessions) - self.max_resident
+        victims = []
+        for session in self._sessions.values():
+            if len(victims) >= excess and session.last_used > deadline:
+                break  # sessions are ordered by last use
+            if not session.pins:
+                victims.append(session)
+        return [self._take(session) for session in victims]
+
+    def _take(self, session: Session) -> Tuple[Session, Future]:
+        del self._sessions[session.session_id]
+        pending = self._pending[session.session_id] = Future()
+        return session, pending
+
+    def evict_idle(self) -> int:
+        """
+        Evicts every unpinned session idle for longer than `idle_timeout`.
+        Returns the number evicted.
+        """
+        with self._lock:
+            victims = self._take_excess()
+        self._evict(victims)
+        return len(victims)
+
+    def _evict(self, victims: List[Tuple[Session, Future]]) -> None:
+        """
+        Spills each victim to disk. A victim whose cleanup fails is logged and
+        counted in `eviction_errors`; the others are still evicted, and every
+        victim's pending future is resolved so requests for it reopen its store.
+        """
+        for session, pending in victims:
+            failed = False
+            try:
+                account = session.account
+                if account.incremental_valuation:
+                    account.price_provider.unsubscribe(account.on_price_tick)
+                store = session.store
+                if store.wal_rows >= self.compact_rows:
+                    store.snapshot()
+                store.close()
+                if not len(account.transactions):
+                    shutil.rmtree(store.directory, ignore_errors=True)
+            except Exception:
+                failed = True
+                logger.exception("Evicting session %s failed", session.session_id)
+            finally:
+                with self._lock:
+                    del self._pending[session.session_id]
+                    if failed:
+                        self.eviction_errors += 1
+                    else:
+                        self.evictions += 1
+                pending.set_result(None)
+
+    def purge_expired(self) -> int:
+        """
+        Deletes stored sessions that are not resident and were last written
+        more than `retention` seconds ago. Returns the number deleted.
+        """
+        if self.retention is None:
+            return 0
+        deadline = time.time() - self.retention
+        purged = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or not _SESSION_ID.match(entry.name):
+                continue
+            if _last_modified(entry.path) > deadline:
+                continue
+            with self._lock:
+                if entry.name in self._sessions or entry.name in self._pending:
+                    continue
+                pending = self._pending[entry.name] = Future()
+            shutil.rmtree(entry.path, ignore_errors=True)
+            with self._lock:
+                del self._pending[entry.name]
+                self.purged += 1
+            pending.set_result(None)
+            purged += 1
+        return purged
+
+    def close(self) -> None:
+        """
+        Spills every resident session to disk.
+        """
+        with self._lock:
+            victims = [self._take(session) for session in list(self._sessions.values())]
+        self._evict(victims)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns resident/created/reloaded/evicted/failed eviction/purged counts and reload latency.
+        """
+        with self._lock:
+            return {
+                'resident': len(self._sessions),
+                'created': self.created,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'eviction_errors': self.eviction_errors,
+                'purged': self.purged,
+                'reload_ms_avg': 1000 * self._reload_seconds / self.reloads if self.reloads else 0.0,
+                'reload_ms_max': 1000 * self._reload_seconds_max,
+            }
+
+
+def _last_modified(path: str) -> float:
+    """
+    Latest modification time of a session directory and the files in it.
+    """
+    latest = os.path.getmtime(path)
+    for entry in os.scandir(path):
+        latest = max(latest, entry.stat().st_mtime)
+    return latest
@@ -0,0 +1,255 @@
+import asyncio
+import multiprocessing
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from accounts import Account
+from price_provider import StubPriceProvider
+
+AccountId = Union[int, str]
+Request = Tuple[AccountId, str, tuple]
+Reply = Tuple[bool, Any]
+
+# Operations a shard accepts, by name. Mutations return None; errors come back
+# as (False, message) and are raised as ValueError by the clients. A shard
+# whose worker has died fails its calls with ConnectionError.
+OPS = {
+    "deposit": Account.deposit,
+    "withdraw": Account.withdraw,
+    "buy": Account.buy,
+    "sell": Account.sell,
+    "get_balance": lambda account: account.balance,
+    "get_holdings": lambda account: dict(account.holdings),
+    "get_portfolio_value": Account.get_portfolio_value,
+    "get_profit_loss": Account.get_profit_loss,
+}
+
+
+def _serve(conn, prices: Optional[Dict[str, float]]) -> None:
+    """
+    Shard worker loop: owns the accounts routed to it and answers one batch
+    of requests per message, replies in request order.
+    """
+    provider = StubPriceProvider(prices)
+    accounts: Dict[AccountId, Account] = {}
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+        replies: List[Reply] = []
+        for account_id, op, args in batch:
+            account = accounts.get(account_id)
+            if account is None:
+                account = accounts[account_id] = Account(price_provider=provider)
+            func = OPS.get(op)
+            if func is None:
+                replies.append((False, f"Unknown operation '{op}'."))
+                continue
+            try:
+                replies.append((True, func(account, *args)))
+            except ValueError as e:
+                replies.append((False, str(e)))
+            except Exception as e:
+                # Any other failure is also the request's error; the shard keeps serving.
+                replies.append((False, repr(e)))
+        conn.send(replies)
+    conn.close()
+
+
+def shard_of(account_id: AccountId, n_shards: int) -> int:
+    """
+    Stable shard index of an account id (the same in every process).
+    """
+    if isinstance(account_id, int):
+        return account_id % n_shards
+    return zlib.crc32(account_id.encode("utf-8")) % n_shards
+
+
+class ShardedAccountService:
+    """
+    Accounts partitioned by id across worker processes, one process per shard.
+
+    Each shard owns the Account objects routed to it and runs its own
+    interpreter, so shards execute in parallel on separate cores. The router
+    talks to each shard over a pipe, sending batches of (account_id, op, args)
+    requests as one message and receiving one message of replies, so the
+    per-message overhead is paid once per batch rather than per operation.
+    Use either execute()/call() or one AsyncShardClient, not both at once:
+    they share the pipes.
+    """
+    def __init__(self, n_shards: int, prices: Optional[Dict[str, float]] = None,
+                 mp_context: Optional[str] = None):
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1.")
+        context = multiprocessing.get_context(mp_context)
+        self.n_shards = n_shards
+        self.connections = []
+        self.processes = []
+        for _ in range(n_shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child, prices), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def __enter__(self) -> "ShardedAccountService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def shard_of(self, account_id: AccountId) -> int:
+        return shard_of(account_id, self.n_shards)
+
+    def execute(self, requests: Sequence[Request]) -> List[Reply]:
+        """
+        Runs a batch of (account_id, op, args) requests across all shards in
+        parallel and returns one (ok, value_or_error_message) reply per request,
+        in request order. Requests for the same account run in order.
+        """
+        positions: List[List[int]] = [[] for _ in range(self.n_shards)]
+        batches: List[List[Request]] = [[] for _ in range(self.n_shards)]
+        for i, request in enumerate(requests):
+            shard = self.shard_of(request[0])
+            positions[shard].append(i)
+            batches[shard].append(request)
+
+        for shard, batch in enumerate(batches):
+            if batch:
+                self.connections[shard].send(batch)
+        replies: List[Optional[Reply]] = [None] * len(requests)
+        for shard, batch in enumerate(batches):
+            if batch:
+                for i, reply in zip(positions[shard], self.connections[shard].recv()):
+                    replies[i] = reply
+        return replies
+
+    def call(self, account_id: AccountId, op: str, *args) -> Any:
+        """
+        Runs one request and returns its value, raising ValueError on failure.
+        """
+        ok, value = self.execute([(account_id, op, args)])[0]
+        if not ok:
+            raise ValueError(value)
+        return value
+
+    def close(self) -> None:
+        """
+        Stops every shard worker.
+        """
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+
+class AsyncShardClient:
+    """
+    asyncio front end for a ShardedAccountService. Concurrent calls made
+    during one event-loop iteration are coalesced into one batch per shard,
+    and replies are read as each shard's pipe becomes readable, so one event
+    loop can keep every shard busy. Each shard has at most one batch in
+    flight; calls arriving meanwhile queue up and go out together as the next
+    batch, so batches grow with load. Use a client from a single event loop.
+    """
+    def __init__(self, service: ShardedAccountService):
+        self.service = service
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued: List[List[Tuple[Request, asyncio.Future]]] = [[] for _ in range(service.n_shards)]
+        self._in_flight: List[Optional[List[asyncio.Future]]] = [None] * service.n_shards
+        self._down: Set[int] = set()
+        self._flush_scheduled = False
+
+    def _attach(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                raise RuntimeError("AsyncShardClient is bound to another event loop.")
+            self._loop = loop
+            for shard, conn in enumerate(self.service.connections):
+                if shard not in self._down:
+                    loop.add_reader(conn.fileno(), self._on_reply, shard)
+        return loop
+
+    async def call(self, account_id: AccountId, op: str, *args) -> Any:
+        """
+        Runs one request on its account's shard; raises ValueError on failure,
+        or ConnectionError if the shard's worker is gone.
+        """
+        loop = self._attach()
+        shard = self.service.shard_of(account_id)
+        if shard in self._down:
+            raise ConnectionError(f"Shard {shard} is down.")
+        future = loop.create_future()
+        self._queued[shard].append(((account_id, op, args), future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        for shard in range(self.service.n_shards):
+            self._send(shard)
+
+    def _send(self, shard: int) -> None:
+        queued = self._queued[shard]
+        if not queued or self._in_flight[shard] is not None:
+            return
+        self._queued[shard] = []
+        self._in_flight[shard] = [future for _, future in queued]
+        try:
+            self.service.connections[shard].send([request for request, _ in queued])
+        except OSError:
+            self._shard_down(shard)
+
+    def _on_reply(self, shard: int) -> None:
+        try:
+            replies = self.service.connections[shard].recv()
+        except (EOFError, OSError):
+            self._shard_down(shard)
+            return
+        futures = self._in_flight[shard]
+        self._in_flight[shard] = None
+        for future, (ok, value) in zip(futures, replies):
+            if future.cancelled():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(ValueError(value))
+        self._send(shard)
+
+    def _shard_down(self, shard: int) -> None:
+        """
+        Stops reading a shard whose worker has gone and fails every call
+        in flight or queued for it.
+        """
+        self._down.add(shard)
+        self._loop.remove_reader(self.service.connections[shard].fileno())
+        futures = (self._in_flight[shard] or []) + [future for _, future in self._queued[shard]]
+        self._in_flight[shard] = None
+        self._queued[shard] = []
+        for future in futures:
+            if not future.done():
+                future.set_exception(ConnectionError(f"Shard {shard} is down."))
+
+    def close(self) -> None:
+        """
+        Detaches from the event loop (the service itself stays up).
+        """
+        if self._loop is not None:
+            for shard, conn in enumerate(self.service.connections):
+                if shard not in self._down:
+                    self._loop.remove_reader(conn.fileno())
+            self._loop = None
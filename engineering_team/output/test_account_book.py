@@ -0,0 +1,118 @@
+import random
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from accounts import Account
+from account_book import (
+    AccountBook, OK, OP_DEPOSIT, OP_WITHDRAW, OP_BUY, OP_SELL,
+    ERR_NON_POSITIVE, ERR_INSUFFICIENT_FUNDS, ERR_INSUFFICIENT_HOLDINGS, ERR_INVALID_SYMBOL, ERR_OUT_OF_RANGE,
+)
+
+PRICES = {'AAPL': 150.0, 'TSLA': 200.0, 'GOOGL': 2800.0}
+
+
+class TestAccountBook(unittest.TestCase):
+    def setUp(self):
+        self.book = AccountBook(3, ['AAPL', 'TSLA', 'GOOGL'])
+        self.prices = np.array([150.0, 200.0, 2800.0])
+
+    def test_deposit_and_withdraw(self):
+        errors = self.book.deposit([0, 1, 2], [100.0, -5.0, 50.0])
+        self.assertEqual(list(errors), [OK, ERR_NON_POSITIVE, OK])
+        errors = self.book.withdraw([0, 2], [40.0, 60.0])
+        self.assertEqual(list(errors), [OK, ERR_INSUFFICIENT_FUNDS])
+        self.assertEqual(list(self.book.balance), [60.0, 0.0, 50.0])
+        self.assertEqual(list(self.book.total_withdrawn), [40.0, 0.0, 0.0])
+
+    def test_trades(self):
+        self.book.deposit([0, 1], [1000.0, 100.0])
+        aapl, tsla = self.book.symbol_ids(['AAPL', 'tsla'])
+        errors = self.book.buy([0, 1, 0], [aapl, tsla, -1], [2, 1, 1], prices=self.prices)
+        self.assertEqual(list(errors), [OK, ERR_INSUFFICIENT_FUNDS, ERR_INVALID_SYMBOL])
+        errors = self.book.sell([0, 0], [aapl, aapl], [1, 5], prices=self.prices)
+        self.assertEqual(list(errors), [OK, ERR_INSUFFICIENT_HOLDINGS])
+        self.assertEqual(self.book.balance[0], 850.0)
+        self.assertEqual(self.book.holdings[0, aapl], 1)
+
+    def test_balances_are_exact_minor_units(self):
+        self.book.deposit([0, 0, 0], [0.1, 0.1, 0.1])
+        self.book.withdraw([0], [0.3])
+        self.assertEqual(self.book.balance_units.dtype, np.int64)
+        self.assertEqual(self.book.balance[0], 0.0)
+        self.assertEqual(self.book.total_deposited_units[0], 3000)
+        self.assertEqual(list(self.book.deposit([1, 1], [0.00005, 0.00015])), [ERR_NON_POSITIVE, OK])
+
+    def test_amounts_beyond_int64_are_rejected(self):
+        self.book.deposit([0], [100.0])
+        errors = self.book.deposit([0, 1, 2], [1e300, 9e14, -1e300])
+        self.assertEqual(list(errors), [ERR_OUT_OF_RANGE, OK, ERR_NON_POSITIVE])
+        self.assertEqual(list(self.book.deposit([1], [9e14])), [ERR_OUT_OF_RANGE])
+        self.book.buy([0], [0], [1], prices=np.array([100.0, 0.0, 0.0]))
+        self.assertEqual(list(self.book.sell([0], [0], [1], prices=np.array([9e14, 0.0, 0.0]))), [OK])
+        self.assertEqual(list(self.book.sell([1], [0], [1], prices=self.prices)), [ERR_INSUFFICIENT_HOLDINGS])
+        with self.assertRaises(ValueError):
+            self.book.buy([0], [0], [1], prices=np.array([1e300, 0.0, 0.0]))
+
+    def test_same_account_rows_apply_in_order(self):
+        errors = self.book.apply([OP_DEPOSIT, OP_WITHDRAW, OP_WITHDRAW], [0, 0, 0], [100.0, 70.0, 70.0])
+        self.assertEqual(list(errors), [OK, OK, ERR_INSUFFICIENT_FUNDS])
+        self.assertEqual(self.book.balance[0], 30.0)
+
+    def test_malformed_rows_reject_the_batch(self):
+        self.book.deposit([0], [100.0])
+        with self.assertRaises(ValueError):
+            self.book.apply([OP_DEPOSIT, 7], [0, 0], [10.0, 10.0])
+        with self.assertRaises(ValueError):
+            self.book.deposit([0, -1], [10.0, 10.0])
+        with self.assertRaises(ValueError):
+            self.book.deposit([3], [10.0])
+        with self.assertRaises(ValueError):
+            self.book.buy([0], [0], [0.5], prices=self.prices)
+        self.assertEqual(list(self.book.balance), [100.0, 0.0, 0.0])
+        self.assertEqual(list(self.book.deposit([0], [0.5])), [OK])
+
+    def test_valuation(self):
+        self.book.deposit([0, 1], [1000.0, 500.0])
+        self.book.buy([0, 1], self.book.symbol_ids(['AAPL', 'TSLA']), [2, 1], prices=self.prices)
+        self.assertEqual(list(self.book.get_portfolio_value(self.prices)), [1000.0, 500.0, 0.0])
+        doubled = self.prices * 2
+        self.assertEqual(list(self.book.get_profit_loss(doubled)), [300.0, 200.0, 0.0])
+
+    @patch('accounts.get_share_price')
+    def test_matches_account_for_random_batch(self, mock_get_price):
+        mock_get_price.side_effect = lambda s: PRICES.get(s.upper(), 0.0)
+        rng = random.Random(7)
+        n_accounts = 20
+        book = AccountBook(n_accounts, ['AAPL', 'TSLA', 'GOOGL'])
+        accounts = [Account() for _ in range(n_accounts)]
+        symbols = ['AAPL', 'TSLA', 'GOOGL', 'NOPE']
+
+        ops, rows, values, syms = [], [], [], []
+        for _ in range(2000):
+            ops.append(rng.choice([OP_DEPOSIT, OP_WITHDRAW, OP_BUY, OP_SELL]))
+            rows.append(rng.randrange(n_accounts))
+            syms.append(rng.choice(symbols))
+            if ops[-1] in (OP_DEPOSIT, OP_WITHDRAW):
+                values.append(float(rng.randint(-10, 3000)))
+            else:
+                values.append(float(rng.randint(-1, 4)))
+
+        errors = book.apply(ops, rows, values, book.symbol_ids(syms), self.prices)
+
+        methods = {OP_DEPOSIT: 'deposit', OP_WITHDRAW: 'withdraw', OP_BUY: 'buy', OP_SELL: 'sell'}
+        for op, row, value, sym, err in zip(ops, rows, values, syms, errors):
+            method = getattr(accounts[row], methods[op])
+            args = (value,) if op in (OP_DEPOSIT, OP_WITHDRAW) else (sym, int(value))
+            try:
+                method(*args)
+                self.assertEqual(err, OK)
+            except ValueError:
+                self.assertNotEqual(err, OK)
+
+        for i, account in enumerate(accounts):
+            self.assertAlmostEqual(book.balance[i], account.balance)
+            self.assertAlmostEqual(book.get_portfolio_value(self.prices)[i], account.get_portfolio_value())
+            for sym, qty in account.get_holdings().items():
+                self.assertEqual(book.holdings[i, book.symbol_ids([sym])[0]], qty)
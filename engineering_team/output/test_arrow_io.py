@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from accounts import Account, ConcurrentAccount
+from price_provider import StubPriceProvider
+
+import arrow_io
+from arrow_io import import_batches, iter_record_batches, read_ipc, read_parquet, to_ipc, to_parquet
+
+
+def state(account):
+    return (account.balance, account.total_deposited, account.total_withdrawn,
+            dict(account.holdings), list(account.get_transaction_history()))
+
+
+@unittest.skipIf(arrow_io.pa is None, "pyarrow is not installed")
+class TestArrowIO(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prices = StubPriceProvider()
+        self.account = Account(price_provider=self.prices)
+        for i in range(50):
+            self.account.deposit(1000.0 + i * 0.01)
+            self.account.buy('AAPL', 2)
+            self.account.buy('TSLA', 1)
+            self.account.sell('AAPL', 1)
+            self.account.withdraw(12.34)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_batches_are_chunked(self):
+        batches = list(iter_record_batches(self.account, chunk_rows=64))
+        self.assertEqual([batch.num_rows for batch in batches], [64, 64, 64, 58])
+        table = arrow_io.pa.Table.from_batches(batches)
+        first = table.drop_columns(["timestamp"]).slice(0, 2).to_pylist()
+        self.assertEqual(first[0]["type"], "DEPOSIT")
+        self.assertIsNone(first[0]["symbol"])
+        self.assertIsNone(first[0]["quantity"])
+        self.assertEqual((first[1]["type"], first[1]["symbol"], first[1]["quantity"]), ("BUY", "AAPL", 2))
+        self.assertEqual(first[1]["price"], self.prices.get_share_price('AAPL'))
+
+    def test_zero_copy_batches_share_ledger_memory(self):
+        batch = next(iter_record_batches(self.account, zero_copy=True))
+        address = batch.column("amount").buffers()[1].address
+        view = memoryview(self.account.transactions.amounts)
+        self.assertEqual(address, arrow_io.pa.py_buffer(view).address)
+        del view
+        with self.assertRaises(BufferError):
+            self.account.transactions.amounts.append(0)
+        del batch
+        self.account.deposit(1.0)
+
+    def test_batches_are_copied_by_default(self):
+        batch = next(iter_record_batches(self.account))
+        self.account.deposit(1.0)
+        self.assertEqual(batch.num_rows, 250)
+        with self.assertRaisesRegex(ValueError, "ConcurrentAccount"):
+            next(iter_record_batches(ConcurrentAccount(price_provider=self.prices), zero_copy=True))
+
+    def test_parquet_round_trip(self):
+        path = os.path.join(self.directory, "history.parquet")
+        self.assertEqual(to_parquet(self.account, path, chunk_rows=64), 250)
+        restored = read_parquet(path, Account(price_provider=self.prices), chunk_rows=32)
+        self.assertEqual(state(restored), state(self.account))
+        self.assertEqual(restored.get_position_report(), self.account.get_position_report())
+
+    def test_ipc_round_trip_into_concurrent_account(self):
+        path = os.path.join(self.directory, "history.arrow")
+        to_ipc(self.account, path, chunk_rows=100)
+        restored = read_ipc(path, ConcurrentAccount(price_provider=self.prices, incremental_valuation=True))
+        self.assertEqual(state(restored), state(self.account))
+        self.assertAlmostEqual(restored.get_portfolio_value(), self.account.get_portfolio_value())
+        restored.buy('AAPL', 1)
+
+    def test_import_interns_symbols_in_target_ledger(self):
+        seeded = Account(price_provider=self.prices)
+        seeded.deposit(10_000.0)
+        seeded.buy('GOOGL', 3)
+        rows = import_batches(seeded, iter_record_batches(self.account, chunk_rows=100))
+        self.assertEqual(rows, 250)
+        self.assertEqual(seeded.holdings['GOOGL'], 3)
+        self.assertEqual(seeded.holdings['AAPL'], self.account.holdings['AAPL'])
+        self.assertEqual(len(seeded.get_transaction_history()), 252)
+        self.assertEqual(seeded.get_transaction_history()[2].symbol, None)
+        self.assertEqual(seeded.get_transaction_history()[3].symbol, 'AAPL')
+
+    def test_older_imported_rows_are_found_by_timestamp(self):
+        seeded = Account(price_provider=self.prices)
+        seeded.deposit(10_000.0)
+        seeded.buy('GOOGL', 3)
+        import_batches(seeded, iter_record_batches(self.account))
+        timestamps = seeded.transactions.timestamps
+        self.assertEqual(seeded.transactions.first_late_row(), 2)
+        self.assertEqual(seeded.get_holdings_at(timestamps[3]), {'AAPL': 2})
+        self.assertEqual(seeded.get_holdings_at(timestamps[1]), dict(self.account.holdings, GOOGL=3))
+
+    def test_export_of_empty_account(self):
+        path = os.path.join(self.directory, "empty.parquet")
+        self.assertEqual(to_parquet(Account(price_provider=self.prices), path), 0)
+        self.assertEqual(read_parquet(path).get_transaction_history(), [])
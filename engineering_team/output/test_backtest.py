@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from accounts import Order
+from backtest import (BuyAndHold, MovingAverageCrossover, Strategy, gbm_paths, iter_gbm_paths,
+                      load_paths, run_backtest, save_paths, scan)
+
+
+class Spendthrift(Strategy):
+    """Tries to buy far more than it can afford on every tick."""
+    def on_tick(self, step, prices, account):
+        return [Order("BUY", "S0", self.params.get("quantity", 10**6))]
+
+
+class TestPricePaths(unittest.TestCase):
+    def test_shape_and_reproducibility(self):
+        paths = gbm_paths(5, 100, seed=3)
+        self.assertEqual(paths.shape, (100, 5))
+        np.testing.assert_array_equal(paths, gbm_paths(5, 100, seed=3))
+        self.assertTrue((paths > 0).all())
+
+    def test_chunking_does_not_change_paths(self):
+        chunks = list(iter_gbm_paths(4, 50, seed=11, chunk_steps=7))
+        self.assertEqual([len(c) for c in chunks], [7] * 7 + [1])
+        np.testing.assert_allclose(np.concatenate(chunks), gbm_paths(4, 50, seed=11))
+
+    def test_log_return_statistics(self):
+        mu, sigma, dt = 0.1, 0.3, 1.0 / 252
+        paths = gbm_paths(200, 2000, s0=50.0, mu=mu, sigma=sigma, seed=5)
+        log_returns = np.diff(np.log(paths), axis=0)
+        self.assertAlmostEqual(log_returns.std() / np.sqrt(dt), sigma, delta=0.01)
+        self.assertAlmostEqual(log_returns.mean() / dt, mu - 0.5 * sigma ** 2, delta=0.05)
+
+    def test_save_and_memory_map(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "paths.npy")
+            paths = gbm_paths(3, 20, seed=1)
+            save_paths(path, paths)
+            loaded = load_paths(path)
+            self.assertIsInstance(loaded, np.memmap)
+            np.testing.assert_array_equal(loaded, paths)
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        self.paths = gbm_paths(4, 300, seed=7)
+
+    def test_buy_and_hold(self):
+        result = run_backtest(BuyAndHold, self.paths, initial_cash=10_000.0, record_equity=True)
+        quantities = (2500.0 // self.paths[0]).astype(int)
+        # Trades settle at prices rounded to the account's minor unit.
+        cash = 10_000.0 - (quantities * np.round(self.paths[0], 4)).sum()
+        self.assertEqual(result.trades, 4)
+        self.assertAlmostEqual(result.final_value, cash + (quantities * self.paths[-1]).sum())
+        self.assertAlmostEqual(result.profit_loss, result.final_value - 10_000.0)
+        self.assertEqual(len(result.equity), 300)
+        self.assertEqual(result.ticks, 1200)
+        self.assertGreater(result.ticks_per_second, 0)
+        self.assertTrue(0.0 <= result.max_drawdown < 1.0)
+
+    def test_account_rules_apply(self):
+        result = run_backtest(Spendthrift, self.paths[:10], initial_cash=100.0)
+        self.assertEqual((result.trades, result.rejected), (0, 10))
+        self.assertEqual(result.final_value, 100.0)
+
+    def test_scan_in_processes_matches_serial(self):
+        grid = [{"fast": 5, "slow": 20}, {"fast": 10, "slow": 40}, {"fast": 3, "slow": 60}]
+        serial = scan(MovingAverageCrossover, grid, self.paths, processes=1)
+        parallel = scan(MovingAverageCrossover, grid, self.paths, processes=2)
+        self.assertEqual([r.params for r in parallel], grid)
+        self.assertEqual([(r.final_value, r.trades) for r in parallel],
+                         [(r.final_value, r.trades) for r in serial])
+        self.assertGreater(sum(r.trades for r in serial), 0)
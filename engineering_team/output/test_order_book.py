@@ -0,0 +1,111 @@
+import time
+import unittest
+
+from accounts import Account
+from order_book import OrderBook
+from price_provider import StubPriceProvider
+
+
+class TestOrderBook(unittest.TestCase):
+    def setUp(self):
+        self.prices = StubPriceProvider({'AAPL': 100.0, 'TSLA': 200.0})
+        self.account = Account(price_provider=self.prices)
+        self.account.deposit(10_000.0)
+        self.book = OrderBook(self.account)
+
+    def test_buy_limit_fills_when_price_falls_to_limit(self):
+        order = self.book.submit('BUY', 'AAPL', 10, limit_price=90.0)
+        self.prices.set_price('AAPL', 95.0)
+        self.assertEqual(order.status, 'OPEN')
+        self.prices.set_price('AAPL', 89.0)
+        self.assertEqual(order.status, 'FILLED')
+        self.assertEqual(order.result.price, 89.0)
+        self.assertEqual(self.account.get_holdings(), {'AAPL': 10})
+        self.assertEqual(self.account.balance, 10_000.0 - 890.0)
+        self.assertEqual(self.account.get_transaction_history()[-1].type, 'BUY')
+
+    def test_sell_limit_and_stops(self):
+        self.account.buy('AAPL', 20)
+        take_profit = self.book.submit('SELL', 'AAPL', 5, limit_price=120.0)
+        stop_loss = self.book.submit('SELL', 'AAPL', 5, stop_price=80.0)
+        breakout = self.book.submit('BUY', 'TSLA', 1, stop_price=250.0)
+
+        self.prices.set_price('AAPL', 125.0)
+        self.assertEqual((take_profit.status, stop_loss.status), ('FILLED', 'OPEN'))
+        self.prices.set_price('AAPL', 79.0)
+        self.assertEqual(stop_loss.status, 'FILLED')
+        self.assertEqual(self.account.get_holdings()['AAPL'], 10)
+
+        self.prices.set_price('TSLA', 240.0)
+        self.assertEqual(breakout.status, 'OPEN')
+        self.prices.set_price('TSLA', 260.0)
+        self.assertEqual(breakout.status, 'FILLED')
+
+    def test_price_time_priority(self):
+        first = self.book.submit('BUY', 'AAPL', 1, limit_price=95.0)
+        best = self.book.submit('BUY', 'AAPL', 1, limit_price=98.0)
+        second = self.book.submit('BUY', 'AAPL', 1, limit_price=95.0)
+        self.book.submit('BUY', 'AAPL', 1, limit_price=90.0)
+        filled = self.book.on_price_tick('AAPL', 95.0)
+        self.assertEqual(filled, [best, first, second])
+        self.assertEqual([order.result.price for order in filled], [95.0] * 3)
+        self.assertEqual(len(self.book.open_orders('AAPL')), 1)
+
+    def test_rejected_fill_uses_account_validation(self):
+        order = self.book.submit('SELL', 'AAPL', 5, limit_price=110.0)
+        self.prices.set_price('AAPL', 111.0)
+        self.assertEqual(order.status, 'REJECTED')
+        self.assertEqual(order.result.error, 'Insufficient holdings.')
+        self.assertEqual(self.book.open_orders(), [])
+
+    def test_cancel(self):
+        order = self.book.submit('BUY', 'AAPL', 1, limit_price=90.0)
+        self.assertTrue(self.book.cancel(order.order_id))
+        self.assertFalse(self.book.cancel(order.order_id))
+        self.assertEqual(order.status, 'CANCELLED')
+        self.prices.set_price('AAPL', 80.0)
+        self.assertEqual(self.account.get_holdings(), {})
+
+    def test_symbols_are_case_insensitive(self):
+        order = self.book.submit('BUY', 'aapl', 1, limit_price=90.0)
+        self.assertEqual(order.symbol, 'AAPL')
+        self.assertEqual(self.book.open_orders('Aapl'), [order])
+        other = self.book.submit('BUY', 'AAPL', 1, limit_price=90.0)
+        self.assertTrue(self.book.cancel(other.order_id))
+        self.book.on_price_tick('aapl', 85.0)
+        self.assertEqual(order.status, 'FILLED')
+        self.assertEqual(self.account.get_holdings(), {'AAPL': 1})
+
+    def test_cancelled_entries_are_compacted(self):
+        orders = [self.book.submit('BUY', 'AAPL', 1, limit_price=50.0 + i * 0.01) for i in range(1000)]
+        for order in orders[:900]:
+            self.book.cancel(order.order_id)
+        heap = self.book._books['AAPL']['BUY', 'LIMIT']
+        self.assertLessEqual(len(heap.entries), 200)
+        self.assertEqual(len(self.book.open_orders()), 100)
+
+    def test_invalid_orders(self):
+        with self.assertRaisesRegex(ValueError, "Quantity must be positive"):
+            self.book.submit('BUY', 'AAPL', 0, limit_price=90.0)
+        with self.assertRaisesRegex(ValueError, "Unknown order side"):
+            self.book.submit('HOLD', 'AAPL', 1, limit_price=90.0)
+        with self.assertRaisesRegex(ValueError, "Exactly one of"):
+            self.book.submit('BUY', 'AAPL', 1, limit_price=90.0, stop_price=95.0)
+        with self.assertRaisesRegex(ValueError, "Exactly one of"):
+            self.book.submit('BUY', 'AAPL', 1)
+
+    def test_ticks_only_touch_crossed_orders(self):
+        for i in range(50_000):
+            self.book.submit('BUY', 'AAPL', 1, limit_price=10.0 + (i % 500) * 0.01)
+            self.book.submit('SELL', 'AAPL', 1, stop_price=10.0 + (i % 500) * 0.01)
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.prices.set_price('AAPL', 100.0 + (_ % 7))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(len(self.book.open_orders()), 100_000)
+
+    def test_close_unsubscribes(self):
+        order = self.book.submit('BUY', 'AAPL', 1, limit_price=90.0)
+        self.book.close()
+        self.prices.set_price('AAPL', 80.0)
+        self.assertEqual(order.status, 'OPEN')
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from accounts import Account, ConcurrentAccount
+from persistence import AccountStore
+from price_provider import StubPriceProvider
+
+
+def state(account):
+    return (account.balance, account.total_deposited, account.total_withdrawn,
+            dict(account.holdings), list(account.get_transaction_history()))
+
+
+class TestAccountStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prices = StubPriceProvider()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_store(self, **kwargs):
+        store = AccountStore(self.directory, **kwargs)
+        return store, store.open(price_provider=self.prices)
+
+    def trade(self, store, account, rounds):
+        for i in range(rounds):
+            account.deposit(1000.0 + i * 0.01)
+            account.buy('AAPL', 2)
+            account.buy('TSLA', 1)
+            account.sell('AAPL', 1)
+            account.withdraw(12.34)
+            store.commit()
+
+    def test_new_store_is_empty(self):
+        store, account = self.open_store()
+        self.assertEqual(account.balance, 0.0)
+        self.assertEqual(len(account.get_transaction_history()), 0)
+        store.close()
+
+    def test_recover_from_wal_only(self):
+        store, account = self.open_store(group_size=7, snapshot_interval=10**9)
+        self.trade(store, account, 50)
+        expected = state(account)
+        store.close()
+
+        store, recovered = self.open_store()
+        self.assertEqual(state(recovered), expected)
+        store.close()
+
+    def test_recover_from_snapshot_and_wal_tail(self):
+        store, account = self.open_store(group_size=4, snapshot_interval=64)
+        self.trade(store, account, 100)
+        expected = state(account)
+        store.close()
+
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'snapshot.bin')))
+        wal_files = [name for name in os.listdir(self.directory) if name.startswith('wal.')]
+        self.assertEqual(len(wal_files), 1)
+
+        store, recovered = self.open_store()
+        self.assertEqual(state(recovered), expected)
+        self.assertEqual(recovered.get_position_report(), account.get_position_report())
+        # The recovered account keeps logging where it left off.
+        self.trade(store, recovered, 10)
+        expected = state(recovered)
+        store.close()
+
+        store, recovered = self.open_store()
+        self.assertEqual(state(recovered), expected)
+        store.close()
+
+    def test_tax_lots_are_restored_from_snapshot(self):
+        starts = []
+
+        class RecordingAccount(Account):
+            def rebuild_positions(self, start=0):
+                starts.append(start)
+                super().rebuild_positions(start)
+
+        store = AccountStore(self.directory, group_size=4, snapshot_interval=64)
+        account = store.open(price_provider=self.prices, cost_basis_method="LIFO")
+        self.trade(store, account, 30)
+        store.snapshot()
+        self.trade(store, account, 3)
+        store.close()
+
+        store = AccountStore(self.directory)
+        recovered = store.open(account_class=RecordingAccount, price_provider=self.prices,
+                               cost_basis_method="LIFO")
+        self.assertEqual(starts, [150])
+        self.assertEqual(recovered.get_position_report(), account.get_position_report())
+        self.assertEqual(list(recovered.positions['AAPL'].lots), list(account.positions['AAPL'].lots))
+        self.assertEqual(recovered.realized_pnl, account.realized_pnl)
+        recovered.sell('AAPL', 3)
+        account.sell('AAPL', 3)
+        self.assertEqual(recovered.realized_pnl, account.realized_pnl)
+        store.close()
+
+        # Lots kept under another method are rebuilt from the whole ledger.
+        store = AccountStore(self.directory)
+        fifo = store.open(account_class=RecordingAccount, price_provider=self.prices)
+        self.assertEqual(starts[-1], 0)
+        self.assertEqual(fifo.get_holdings(), account.get_holdings())
+        store.close()
+
+    def test_unflushed_group_is_lost_and_torn_tail_is_dropped(self):
+        store, account = self.open_store(group_size=10**9)
+        account.deposit(100.0)
+        store.flush()
+        account.deposit(50.0)
+        store.commit()  # group not full, nothing written
+        wal = store._wal.name
+        store._wal.close()
+        store._wal = None
+        with open(wal, 'ab') as f:
+            f.write(b'WALR\x01\x00')  # torn frame header
+
+        store, recovered = self.open_store()
+        self.assertEqual(recovered.balance, 100.0)
+        self.assertEqual(len(recovered.get_transaction_history()), 1)
+        recovered.deposit(1.0)
+        store.close()
+
+        store, recovered = self.open_store()
+        self.assertEqual(recovered.balance, 101.0)
+        store.close()
+
+    def test_concurrent_account_with_threads(self):
+        store = AccountStore(self.directory, group_size=3, snapshot_interval=50)
+        account = store.open(account_class=ConcurrentAccount, price_provider=self.prices)
+        threads = [threading.Thread(target=self.trade, args=(store, account, 20)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        expected = state(account)
+        store.close()
+
+        store = AccountStore(self.directory)
+        recovered = store.open(account_class=ConcurrentAccount, price_provider=self.prices)
+        self.assertEqual(state(recovered), expected)
+        self.assertEqual(recovered.snapshot().balance, expected[0])
+        store.close()
+
+    def test_invalid_fsync_policy(self):
+        with self.assertRaisesRegex(ValueError, "fsync must be one of"):
+            AccountStore(self.directory, fsync="sometimes")
@@ -0,0 +1,134 @@
+import threading
+import unittest
+
+from accounts import Account
+from price_provider import CachedPriceProvider, FunctionPriceProvider, StubPriceProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStubPriceProvider(unittest.TestCase):
+    def test_default_prices(self):
+        stub = StubPriceProvider()
+        self.assertEqual(stub.get_share_prices(['AAPL', 'tsla', 'NOPE']),
+                         {'AAPL': 150.0, 'tsla': 200.0, 'NOPE': 0.0})
+        self.assertEqual(stub.get_share_price('GOOGL'), 2800.0)
+        self.assertEqual(stub.fetches, 2)
+
+    def test_function_provider(self):
+        provider = FunctionPriceProvider(lambda s: len(s) * 1.0)
+        self.assertEqual(provider.get_share_prices(['AB', 'ABC']), {'AB': 2.0, 'ABC': 3.0})
+
+
+class TestCachedPriceProvider(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubPriceProvider()
+        self.clock = FakeClock()
+        self.cache = CachedPriceProvider(self.stub, ttl=10.0, maxsize=2, clock=self.clock)
+
+    def test_bulk_lookup_is_one_fetch(self):
+        prices = self.cache.get_share_prices(['AAPL', 'TSLA'])
+        self.assertEqual(prices, {'AAPL': 150.0, 'TSLA': 200.0})
+        self.assertEqual(self.stub.fetches, 1)
+        self.cache.get_share_prices(['AAPL', 'TSLA'])
+        self.assertEqual(self.stub.fetches, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_ttl_expiry(self):
+        self.cache.get_share_price('AAPL')
+        # Change the source silently, without publishing a tick.
+        self.stub.prices['AAPL'] = 175.0
+        self.clock.now = 9.0
+        self.assertEqual(self.cache.get_share_price('AAPL'), 150.0)
+        self.clock.now = 10.0
+        self.assertEqual(self.cache.get_share_price('AAPL'), 175.0)
+
+    def test_lru_eviction(self):
+        self.cache.get_share_price('AAPL')
+        self.cache.get_share_price('TSLA')
+        self.cache.get_share_price('AAPL')
+        self.cache.get_share_price('GOOGL')
+        self.assertEqual(self.cache.stats()['size'], 2)
+        fetches = self.stub.fetches
+        self.cache.get_share_price('AAPL')
+        self.assertEqual(self.stub.fetches, fetches)
+        self.cache.get_share_price('TSLA')
+        self.assertEqual(self.stub.fetches, fetches + 1)
+
+    def test_ticks_refresh_cache_and_reach_subscribers(self):
+        ticks = []
+        self.cache.subscribe(lambda symbol, price: ticks.append((symbol, price)))
+        self.cache.get_share_price('AAPL')
+        self.stub.set_price('AAPL', 160.0)
+        self.assertEqual(ticks, [('AAPL', 160.0)])
+        self.assertEqual(self.cache.get_share_price('AAPL'), 160.0)
+        self.assertEqual(self.stub.fetches, 1)
+
+    def test_tick_during_fetch_is_not_overwritten(self):
+        class RacingProvider(StubPriceProvider):
+            def get_share_prices(inner, symbols):
+                quoted = super().get_share_prices(symbols)
+                # A newer tick is published before the older quote returns.
+                inner.set_price('AAPL', 160.0)
+                return quoted
+
+        source = RacingProvider()
+        cache = CachedPriceProvider(source, ttl=10.0, clock=self.clock)
+        self.assertEqual(cache.get_share_price('AAPL'), 160.0)
+        self.assertEqual(cache.get_share_price('AAPL'), 160.0)
+        self.assertEqual(source.fetches, 1)
+
+    def test_symbols_are_case_insensitive(self):
+        self.assertEqual(self.cache.get_share_prices(['aapl', 'AAPL']), {'aapl': 150.0, 'AAPL': 150.0})
+        self.assertEqual(self.cache.get_share_price('Aapl'), 150.0)
+        self.assertEqual(self.stub.fetches, 1)
+        self.stub.set_price('AAPL', 160.0)
+        self.assertEqual(self.cache.get_share_price('aapl'), 160.0)
+        self.cache.invalidate(['aapl'])
+        self.cache.get_share_price('AAPL')
+        self.assertEqual(self.stub.fetches, 2)
+
+    def test_invalidate(self):
+        self.cache.get_share_price('AAPL')
+        self.cache.invalidate(['AAPL'])
+        self.cache.get_share_price('AAPL')
+        self.assertEqual(self.stub.fetches, 2)
+
+    def test_concurrent_lookups_are_coalesced(self):
+        slow = StubPriceProvider(latency=0.05)
+        cache = CachedPriceProvider(slow)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_share_price('AAPL')))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [150.0] * 8)
+        self.assertEqual(slow.fetches, 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_fetch_errors_propagate(self):
+        def broken(symbol):
+            raise RuntimeError("price feed down")
+        cache = CachedPriceProvider(FunctionPriceProvider(broken))
+        with self.assertRaisesRegex(RuntimeError, "price feed down"):
+            cache.get_share_price('AAPL')
+        with self.assertRaisesRegex(RuntimeError, "price feed down"):
+            cache.get_share_price('AAPL')
+
+    def test_account_uses_provider(self):
+        account = Account(price_provider=self.cache)
+        account.deposit(1000.0)
+        account.buy('AAPL', 2)
+        account.buy('TSLA', 1)
+        self.assertEqual(account.get_portfolio_value(), 1000.0)
+        self.assertEqual(self.stub.fetches, 2)
@@ -0,0 +1,114 @@
+import datetime
+import random
+import time
+import unittest
+
+from accounts import Account, to_units
+from price_provider import StubPriceProvider
+from rollups import LedgerRollups
+
+DAY = 86_400 * 1_000_000_000
+
+
+class TestLedgerRollups(unittest.TestCase):
+    def setUp(self):
+        self.prices = StubPriceProvider({'AAPL': 100.0, 'TSLA': 200.0})
+        self.account = Account(price_provider=self.prices)
+        self.ledger = self.account.transactions
+        self.base = 19_000 * DAY  # a UTC midnight
+
+    def record(self, day, type, amount, symbol=None, quantity=None, price=None):
+        self.ledger.record(type, to_units(amount), symbol, quantity, None if price is None else to_units(price),
+                           timestamp_ns=self.base + day * DAY + 1)
+
+    def fill(self):
+        self.record(0, "DEPOSIT", 10_000.0)
+        self.record(0, "BUY", -1000.0, "AAPL", 10, 100.0)
+        self.record(1, "BUY", -2000.0, "TSLA", 10, 200.0)
+        self.record(1, "SELL", 550.0, "AAPL", 5, 110.0)
+        self.record(3, "WITHDRAWAL", -500.0)
+        self.record(3, "SELL", 2500.0, "TSLA", 10, 250.0)
+
+    def test_volume_and_turnover(self):
+        self.fill()
+        rollups = LedgerRollups(self.ledger)
+        self.assertEqual(rollups.volume_by_symbol(), {'AAPL': 15, 'TSLA': 20})
+        day1 = self.base + DAY
+        self.assertEqual(rollups.volume_by_symbol(day1, day1 + DAY), {'AAPL': 5, 'TSLA': 10})
+        self.assertEqual(rollups.volume_by_symbol(end=day1), {'AAPL': 10})
+        self.assertEqual(rollups.notional_by_symbol(start=day1), {'AAPL': 550.0, 'TSLA': 4500.0})
+        self.assertEqual(rollups.turnover(), 6050.0)
+        self.assertEqual(rollups.turnover(self.base + 2 * DAY, self.base + 3 * DAY), 0.0)
+
+    def test_cashflow_and_pnl_by_day(self):
+        self.fill()
+        rollups = LedgerRollups(self.ledger)
+        cashflow = rollups.cashflow_by_bucket()
+        self.assertEqual([row[1:] for row in cashflow],
+                         [(10_000.0, 0.0, 10_000.0), (0.0, 0.0, 0.0), (0.0, 500.0, -500.0)])
+        self.assertEqual(cashflow[0][0], datetime.datetime.fromtimestamp(self.base // 10**9, datetime.timezone.utc))
+        # Day 1: AAPL marked 100 -> 110 on 10 shares, TSLA bought at cost. Day 3: TSLA 200 -> 250.
+        self.assertEqual([pnl for _, pnl in rollups.pnl_by_bucket()], [0.0, 100.0, 500.0])
+        self.assertEqual(sum(pnl for _, pnl in rollups.pnl_by_bucket()),
+                         self.account.get_profit_loss_at(self.base + 4 * DAY))
+
+    def test_configurable_buckets(self):
+        self.fill()
+        rollups = LedgerRollups(self.ledger, bucket_seconds=2 * 86_400)
+        self.assertEqual(len(rollups.cashflow_by_bucket()), 2)
+        with self.assertRaisesRegex(ValueError, "bucket_seconds must be positive"):
+            LedgerRollups(self.ledger, bucket_seconds=0)
+
+    def test_updates_incrementally_and_matches_recompute(self):
+        rollups = LedgerRollups(self.ledger, bucket_seconds=3600)
+        self.account.deposit(1_000_000.0)
+        rng = random.Random(9)
+        for i in range(5000):
+            self.prices.set_price('AAPL', rng.uniform(50.0, 150.0))
+            try:
+                getattr(self.account, rng.choice(['buy', 'sell']))(rng.choice(['AAPL', 'TSLA']), rng.randint(1, 9))
+            except ValueError:
+                pass
+            if i % 1000 == 0:
+                self.assertEqual(rollups.refresh(), len(self.ledger))
+        rollups.verify()
+        self.assertAlmostEqual(sum(pnl for _, pnl in rollups.pnl_by_bucket()), self.account.get_profit_loss_at(time.time_ns()))
+
+    def test_rows_stamped_before_the_newest_bucket(self):
+        self.fill()
+        rollups = LedgerRollups(self.ledger)
+        rollups.refresh()
+        # The clock stepped back two days after day 3's rows were recorded.
+        self.record(1, "DEPOSIT", 300.0)
+        self.record(1, "BUY", -330.0, "AAPL", 3, 110.0)
+        self.record(4, "DEPOSIT", 1.0)
+        self.assertEqual(rollups.refresh(), 9)
+        self.assertEqual(rollups.rebuilds, 1)
+        rollups.verify()
+        self.assertEqual([row[1] for row in rollups.cashflow_by_bucket()], [10_000.0, 300.0, 0.0, 1.0])
+        day1 = self.base + DAY
+        self.assertEqual(rollups.volume_by_symbol(day1, day1 + DAY), {'AAPL': 8, 'TSLA': 10})
+        self.assertEqual(sum(pnl for _, pnl in rollups.pnl_by_bucket()),
+                         self.account.get_profit_loss_at(self.base + 5 * DAY))
+
+    def test_verify_detects_drift(self):
+        self.fill()
+        rollups = LedgerRollups(self.ledger)
+        rollups.refresh()
+        rollups.totals["bought"][-1] += 1
+        with self.assertRaises(AssertionError):
+            rollups.verify()
+
+    def test_queries_do_not_scan_rows(self):
+        for day in range(200):
+            for _ in range(500):
+                self.record(day, "DEPOSIT", 1.0)
+                self.record(day, "BUY", -1.0, "AAPL", 1, 1.0)
+        rollups = LedgerRollups(self.ledger)
+        rollups.refresh()
+        start = time.perf_counter()
+        for day in range(200):
+            rollups.volume_by_symbol(self.base + day * DAY, self.base + (day + 50) * DAY)
+            rollups.turnover(self.base + day * DAY)
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertEqual(rollups.volume_by_symbol(self.base, self.base + 10 * DAY), {'AAPL': 5000})
@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from accounts import ConcurrentAccount
+from price_provider import StubPriceProvider
+from sessions import SessionRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prices = StubPriceProvider()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def registry(self, **kwargs):
+        kwargs.setdefault('clock', self.clock)
+        return SessionRegistry(self.directory, price_provider=self.prices, **kwargs)
+
+    def trade(self, registry, session_id, amount):
+        with registry.session(session_id) as session:
+            session.account.deposit(amount)
+            session.account.buy('AAPL', 1)
+            session.store.commit()
+
+    def test_sessions_are_isolated(self):
+        registry = self.registry()
+        self.trade(registry, 'alice', 1000.0)
+        self.trade(registry, 'bob', 500.0)
+        with registry.session('alice') as alice, registry.session('bob') as bob:
+            self.assertEqual(alice.account.balance, 850.0)
+            self.assertEqual(bob.account.balance, 350.0)
+        self.assertEqual(registry.stats()['created'], 2)
+        registry.close()
+
+    def test_lru_eviction_spills_and_reloads(self):
+        registry = self.registry(max_resident=2)
+        self.trade(registry, 's1', 1000.0)
+        self.trade(registry, 's2', 1000.0)
+        self.trade(registry, 's1', 1000.0)
+        self.trade(registry, 's3', 1000.0)
+        self.assertNotIn('s2', registry)
+        self.assertEqual(len(registry), 2)
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, 's2')))
+
+        with registry.session('s2') as session:
+            self.assertEqual(session.account.balance, 850.0)
+            self.assertEqual(session.account.get_holdings(), {'AAPL': 1})
+            self.assertEqual(session.log.count(), 2)
+        stats = registry.stats()
+        self.assertEqual(stats['reloads'], 1)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['resident'], 2)
+        self.assertGreater(stats['reload_ms_max'], 0.0)
+        registry.close()
+
+    def test_large_sessions_are_compacted_on_eviction(self):
+        registry = self.registry(max_resident=1, compact_rows=4)
+        self.trade(registry, 'small', 1000.0)
+        for _ in range(2):
+            self.trade(registry, 'large', 1000.0)
+        self.trade(registry, 'small', 1000.0)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'small', 'snapshot.bin')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'large', 'snapshot.bin')))
+        with registry.session('large') as session:
+            self.assertEqual(session.account.balance, 1700.0)
+        registry.close()
+
+    def test_idle_sessions_are_evicted(self):
+        registry = self.registry(idle_timeout=60.0)
+        self.trade(registry, 'old', 1000.0)
+        self.clock.now = 30.0
+        self.trade(registry, 'recent', 1000.0)
+        self.clock.now = 70.0
+        self.assertEqual(registry.evict_idle(), 1)
+        self.assertNotIn('old', registry)
+        self.assertIn('recent', registry)
+        registry.close()
+
+    def test_pinned_session_is_not_evicted(self):
+        registry = self.registry(max_resident=1)
+        with registry.session('busy') as busy:
+            self.trade(registry, 'other', 1000.0)
+            self.assertIn('busy', registry)
+            busy.account.deposit(5.0)
+        self.assertEqual(len(registry), 1)
+        registry.close()
+
+    def test_unused_session_leaves_nothing_on_disk(self):
+        registry = self.registry(max_resident=1)
+        with registry.session('visitor'):
+            pass
+        self.trade(registry, 'trader', 1000.0)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'visitor')))
+        registry.close()
+
+    def test_failed_eviction_does_not_stop_the_others(self):
+        registry = self.registry()
+        self.trade(registry, 'a', 1000.0)
+        self.trade(registry, 'b', 1000.0)
+        with registry.session('a') as session:
+            broken = session.store
+
+        def close():
+            raise OSError("disk gone")
+        broken.close = close
+
+        with registry.session('b') as session:
+            healthy = session.store
+        with self.assertLogs('sessions', 'ERROR') as logs:
+            registry.close()
+        self.assertIn("Evicting session a failed", logs.output[0])
+        self.assertIsNone(healthy._wal)
+        self.assertEqual(len(registry), 0)
+        stats = registry.stats()
+        self.assertEqual((stats['evictions'], stats['eviction_errors']), (1, 1))
+
+        # Nobody is left waiting on the failed victim: it reopens from disk.
+        reopened = []
+        thread = threading.Thread(target=lambda: reopened.append(registry.session('a').__enter__()))
+        thread.start()
+        thread.join(5)
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened[0].account.get_holdings(), {'AAPL': 1})
+        registry.close()
+
+    def test_eviction_unsubscribes_from_price_ticks(self):
+        registry = self.registry(max_resident=1, incremental_valuation=True)
+        self.trade(registry, 'a', 1000.0)
+        self.trade(registry, 'b', 1000.0)
+        self.assertEqual(len(self.prices._subscribers()), 1)
+        registry.close()
+        self.assertEqual(self.prices._subscribers(), [])
+
+    def test_slow_load_does_not_block_other_sessions(self):
+        entered, release = threading.Event(), threading.Event()
+
+        class SlowAccount(ConcurrentAccount):
+            def __init__(self, *args, **kwargs):
+                if not entered.is_set():
+                    entered.set()
+                    release.wait(5)
+                super().__init__(*args, **kwargs)
+
+        registry = self.registry(account_class=SlowAccount)
+        threads = [threading.Thread(target=self.trade, args=(registry, 'slow', 1000.0)) for _ in range(2)]
+        threads[0].start()
+        entered.wait(5)
+        threads[1].start()
+        self.trade(registry, 'fast', 1000.0)
+        self.assertFalse(release.is_set())
+        self.assertNotIn('slow', registry)
+        release.set()
+        for thread in threads:
+            thread.join()
+        with registry.session('slow') as session:
+            self.assertEqual(session.account.balance, 1700.0)
+        self.assertEqual(registry.stats()['created'], 2)
+        registry.close()
+
+    def test_expired_sessions_are_purged(self):
+        registry = self.registry(retention=86400.0)
+        for session_id in ('stale', 'fresh', 'resident'):
+            self.trade(registry, session_id, 1000.0)
+        registry.close()
+        with registry.session('resident'):
+            pass
+        old = time.time() - 2 * 86400
+        for session_id in ('stale', 'resident'):
+            path = os.path.join(self.directory, session_id)
+            for name in os.listdir(path):
+                os.utime(os.path.join(path, name), (old, old))
+            os.utime(path, (old, old))
+        self.assertEqual(registry.purge_expired(), 1)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['fresh', 'resident'])
+        self.assertEqual(registry.stats()['purged'], 1)
+        with registry.session('stale') as session:
+            self.assertEqual(session.account.balance, 0.0)
+        registry.close()
+
+    def test_invalid_session_id(self):
+        registry = self.registry()
+        with self.assertRaisesRegex(ValueError, "Invalid session id"):
+            with registry.session('../escape'):
+                pass
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import random
+import unittest
+
+from accounts import Account
+from price_provider import StubPriceProvider
+import shards
+from shards import AsyncShardClient, ShardedAccountService, shard_of
+
+
+class TestShardedAccountService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ShardedAccountService(3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.close()
+
+    def test_matches_in_process_accounts(self):
+        rng = random.Random(3)
+        local = {}
+        provider = StubPriceProvider()
+        requests = []
+        for _ in range(2000):
+            account_id = f"match-{rng.randrange(50)}"
+            op, args = rng.choice([("deposit", (100.0,)), ("withdraw", (30.0,)),
+                                   ("buy", ("AAPL", 1)), ("sell", ("AAPL", 1))])
+            requests.append((account_id, op, args))
+
+        expected = []
+        for account_id, op, args in requests:
+            account = local.setdefault(account_id, Account(price_provider=provider))
+            try:
+                getattr(account, op)(*args)
+                expected.append((True, None))
+            except ValueError as e:
+                expected.append((False, str(e)))
+
+        replies = []
+        for start in range(0, len(requests), 250):
+            replies.extend(self.service.execute(requests[start:start + 250]))
+        self.assertEqual(replies, expected)
+        for account_id, account in local.items():
+            self.assertEqual(self.service.call(account_id, "get_balance"), account.balance)
+            self.assertEqual(self.service.call(account_id, "get_holdings"), account.holdings)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "Insufficient funds"):
+            self.service.call("errors", "withdraw", 1.0)
+        with self.assertRaisesRegex(ValueError, "Unknown operation"):
+            self.service.call("errors", "launder", 1.0)
+        with self.assertRaisesRegex(ValueError, "TypeError"):
+            self.service.call("errors", "buy", "AAPL", "many")
+        # The shard survives an unexpected error.
+        self.assertEqual(self.service.call("errors", "get_balance"), 0.0)
+
+    def test_routing_is_stable(self):
+        self.assertEqual(shard_of(7, 3), 1)
+        self.assertEqual(shard_of("alice", 3), shard_of("alice", 3))
+        self.assertEqual({shard_of(f"acct-{i}", 3) for i in range(100)}, {0, 1, 2})
+
+    def test_async_client(self):
+        async def trader(client, account_id):
+            await client.call(account_id, "deposit", 1000.0)
+            for _ in range(5):
+                await client.call(account_id, "buy", "AAPL", 1)
+            with self.assertRaisesRegex(ValueError, "Insufficient holdings"):
+                await client.call(account_id, "sell", "TSLA", 1)
+            return await client.call(account_id, "get_portfolio_value")
+
+        async def main():
+            client = AsyncShardClient(self.service)
+            try:
+                return await asyncio.gather(*(trader(client, f"async-{i}") for i in range(40)))
+            finally:
+                client.close()
+
+        self.assertEqual(asyncio.run(main()), [1000.0] * 40)
+
+
+class TestShardFailure(unittest.TestCase):
+    def test_async_calls_fail_when_a_shard_dies(self):
+        # Forked workers inherit this extra operation.
+        shards.OPS["crash"] = lambda account: os._exit(1)
+        try:
+            service = ShardedAccountService(2, mp_context="fork")
+        finally:
+            del shards.OPS["crash"]
+        dead = shard_of("victim", 2)
+        alive = next(f"other-{i}" for i in range(10) if shard_of(f"other-{i}", 2) != dead)
+
+        async def main():
+            client = AsyncShardClient(service)
+            try:
+                results = await asyncio.gather(client.call("victim", "deposit", 10.0),
+                                               client.call("victim", "crash"),
+                                               client.call(alive, "deposit", 10.0),
+                                               return_exceptions=True)
+                with self.assertRaises(ConnectionError):
+                    await client.call("victim", "get_balance")
+                return results, await client.call(alive, "get_balance")
+            finally:
+                client.close()
+
+        try:
+            (victim, crash, other), balance = asyncio.run(asyncio.wait_for(main(), 10))
+        finally:
+            service.close()
+        self.assertIsInstance(victim, ConnectionError)
+        self.assertIsInstance(crash, ConnectionError)
+        self.assertIsNone(other)
+        self.assertEqual(balance, 10.0)
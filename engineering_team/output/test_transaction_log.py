@@ -0,0 +1,78 @@
+import time
+import unittest
+
+from accounts import Account
+from price_provider import StubPriceProvider
+from transaction_log import TransactionLog
+
+
+class TestTransactionLog(unittest.TestCase):
+    def setUp(self):
+        self.account = Account(price_provider=StubPriceProvider())
+        self.log = TransactionLog(self.account)
+        self.account.deposit(1000.0)
+        self.account.buy('AAPL', 2)
+        self.account.buy('TSLA', 1)
+        self.account.sell('AAPL', 1)
+        self.account.withdraw(50.0)
+
+    def test_rows_match_history_formatting(self):
+        rows = self.log.page(page_size=10)
+        self.assertEqual(len(rows), 5)
+        newest, oldest = rows[0], rows[-1]
+        self.assertEqual(newest[1:], ['WITHDRAWAL', '$-50.00', '-', '-', '-'])
+        self.assertEqual(oldest[1:], ['DEPOSIT', '$1,000.00', '-', '-', '-'])
+        self.assertEqual(rows[1][1:], ['SELL', '$150.00', 'AAPL', '1', '$150.00'])
+        expected_time = self.account.get_transaction_history()[0].timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        self.assertEqual(oldest[0], expected_time)
+
+    def test_only_returned_rows_are_formatted(self):
+        self.assertEqual(self.log.refresh(), 5)
+        self.assertEqual(self.log._formatted, {})
+        newest = self.log.page(1, 2)
+        self.assertEqual(sorted(self.log._formatted), [3, 4])
+        self.account.deposit(1.0)
+        self.assertEqual(self.log.refresh(), 6)
+        self.assertIs(self.log.page(1, 3)[1], newest[0])
+
+    def test_pagination(self):
+        self.assertEqual([r[1] for r in self.log.page(1, 2)], ['WITHDRAWAL', 'SELL'])
+        self.assertEqual([r[1] for r in self.log.page(2, 2)], ['BUY', 'BUY'])
+        self.assertEqual([r[1] for r in self.log.page(3, 2)], ['DEPOSIT'])
+        self.assertEqual(self.log.page(4, 2), [])
+
+    def test_filters(self):
+        self.assertEqual([r[3] for r in self.log.page(tx_type='BUY')], ['TSLA', 'AAPL'])
+        self.assertEqual([r[1] for r in self.log.page(symbol='AAPL')], ['SELL', 'BUY'])
+        self.assertEqual([r[1] for r in self.log.page(tx_type='BUY', symbol='AAPL')], ['BUY'])
+        self.assertEqual(self.log.page(2, 1, tx_type='BUY', symbol='TSLA'), [])
+        self.assertEqual(self.log.count(symbol='AAPL'), 2)
+        self.assertEqual(self.log.count(tx_type='SELL', symbol='TSLA'), 0)
+
+    def test_delta(self):
+        delta = self.log.delta(-1, limit=3)
+        self.assertEqual([r[0] for r in delta['rows']], [0, 1, 2])
+        self.assertTrue(delta['more'])
+        delta = self.log.delta(delta['last_id'])
+        self.assertEqual([r[0] for r in delta['rows']], [3, 4])
+        self.assertFalse(delta['more'])
+        self.assertEqual(self.log.delta(delta['last_id']), {'last_id': 4, 'more': False, 'rows': []})
+
+    def test_refresh_cost_stays_flat(self):
+        for _ in range(200_000):
+            self.account.deposit(1.0)
+        self.log.refresh()
+        start = time.perf_counter()
+        for _ in range(100):
+            self.account.deposit(1.0)
+            self.log.page(1, 50)
+            self.log.delta(self.log.indexed - 2)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_upto_caps_rows_at_snapshot(self):
+        rows = len(self.account.get_transaction_history())
+        self.account.buy('AAPL', 1)
+        self.assertEqual(self.log.count(upto=rows), 5)
+        self.assertEqual(self.log.count(tx_type='BUY', upto=rows), 2)
+        self.assertEqual(self.log.page(1, 1, upto=rows)[0][1], 'WITHDRAWAL')
+        self.assertEqual([r[3] for r in self.log.page(tx_type='BUY', symbol='AAPL', upto=rows)], ['AAPL'])
@@ -0,0 +1,121 @@
+import bisect
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from accounts import Account, TRANSACTION_TYPES
+
+HEADERS = ["Time", "Type", "Net Amount", "Symbol", "Quantity", "Price/Share"]
+
+
+def format_currency(value):
+    """Helper to format currency strings."""
+    return f"${value:,.2f}"
+
+
+class TransactionLog:
+    """
+    Display rows for an account's transaction history.
+    Each refresh only indexes transactions added since the previous one, by
+    type, by symbol and by (type, symbol), and rows are formatted the first
+    time a page or delta returns them. A page then costs a binary search plus
+    formatting its own rows, and a refresh costs O(new transactions), however
+    long the history grows. Transaction ids are ledger row numbers.
+    """
+    def __init__(self, account: Account):
+        self.account = account
+        self.indexed = 0
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_symbol: Dict[str, List[int]] = {}
+        self.by_type_symbol: Dict[Tuple[str, str], List[int]] = {}
+        self._formatted: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """
+        Indexes any new transactions. Returns the total number of rows.
+        """
+        with self._lock:
+            ledger = self.account.transactions
+            stop = len(self.account.get_transaction_history())
+            for row in range(self.indexed, stop):
+                tx_type = TRANSACTION_TYPES[ledger.types[row]]
+                self.by_type.setdefault(tx_type, []).append(row)
+                sid = ledger.symbol_ids[row]
+                if sid >= 0:
+                    symbol = ledger.symbols[sid]
+                    self.by_symbol.setdefault(symbol, []).append(row)
+                    self.by_type_symbol.setdefault((tx_type, symbol), []).append(row)
+            self.indexed = stop
+            return stop
+
+    def row(self, row: int) -> List[str]:
+        """
+        Returns the formatted display row for a transaction id, formatting it once.
+        """
+        formatted = self._formatted.get(row)
+        if formatted is None:
+            ledger = self.account.transactions
+            scale = ledger.scale
+            sid = ledger.symbol_ids[row]
+            quantity = ledger.quantities[row]
+            price = ledger.prices[row]
+            seconds = ledger.timestamps[row] // 1_000_000_000
+            formatted = self._formatted.setdefault(row, [
+                datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S"),
+                TRANSACTION_TYPES[ledger.types[row]],
+                format_currency(ledger.amounts[row] / scale),
+                ledger.symbols[sid] if sid >= 0 else "-",
+                str(quantity) if quantity else "-",
+                format_currency(price / scale) if price else "-"
+            ])
+        return formatted
+
+    def _matching(self, tx_type: Optional[str], symbol: Optional[str], upto: Optional[int]):
+        """
+        Returns (row ids, end) for a filter; ids are ascending and only
+        ids[:end] lie below `upto`.
+        """
+        if tx_type and symbol:
+            ids = self.by_type_symbol.get((tx_type, symbol), [])
+        elif tx_type:
+            ids = self.by_type.get(tx_type, [])
+        elif symbol:
+            ids = self.by_symbol.get(symbol, [])
+        else:
+            ids = range(self.indexed)
+        end = len(ids) if upto is None else bisect.bisect_left(ids, upto)
+        return ids, end
+
+    def page(self, page: int = 1, page_size: int = 50, tx_type: Optional[str] = None,
+             symbol: Optional[str] = None, upto: Optional[int] = None) -> List[List[str]]:
+        """
+        Returns one page of formatted rows, newest first, optionally filtered.
+        `upto` caps the rows considered, e.g. at an AccountSnapshot's row count.
+        """
+        self.refresh()
+        ids, end = self._matching(tx_type, symbol, upto)
+        stop = end - (max(page, 1) - 1) * page_size
+        return [self.row(row) for row in reversed(ids[max(stop - page_size, 0):max(stop, 0)])]
+
+    def count(self, tx_type: Optional[str] = None, symbol: Optional[str] = None,
+              upto: Optional[int] = None) -> int:
+        """
+        Returns the number of rows matching a filter.
+        """
+        self.refresh()
+        return self._matching(tx_type, symbol, upto)[1]
+
+    def delta(self, last_seen_id: int = -1, limit: int = 500) -> dict:
+        """
+        Returns up to `limit` rows the client has not seen yet, oldest first, as
+        {"last_id": id of the last row returned, "more": bool, "rows": [[id, *row], ...]}.
+        """
+        total = self.refresh()
+        start = max(last_seen_id + 1, 0)
+        stop = min(start + limit, total)
+        return {
+            "last_id": max(stop - 1, last_seen_id),
+            "more": stop < total,
+            "rows": [[row] + self.row(row) for row in range(start, stop)],
+        }
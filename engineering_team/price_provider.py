@@ -0,0 +1,210 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Fixed test prices for the trading simulation.
+DEFAULT_PRICES: Dict[str, float] = {
+    'AAPL': 150.0,
+    'TSLA': 200.0,
+    'GOOGL': 2800.0
+}
+
+
+class PriceProvider(ABC):
+    """
+    Source of current share prices. Implementations only need the bulk lookup;
+    unknown symbols are reported with a price of 0.0.
+    """
+    @abstractmethod
+    def get_share_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        Returns a {symbol: price} mapping for every requested symbol.
+        """
+
+    def get_share_price(self, symbol: str) -> float:
+        """
+        Returns the current price of a single symbol.
+        """
+        return self.get_share_prices([symbol])[symbol]
+
+    def subscribe(self, callback: Callable[[str, float], None]) -> None:
+        """
+        Registers callback(symbol, price) to be called on every price tick.
+        """
+        self._subscribers().append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, float], None]) -> None:
+        """
+        Removes a callback registered with subscribe().
+        """
+        self._subscribers().remove(callback)
+
+    def publish(self, symbol: str, price: float) -> None:
+        """
+        Delivers a price tick to every subscriber.
+        """
+        for callback in list(self._subscribers()):
+            callback(symbol, price)
+
+    def _subscribers(self) -> List[Callable[[str, float], None]]:
+        subscribers = self.__dict__.get('_tick_subscribers')
+        if subscribers is None:
+            subscribers = self._tick_subscribers = []
+        return subscribers
+
+
+class FunctionPriceProvider(PriceProvider):
+    """
+    Adapts a single-symbol price function such as get_share_price.
+    """
+    def __init__(self, func: Callable[[str], float]):
+        self.func = func
+
+    def get_share_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        return {symbol: self.func(symbol) for symbol in symbols}
+
+
+class StubPriceProvider(PriceProvider):
+    """
+    Offline provider backed by a local price table, for demos and tests.
+    `latency` simulates the round trip of a remote source; `fetches` counts bulk calls.
+    """
+    def __init__(self, prices: Optional[Dict[str, float]] = None, latency: float = 0.0):
+        self.prices = {s.upper(): p for s, p in (prices or DEFAULT_PRICES).items()}
+        self.latency = latency
+        self.fetches = 0
+
+    def set_price(self, symbol: str, price: float) -> None:
+        """
+        Updates a price and publishes it as a tick.
+        """
+        symbol = symbol.upper()
+        self.prices[symbol] = price
+        self.publish(symbol, price)
+
+    def get_share_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        self.fetches += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {symbol: self.prices.get(symbol.upper(), 0.0) for symbol in symbols}
+
+
+class CachedPriceProvider(PriceProvider):
+    """
+    Read-through cache in front of another provider.
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted beyond `maxsize`. Concurrent lookups of a symbol that is already
+    being fetched wait for that fetch instead of issuing their own, and all
+    missing symbols of a call are fetched in one bulk request. Symbols are
+    case-insensitive. Entries carry the tick version they were written at, so
+    a fetch that returns after a newer tick never overwrites it.
+    """
+    def __init__(self, source: PriceProvider, ttl: float = 5.0, maxsize: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # symbol -> (price, stored_at, version)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        source.subscribe(self._on_source_tick)
+
+    def _on_source_tick(self, symbol: str, price: float) -> None:
+        # Ticks refresh a cached or in-flight symbol and are passed on to our own subscribers.
+        key = symbol.upper()
+        with self._lock:
+            self._version += 1
+            if key in self._cache or key in self._inflight:
+                self._cache[key] = (price, self.clock(), self._version)
+        self.publish(symbol, price)
+
+    def get_share_prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        requested = list(symbols)
+        prices: Dict[str, float] = {}
+        waiting: Dict[str, Future] = {}
+        owned: Dict[str, Future] = {}
+
+        with self._lock:
+            now = self.clock()
+            started = self._version
+            for symbol in requested:
+                key = symbol.upper()
+                if key in prices or key in waiting or key in owned:
+                    continue
+                entry = self._cache.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self._cache.move_to_end(key)
+                    prices[key] = entry[0]
+                    self.hits += 1
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                    self.coalesced += 1
+                else:
+                    owned[key] = self._inflight[key] = Future()
+                    self.misses += 1
+
+        if owned:
+            self._fetch(owned, started)
+        for key, future in {**owned, **waiting}.items():
+            prices[key] = future.result()
+        return {symbol: prices[symbol.upper()] for symbol in requested}
+
+    def _fetch(self, owned: Dict[str, Future], started: int) -> None:
+        try:
+            prices = self.source.get_share_prices(list(owned))
+        except BaseException as exc:
+            with self._lock:
+                for symbol, future in owned.items():
+                    del self._inflight[symbol]
+                    future.set_exception(exc)
+            raise
+
+        with self._lock:
+            fetched_at = self.clock()
+            for symbol, future in owned.items():
+                entry = self._cache.get(symbol)
+                if entry is not None and entry[2] > started:
+                    # A tick arrived during the fetch and is newer than its result.
+                    price = entry[0]
+                else:
+                    price = prices.get(symbol, 0.0)
+                    self._cache[symbol] = (price, fetched_at, started)
+                self._cache.move_to_end(symbol)
+                del self._inflight[symbol]
+                future.set_result(price)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, symbols: Optional[List[str]] = None) -> None:
+        """
+        Drops cached prices for the given symbols, or for every symbol.
+        """
+        with self._lock:
+            if symbols is None:
+                self._cache.clear()
+            else:
+                for symbol in symbols:
+                    self._cache.pop(symbol.upper(), None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns hit/miss counters and the current hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'size': len(self._cache),
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -2,6 +2,8 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
+from .llm_cache import cache_llms
+from .scheduler import DagCrew
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
@@ -82,10 +84,10 @@ class EngineeringTeam():
         
     @crew
     def crew(self) -> Crew:
-        return Crew(
+        return cache_llms(DagCrew(
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
-        )
+        ))
    
\ No newline at end of file
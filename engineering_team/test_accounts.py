@@ -1,8 +1,11 @@
-
 import unittest
 from unittest.mock import patch, MagicMock
-from accounts import Account, Transaction, get_share_price
+from accounts import Account, ConcurrentAccount, Order, Transaction, TransactionLedger, get_share_price, to_units
+from price_provider import StubPriceProvider
 import datetime
+import random
+import sys
+import threading
 
 class TestAccount(unittest.TestCase):
     def setUp(self):
@@ -174,3 +177,469 @@ class TestAccount(unittest.TestCase):
         history = self.account.get_transaction_history()
         self.assertEqual(len(history), 1)
         self.assertEqual(history, self.account.transactions)
+
+class TestTransactionLedger(unittest.TestCase):
+    def setUp(self):
+        self.ledger = TransactionLedger()
+
+    def test_failed_record_leaves_columns_aligned(self):
+        self.ledger.record("DEPOSIT", to_units(100.0))
+        with self.assertRaises(OverflowError):
+            self.ledger.record("DEPOSIT", 2 ** 63)
+        with self.assertRaises(OverflowError):
+            self.ledger.record_many([("DEPOSIT", 1, None, None, None), ("SELL", 1, "AAPL", 1, 2 ** 63)])
+        with self.assertRaises(KeyError):
+            self.ledger.record("REFUND", 1)
+        columns = (self.ledger.timestamps, self.ledger.types, self.ledger.amounts, self.ledger.symbol_ids,
+                   self.ledger.quantities, self.ledger.prices)
+        self.assertEqual([len(column) for column in columns], [1] * 6)
+        self.assertEqual(self.ledger.record("DEPOSIT", 1), 1)
+
+    def test_record_and_materialize(self):
+        self.ledger.record("DEPOSIT", to_units(100.0))
+        self.ledger.record("BUY", to_units(-50.0), "AAPL", 5, to_units(10.0))
+        self.assertEqual(len(self.ledger), 2)
+
+        deposit = self.ledger[0]
+        self.assertEqual(deposit.type, "DEPOSIT")
+        self.assertEqual(deposit.amount, 100.0)
+        self.assertIsNone(deposit.symbol)
+        self.assertIsNone(deposit.quantity)
+        self.assertIsNone(deposit.price)
+
+        buy = self.ledger[-1]
+        self.assertEqual((buy.type, buy.amount, buy.symbol, buy.quantity, buy.price),
+                         ("BUY", -50.0, "AAPL", 5, 10.0))
+
+    def test_symbols_are_interned(self):
+        self.ledger.record("BUY", to_units(-10.0), "AAPL", 1, to_units(10.0))
+        self.ledger.record("BUY", to_units(-20.0), "TSLA", 1, to_units(20.0))
+        self.ledger.record("SELL", to_units(10.0), "AAPL", 1, to_units(10.0))
+        self.assertEqual(self.ledger.symbols, ["AAPL", "TSLA"])
+        self.assertEqual(list(self.ledger.symbol_ids), [0, 1, 0])
+
+    def test_append_transaction_round_trip(self):
+        ts = datetime.datetime(2024, 1, 2, 3, 4, 5, 678901)
+        tx = Transaction(timestamp=ts, type="SELL", amount=40.0, symbol="TEST", quantity=2, price=20.0)
+        self.ledger.append(tx)
+        self.assertEqual(self.ledger[0], tx)
+
+    def test_views_are_lazy_and_sliceable(self):
+        for i in range(10):
+            self.ledger.record("DEPOSIT", to_units(i + 1))
+        view = self.ledger.view()
+        tail = view[-3:]
+        self.assertEqual([t.amount for t in tail], [8.0, 9.0, 10.0])
+        self.assertEqual([t.amount for t in view[::4]], [1.0, 5.0, 9.0])
+        self.assertEqual(reversed(view).__next__().amount, 10.0)
+
+        # A view covers the rows present when it was taken.
+        self.ledger.record("DEPOSIT", to_units(11.0))
+        self.assertEqual(len(view), 10)
+        self.assertEqual(len(self.ledger.view()), 11)
+
+    def test_history_is_a_view(self):
+        account = Account()
+        account.deposit(100.0)
+        account.withdraw(25.0)
+        history = account.get_transaction_history()
+        self.assertNotIsInstance(history, list)
+        self.assertEqual([t.type for t in history], ["DEPOSIT", "WITHDRAWAL"])
+        self.assertEqual(history[1:][0].amount, -25.0)
+
+
+class TestIncrementalValuation(unittest.TestCase):
+    def setUp(self):
+        self.prices = StubPriceProvider()
+        self.account = Account(price_provider=self.prices, incremental_valuation=True,
+                               verify_valuation=True)
+
+    def test_trades_and_ticks_update_value(self):
+        self.account.deposit(1000.0)
+        self.account.buy('AAPL', 2)  # 300, balance 700
+        self.account.buy('TSLA', 1)  # 200, balance 500
+        self.assertEqual(self.account.get_portfolio_value(), 1000.0)
+
+        self.prices.set_price('AAPL', 175.0)
+        self.assertEqual(self.account.get_holdings_value(), 550.0)
+        self.assertEqual(self.account.get_profit_loss(), 50.0)
+
+        # Ticks for symbols not held do not change the valuation.
+        self.prices.set_price('GOOGL', 3000.0)
+        self.assertEqual(self.account.get_portfolio_value(), 1050.0)
+
+        self.account.sell('AAPL', 2)  # 350, balance 850
+        self.account.sell('TSLA', 1)  # 200, balance 1050
+        self.assertEqual(self.account.get_holdings_value(), 0.0)
+        self.assertEqual(self.account.get_portfolio_value(), 1050.0)
+
+    def test_matches_full_recompute_over_many_ticks(self):
+        self.account.deposit(1_000_000.0)
+        for symbol in ('AAPL', 'TSLA', 'GOOGL'):
+            self.account.buy(symbol, 7)
+        for i in range(10_000):
+            self.account.on_price_tick(('AAPL', 'TSLA', 'GOOGL')[i % 3], 100.0 + (i % 97) * 0.37)
+            self.account.get_holdings_value()
+
+    def test_large_batch_value_is_exact(self):
+        self.account.deposit(10_000_000.0)
+        self.account.buy('AAPL', 1)
+        orders = [Order('BUY', ('TSLA', 'GOOGL', 'AAPL')[i % 3], 1) for i in range(5000)]
+        self.assertTrue(all(r.filled for r in self.account.execute_batch(orders)))
+        self.assertEqual(self.account.get_holdings_value(), 1667 * (150.0 + 200.0 + 2800.0))
+
+    def test_verify_detects_drift(self):
+        self.account.deposit(1000.0)
+        self.account.buy('AAPL', 1)
+        self.account._holdings_value += 1
+        with self.assertRaises(AssertionError):
+            self.account.get_portfolio_value()
+
+    def test_concurrent_account_verifies_on_read(self):
+        account = ConcurrentAccount(price_provider=self.prices, incremental_valuation=True,
+                                    verify_valuation=True)
+        account.deposit(1000.0)
+        account.buy('AAPL', 1)
+        self.assertEqual(account.get_holdings_value(), 150.0)
+        account._holdings_value += 1
+        for read in (account.get_holdings_value, account.get_portfolio_value, account.get_profit_loss):
+            with self.assertRaises(AssertionError):
+                read()
+
+
+class TestPointInTimeQueries(unittest.TestCase):
+    def setUp(self):
+        self.prices = StubPriceProvider()
+        self.account = Account(price_provider=self.prices, checkpoint_interval=4)
+
+    def run_history(self):
+        """Runs a sequence of operations, returning (timestamp, holdings, P&L) after each trade."""
+        steps = [
+            lambda: self.account.deposit(1000.0),
+            lambda: self.account.buy('AAPL', 2),
+            lambda: self.prices.set_price('AAPL', 160.0),
+            lambda: self.account.buy('AAPL', 1),
+            lambda: self.account.buy('TSLA', 1),
+            lambda: self.account.sell('AAPL', 3),
+            lambda: self.account.withdraw(100.0),
+            lambda: self.prices.set_price('TSLA', 250.0),
+            lambda: self.account.sell('TSLA', 1),
+            lambda: self.account.deposit(5.0),
+        ]
+        expected = []
+        for step in steps:
+            rows = len(self.account.transactions)
+            step()
+            # Every step that records a transaction leaves live prices equal to the last traded ones.
+            if len(self.account.transactions) > rows:
+                expected.append((self.account.transactions.timestamps[-1],
+                                 dict(self.account.holdings), self.account.get_profit_loss()))
+        return expected
+
+    def test_holdings_and_profit_loss_at_each_step(self):
+        for timestamp, holdings, profit_loss in self.run_history():
+            self.assertEqual(self.account.get_holdings_at(timestamp), holdings)
+            self.assertEqual(self.account.get_profit_loss_at(timestamp), profit_loss)
+
+    def test_before_first_transaction(self):
+        self.run_history()
+        first = self.account.transactions.timestamps[0]
+        self.assertEqual(self.account.get_holdings_at(first - 1), {})
+        self.assertEqual(self.account.get_profit_loss_at(first - 1), 0.0)
+
+    def test_accepts_datetime_and_explicit_prices(self):
+        self.account.deposit(1000.0)
+        self.account.buy('AAPL', 2)
+        when = self.account.get_transaction_history()[-1].timestamp + datetime.timedelta(seconds=1)
+        self.assertEqual(self.account.get_holdings_at(when), {'AAPL': 2})
+        self.assertEqual(self.account.get_profit_loss_at(when, prices={'AAPL': 200.0}), 100.0)
+
+    def test_checkpoints_are_spaced_by_interval(self):
+        for _ in range(10):
+            self.account.deposit(1.0)
+        self.assertEqual([c.rows for c in self.account._checkpoints], [0, 4, 8])
+
+    def test_clock_stepping_back_does_not_reorder_rows(self):
+        self.account.deposit(1000.0)
+        with patch('accounts.time.time_ns', return_value=self.account.transactions.timestamps[0] - 10**9):
+            self.account.buy('AAPL', 2)
+        timestamps = self.account.transactions.timestamps
+        self.assertEqual(timestamps[1], timestamps[0])
+        self.assertEqual(self.account.get_holdings_at(timestamps[1]), {'AAPL': 2})
+
+    def test_late_rows_are_replayed_by_timestamp(self):
+        for _ in range(6):
+            self.account.deposit(1.0)
+        ledger = self.account.transactions
+        first, last = ledger.timestamps[0], ledger.timestamps[-1]
+        ledger.record('BUY', -to_units(100.0), 'AAPL', 1, to_units(100.0), timestamp_ns=first - 1)
+        ledger.record('BUY', -to_units(100.0), 'TSLA', 1, to_units(100.0), timestamp_ns=last + 10)
+        ledger.record('BUY', -to_units(100.0), 'AAPL', 1, to_units(100.0), timestamp_ns=last + 5)
+        self.assertEqual(ledger.first_late_row(), 6)
+        self.assertEqual(self.account.get_holdings_at(first - 1), {'AAPL': 1})
+        self.assertEqual(self.account.get_holdings_at(last), {'AAPL': 1})
+        self.assertEqual(self.account.get_holdings_at(last + 5), {'AAPL': 2})
+        self.assertEqual(self.account.get_holdings_at(last + 10), {'AAPL': 2, 'TSLA': 1})
+
+
+class TestExecuteBatch(unittest.TestCase):
+    def setUp(self):
+        self.prices = StubPriceProvider()
+        self.account = Account(price_provider=self.prices)
+        self.account.deposit(1000.0)
+        self.account.buy('AAPL', 4)  # 600, balance 400
+
+    def test_explicit_prices_skip_lookup(self):
+        fetches = self.prices.fetches
+        results = self.account.execute_batch([Order('SELL', 'AAPL', 2)], prices={'AAPL': 175.0})
+        self.assertEqual(results[0].amount, 350.0)
+        self.assertEqual(self.prices.fetches, fetches)
+
+    def test_sells_settle_before_buys(self):
+        # The TSLA buy is only affordable with the proceeds of the AAPL sell.
+        orders = [Order('BUY', 'TSLA', 3), Order('SELL', 'AAPL', 4)]
+        results = self.account.execute_batch(orders)
+        self.assertTrue(all(r.filled for r in results))
+        self.assertEqual([r.order for r in results], orders)
+        self.assertEqual(results[0].amount, -600.0)
+        self.assertEqual(self.account.balance, 400.0)
+        self.assertEqual(self.account.get_holdings(), {'TSLA': 3})
+        history = self.account.get_transaction_history()
+        self.assertEqual([(t.type, t.symbol) for t in history[-2:]], [('SELL', 'AAPL'), ('BUY', 'TSLA')])
+        self.assertEqual(history[-1].timestamp, history[-2].timestamp)
+
+    def test_one_bulk_price_lookup(self):
+        fetches = self.prices.fetches
+        self.account.execute_batch([Order('BUY', 'AAPL', 1), Order('BUY', 'TSLA', 1), Order('SELL', 'AAPL', 1)])
+        self.assertEqual(self.prices.fetches, fetches + 1)
+
+    def test_atomic_batch_is_all_or_nothing(self):
+        before = (self.account.balance, dict(self.account.holdings), len(self.account.transactions))
+        results = self.account.execute_batch([Order('SELL', 'AAPL', 1), Order('BUY', 'GOOGL', 1)])
+        self.assertEqual([r.filled for r in results], [False, False])
+        self.assertEqual(results[1].error, "Insufficient funds.")
+        self.assertEqual(results[0].error, "Batch rejected: Insufficient funds.")
+        self.assertEqual((self.account.balance, self.account.holdings, len(self.account.transactions)), before)
+
+    def test_best_effort_skips_invalid_orders(self):
+        results = self.account.execute_batch(
+            [Order('SELL', 'AAPL', 5), Order('BUY', 'NOPE', 1), Order('BUY', 'TSLA', 1), Order('BUY', 'TSLA', 0)],
+            atomic=False)
+        self.assertEqual([r.filled for r in results], [False, False, True, False])
+        self.assertEqual(results[0].error, "Insufficient holdings.")
+        self.assertEqual(results[1].error, "Invalid symbol 'NOPE' or price unavailable.")
+        self.assertEqual(results[3].error, "Quantity must be positive.")
+        self.assertEqual(self.account.balance, 200.0)
+        self.assertEqual(self.account.holdings, {'AAPL': 4, 'TSLA': 1})
+
+    def test_matches_sequential_execution(self):
+        other = Account(price_provider=self.prices)
+        other.deposit(1000.0)
+        other.buy('AAPL', 4)
+        self.account.execute_batch([Order('BUY', 'TSLA', 1), Order('SELL', 'AAPL', 2)])
+        other.sell('AAPL', 2)
+        other.buy('TSLA', 1)
+        self.assertEqual(self.account.balance, other.balance)
+        self.assertEqual(self.account.holdings, other.holdings)
+        self.assertEqual(self.account.get_portfolio_value(), other.get_portfolio_value())
+
+
+class TestFixedPointMoney(unittest.TestCase):
+    def test_repeated_small_amounts_do_not_drift(self):
+        account = Account()
+        for _ in range(10_000):
+            account.deposit(0.1)
+        self.assertEqual(account.balance, 1000.0)
+        for _ in range(10_000):
+            account.withdraw(0.1)
+        self.assertEqual(account.balance, 0.0)
+
+    def test_ledger_sums_exactly_to_the_balance(self):
+        prices = StubPriceProvider()
+        account = Account(price_provider=prices)
+        account.deposit(100_000.0)
+        rng = random.Random(3)
+        for _ in range(2000):
+            prices.set_price('AAPL', rng.uniform(100.0, 200.0))
+            try:
+                (account.buy if rng.random() < 0.5 else account.sell)('AAPL', rng.randint(1, 5))
+            except ValueError:
+                pass
+        self.assertEqual(sum(account.transactions.amounts), account.balance_units)
+
+    def test_prices_are_rounded_to_money_decimals(self):
+        account = Account(price_provider=StubPriceProvider({'AAPL': 150.126}), money_decimals=2)
+        account.deposit(1000.0)
+        account.buy('AAPL', 3)
+        self.assertEqual(account.get_transaction_history()[-1].price, 150.13)
+        self.assertEqual(account.balance, 549.61)
+        with self.assertRaisesRegex(ValueError, "Deposit amount must be positive"):
+            account.deposit(0.001)
+
+    def test_invalid_money_decimals(self):
+        with self.assertRaisesRegex(ValueError, "money_decimals must be between"):
+            Account(money_decimals=12)
+
+    def test_out_of_range_amounts_change_nothing(self):
+        account = Account(price_provider=StubPriceProvider({'AAPL': 1e14}))
+        account.deposit(9e14)
+        account.buy('AAPL', 9)
+        before = (account.balance_units, account.total_deposited_units, dict(account.holdings),
+                  len(account.transactions))
+        with self.assertRaisesRegex(ValueError, "exceeds the supported range"):
+            account.deposit(1e15)
+        account.price_provider.set_price('AAPL', 2e14)
+        with self.assertRaisesRegex(ValueError, "exceeds the supported range"):
+            account.sell('AAPL', 9)
+        results = account.execute_batch([Order("SELL", 'AAPL', 9)])
+        self.assertEqual(results[0].error, "Amount exceeds the supported range.")
+        self.assertEqual((account.balance_units, account.total_deposited_units, dict(account.holdings),
+                          len(account.transactions)), before)
+        account.sell('AAPL', 1)
+
+
+class TestPositionReport(unittest.TestCase):
+    def trade(self, method):
+        prices = StubPriceProvider({'AAPL': 100.0, 'TSLA': 200.0})
+        account = Account(price_provider=prices, cost_basis_method=method)
+        account.deposit(10000.0)
+        account.buy('AAPL', 10)
+        prices.set_price('AAPL', 120.0)
+        account.buy('AAPL', 10)
+        prices.set_price('AAPL', 150.0)
+        account.sell('AAPL', 15)
+        return account
+
+    def check(self, method, realized, cost_basis):
+        account = self.trade(method)
+        position = account.get_position_report()['AAPL']
+        self.assertEqual(position.quantity, 5)
+        self.assertEqual(position.realized_pnl, realized)
+        self.assertEqual(position.cost_basis, cost_basis)
+        self.assertEqual(position.average_cost, cost_basis / 5)
+        self.assertEqual(position.market_value, 750.0)
+        self.assertEqual(position.unrealized_pnl, 750.0 - cost_basis)
+        self.assertEqual(account.realized_pnl, realized)
+        self.assertEqual(position.realized_pnl + position.unrealized_pnl, account.get_profit_loss())
+
+    def test_fifo(self):
+        self.check("FIFO", realized=650.0, cost_basis=600.0)
+
+    def test_lifo(self):
+        self.check("LIFO", realized=550.0, cost_basis=500.0)
+
+    def test_average_cost(self):
+        self.check("AVERAGE", realized=600.0, cost_basis=550.0)
+
+    def test_closed_position_keeps_realized_pnl(self):
+        account = self.trade("FIFO")
+        account.sell('AAPL', 5)
+        position = account.get_position_report()['AAPL']
+        self.assertEqual((position.quantity, position.cost_basis, position.market_value), (0, 0.0, 0.0))
+        self.assertEqual(position.realized_pnl, 800.0)
+
+    def test_batch_and_rebuild_match_live_lots(self):
+        for method in ("FIFO", "LIFO", "AVERAGE"):
+            prices = StubPriceProvider({'AAPL': 100.0, 'TSLA': 200.0})
+            account = Account(price_provider=prices, cost_basis_method=method)
+            account.deposit(1_000_000.0)
+            rng = random.Random(7)
+            for _ in range(300):
+                prices.set_price(rng.choice(['AAPL', 'TSLA']), rng.uniform(50.0, 300.0))
+                orders = [Order(rng.choice(['BUY', 'SELL']), rng.choice(['AAPL', 'TSLA']), rng.randint(1, 5))
+                          for _ in range(3)]
+                account.execute_batch(orders, atomic=False)
+            live = account.get_position_report()
+            self.assertAlmostEqual(sum(p.realized_pnl + p.unrealized_pnl for p in live.values()),
+                                   account.get_profit_loss())
+            account.rebuild_positions()
+            rebuilt = account.get_position_report()
+            self.assertEqual(rebuilt, live)
+
+    def test_invalid_method(self):
+        with self.assertRaisesRegex(ValueError, "cost_basis_method must be one of"):
+            Account(cost_basis_method="HIFO")
+
+
+class TestConcurrentAccount(unittest.TestCase):
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # force frequent thread switches
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_no_lost_updates_under_many_threads(self):
+        account = ConcurrentAccount(price_provider=StubPriceProvider())
+        n_threads, n_ops = 16, 400
+        succeeded = [0] * n_threads
+        inconsistent = []
+        stop = threading.Event()
+
+        def trader(index):
+            rng = random.Random(index)
+            for _ in range(n_ops):
+                action = rng.random()
+                try:
+                    if action < 0.4:
+                        account.deposit(100.0)
+                    elif action < 0.6:
+                        account.withdraw(150.0)
+                    elif action < 0.8:
+                        account.buy('AAPL', 1)
+                    else:
+                        account.sell('AAPL', 1)
+                    succeeded[index] += 1
+                except ValueError:
+                    pass
+
+        def reader():
+            # With fixed prices every consistent state has zero profit/loss.
+            while not stop.is_set():
+                snapshot = account.snapshot()
+                value = snapshot.balance + 150.0 * snapshot.holdings.get('AAPL', 0)
+                if snapshot.balance < 0 or abs(value - snapshot.net_invested) > 1e-6:
+                    inconsistent.append(snapshot)
+
+        threads = [threading.Thread(target=trader, args=(i,)) for i in range(n_threads)]
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads + readers:
+            t.start()
+        for t in threads:
+            t.join()
+        stop.set()
+        for t in readers:
+            t.join()
+
+        self.assertEqual(inconsistent, [])
+        history = account.get_transaction_history()
+        self.assertEqual(len(history), sum(succeeded))
+        self.assertEqual(sum(account.transactions.amounts[:len(history)]), account.balance_units)
+        shares = sum(t.quantity if t.type == 'BUY' else -t.quantity
+                     for t in history if t.type in ('BUY', 'SELL'))
+        self.assertEqual(account.get_holdings().get('AAPL', 0), shares)
+        self.assertGreaterEqual(account.balance, 0.0)
+        self.assertEqual(account.get_profit_loss(), 0.0)
+
+    def test_snapshots_are_immutable_versions(self):
+        account = ConcurrentAccount(price_provider=StubPriceProvider())
+        account.deposit(1000.0)
+        before = account.snapshot()
+        account.buy('AAPL', 2)
+        after = account.snapshot()
+        self.assertEqual(dict(before.holdings), {})
+        self.assertEqual(dict(after.holdings), {'AAPL': 2})
+        self.assertGreater(after.version, before.version)
+        with self.assertRaises(TypeError):
+            after.holdings['AAPL'] = 5
+
+    def test_wait_for_change(self):
+        account = ConcurrentAccount(price_provider=StubPriceProvider())
+        version = account.snapshot().version
+        self.assertEqual(account.wait_for_change(version, timeout=0.01).version, version)
+        timer = threading.Timer(0.05, account.deposit, args=(10.0,))
+        timer.start()
+        snapshot = account.wait_for_change(version, timeout=5.0)
+        timer.join()
+        self.assertGreater(snapshot.version, version)
+        self.assertEqual(snapshot.balance, 10.0)
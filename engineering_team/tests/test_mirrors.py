@@ -0,0 +1,35 @@
+import os
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+CREWS_WITH_SCHEDULER = ["engineering_team", "debate", "coder", "financial_researcher"]
+
+
+def module_path(crew, subpath):
+    """
+    Path, relative to the repository, of a module inside a crew's package.
+    """
+    return os.path.join(crew, "src", crew, subpath)
+
+
+# Files copied into several places, each crew being its own package. The
+# first path of each group is the copy to edit; the others must match it
+# byte for byte.
+MIRRORS = [
+    [module_path(crew, "scheduler.py") for crew in CREWS_WITH_SCHEDULER],
+    [module_path(crew, "llm_cache.py") for crew in ["stock_picker", *CREWS_WITH_SCHEDULER]],
+    [module_path(crew, os.path.join("tools", "search_cache.py")) for crew in ["stock_picker", "financial_researcher"]],
+    *[[os.path.join("engineering_team", "output", name), os.path.join("engineering_team", name)]
+      for name in ("accounts.py", "price_provider.py", "test_accounts.py")],
+]
+
+
+class TestMirroredModules(unittest.TestCase):
+    def test_copies_are_identical(self):
+        for canonical_path, *copies in MIRRORS:
+            with open(os.path.join(ROOT, canonical_path), "rb") as f:
+                canonical = f.read()
+            for path in copies:
+                with self.subTest(path=path):
+                    with open(os.path.join(ROOT, path), "rb") as f:
+                        self.assertTrue(f.read() == canonical, f"{path} differs from {canonical_path}; copy it over")
@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from crewai import Agent, Process, Task
+from crewai.llms.base_llm import BaseLLM
+
+from engineering_team.scheduler import DagCrew, check_schedulable, critical_path, task_dependencies
+
+DURATIONS = {"design_task": 0.2, "code_task": 0.2, "frontend_task": 0.5, "test_task": 0.6}
+
+
+class SlowLLM(BaseLLM):
+    """
+    Offline LLM that takes a fixed time per task and records how many calls
+    overlap. Copies (agents copy their LLM) share the counters.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(model="slow-model", **kwargs)
+        self.overlap = {"active": 0, "peak": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def peak(self):
+        return self.overlap["peak"]
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        with self._lock:
+            self.overlap["active"] += 1
+            self.overlap["peak"] = max(self.overlap["peak"], self.overlap["active"])
+        try:
+            time.sleep(DURATIONS.get(from_task.name, 0.1) if from_task is not None else 0.1)
+        finally:
+            with self._lock:
+                self.overlap["active"] -= 1
+        name = from_task.name if from_task is not None else "task"
+        return f"Thought: I now know the final answer\nFinal Answer: {name} done"
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 8192
+
+
+class FailingLLM(SlowLLM):
+    def call(self, *args, **kwargs):
+        raise RuntimeError("provider unavailable")
+
+
+class TestDagCrew(unittest.TestCase):
+    def setUp(self):
+        # crewAI makes output_file paths relative to the working directory
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory)
+        self.llm = SlowLLM()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def engineering_crew(self, max_parallel=4, output_file=None):
+        # The shape of engineering_team's tasks.yaml
+        lead, backend, frontend, tester = (Agent(role=role, goal=role, backstory=role, llm=self.llm)
+                                           for role in ("Lead", "Backend", "Frontend", "Tester"))
+
+        def task(name, agent, context, filename):
+            path = output_file or os.path.join("output", filename)
+            return Task(name=name, description=f"Do the {name}", expected_output="Done", agent=agent,
+                        context=context, output_file=path)
+
+        design = task("design_task", lead, None, "design.md")
+        code = task("code_task", backend, [design], "accounts.py")
+        tasks = [design, code, task("frontend_task", frontend, [code], "app.py"),
+                 task("test_task", tester, [code], "test_accounts.py")]
+        return DagCrew(agents=[lead, backend, frontend, tester], tasks=tasks, process=Process.sequential,
+                       max_parallel=max_parallel)
+
+    def test_dependencies_follow_context(self):
+        crew = self.engineering_crew()
+        self.assertEqual(task_dependencies(crew.tasks), [set(), {0}, {1}, {1}])
+        self.assertAlmostEqual(critical_path(crew.tasks, DURATIONS), 1.0)
+
+    def test_tasks_without_context_depend_on_every_earlier_task(self):
+        agent = Agent(role="Debater", goal="Debate", backstory="Debater", llm=self.llm)
+        propose, oppose = (Task(description=side, expected_output="An argument", agent=agent, context=[])
+                           for side in ("Propose", "Oppose"))
+        decide = Task(description="Decide", expected_output="A winner", agent=agent)
+        self.assertEqual(task_dependencies([propose, oppose, decide]), [set(), set(), {0, 1}])
+
+    def test_independent_tasks_run_concurrently(self):
+        crew = self.engineering_crew()
+        start = time.perf_counter()
+        result = crew.kickoff()
+        elapsed = time.perf_counter() - start
+        self.assertEqual(self.llm.peak, 2)
+        self.assertLess(elapsed, sum(DURATIONS.values()) - 0.3)
+        self.assertEqual([output.name for output in result.tasks_output],
+                         ["design_task", "code_task", "frontend_task", "test_task"])
+        self.assertEqual(result.raw, "test_task done")
+        with open(os.path.join("output", "app.py")) as f:
+            self.assertEqual(f.read(), "frontend_task done")
+
+    def test_parallelism_cap_of_one_runs_in_task_order(self):
+        result = self.engineering_crew(max_parallel=1).kickoff()
+        self.assertEqual(self.llm.peak, 1)
+        self.assertEqual(result.raw, "test_task done")
+
+    def test_tasks_writing_the_same_file_run_in_task_order(self):
+        path = os.path.join("output", "report.md")
+        crew = self.engineering_crew(output_file=path)
+        self.assertEqual(task_dependencies(crew.tasks), [set(), {0}, {0, 1}, {0, 1, 2}])
+        crew.kickoff()
+        with open(path) as f:
+            self.assertEqual(f.read(), "test_task done")
+
+    def test_shared_agent_runs_concurrent_tasks_on_copies(self):
+        agent = Agent(role="Debater", goal="Debate", backstory="Debater", llm=self.llm)
+        tasks = [Task(name=name, description=name, expected_output="An argument", agent=agent, context=[])
+                 for name in ("propose", "oppose")]
+        prepared = []
+
+        class RecordingCrew(DagCrew):
+            def _prepare_tools(self, agent, task, tools):
+                prepared.append(agent)
+                return super()._prepare_tools(agent, task, tools)
+
+        result = RecordingCrew(agents=[agent], tasks=tasks, process=Process.sequential).kickoff()
+        self.assertEqual(self.llm.peak, 2)
+        self.assertEqual([output.raw for output in result.tasks_output], ["propose done", "oppose done"])
+        # The second task's tools are prepared for its copy, not for the busy agent.
+        self.assertIs(prepared[0], agent)
+        self.assertIsNot(prepared[1], agent)
+
+    def test_cyclic_context_is_rejected_before_anything_runs(self):
+        crew = self.engineering_crew()
+        # crewAI only rejects context on a later task when the crew is built
+        crew.tasks[0].context = [crew.tasks[1]]
+        message = "cannot be scheduled.*design_task, code_task, frontend_task, test_task"
+        with self.assertRaisesRegex(ValueError, message):
+            check_schedulable(crew.tasks, task_dependencies(crew.tasks))
+        with self.assertRaisesRegex(ValueError, message):
+            crew.kickoff()
+        self.assertEqual(self.llm.peak, 0)
+
+    def test_failure_is_raised_after_running_tasks_finish(self):
+        crew = self.engineering_crew()
+        tester = crew.tasks[3].agent
+        tester.llm = FailingLLM()
+        tester.max_retry_limit = 0
+        with self.assertRaises(RuntimeError):
+            crew.kickoff()
+        with open(os.path.join("output", "app.py")) as f:
+            self.assertEqual(f.read(), "frontend_task done")
@@ -1,7 +1,9 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from crewai_tools import SerperDevTool
+from .tools.search_cache import CachedSerperDevTool
+from .llm_cache import cache_llms
+from .scheduler import DagCrew
 from typing import List
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
@@ -27,7 +29,7 @@ class FinancialResearcher():
         return Agent(
             config=self.agents_config['researcher'], # type: ignore[index]
             verbose=True,
-            tools=[SerperDevTool()]
+            tools=[CachedSerperDevTool()]
             
         )
 
@@ -51,9 +53,9 @@ class FinancialResearcher():
     
     @crew
     def crew(self) -> Crew:
-        return Crew(
+        return cache_llms(DagCrew(
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
-        )
\ No newline at end of file
+        ))
\ No newline at end of file
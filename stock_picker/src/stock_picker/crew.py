@@ -3,9 +3,10 @@ from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from pydantic import BaseModel, Field, config
-from crewai_tools import SerperDevTool
 from typing import List
 from .tools.push_tool import PushNotificationTool
+from .tools.search_cache import CachedSerperDevTool
+from .llm_cache import cache_llms
 from crewai.memory import LongTermMemory, ShortTermMemory, EntityMemory
 from crewai.memory.storage.rag_storage import RAGStorage
 from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
@@ -35,6 +36,7 @@ class TrendingCompanyResearch(BaseModel):
 class TrendingCompanyResearchList(BaseModel):
     """ A list of detailed research on all the companies"""
     research_list: List[TrendingCompanyResearch] = Field(description="Comprehensive research on all trending companies")
+    failed: List[str] = Field(default_factory=list, description="Companies whose research could not be completed")
 
 @CrewBase
 class StockPicker():
@@ -48,11 +50,11 @@ class StockPicker():
     @agent
     def trending_company_finder(self) -> Agent:
         return Agent(config=self.agents_config['trending_company_finder'],
-                    tools=[SerperDevTool()], memory=True)
+                    tools=[CachedSerperDevTool()], memory=True)
         
     @agent
     def financial_researcher(self) -> Agent:
-        return Agent(config=self.agents_config['financial_researcher'],tools=[SerperDevTool()])
+        return Agent(config=self.agents_config['financial_researcher'],tools=[CachedSerperDevTool()])
     
     @agent 
     def stock_picker(self) -> Agent:
@@ -79,6 +81,54 @@ class StockPicker():
         )
         
     
+    @task
+    def research_company(self) -> Task:
+        return Task(
+            config=self.tasks_config['research_company'],
+            output_pydantic=TrendingCompanyResearch,
+        )
+        
+    def memory(self) -> dict:
+        """ Memory shared by the crews that find and pick companies"""
+        short_term_memory = ShortTermMemory(
+            storage = RAGStorage(
+                embedder_config={
+                    "provider": "google",
+                    "config": {
+                        "model": "gemini-embedding-001"
+                    }
+                },
+                type="short_term",
+                path="./memory/"
+            )
+        )
+        
+        long_term_memory = LongTermMemory(
+            storage=LTMSQLiteStorage(
+                db_path="./memory/long_term_memory_storage.db"
+            )
+        )
+        
+        entity_memory = EntityMemory(
+            storage=RAGStorage(
+                embedder_config={
+                    "provider": "google",
+                    "config": {
+                        "model": 'gemini-embedding-001'
+                    }
+                },
+                type="short_term",
+                path="./memory/"
+            )
+        )
+        
+        return dict(
+            memory=True,
+            long_term_memory=long_term_memory,
+            short_term_memory=short_term_memory,
+            entity_memory=entity_memory
+        )
+    
     @crew
     def crew(self) -> Crew:
          """ Creates the StockPicker crew"""
@@ -88,49 +138,40 @@ class StockPicker():
              allow_delegation=True
          )
          
-         
-         short_term_memory = ShortTermMemory(
-                storage = RAGStorage(
-                    embedder_config={
-                        "provider": "google",
-                        "config": {
-                            "model": "gemini-embedding-001"
-                        }
-                    },
-                    type="short_term",
-                    path="./memory/"
-                )
-            )
-         
-         
-         long_term_memory = LongTermMemory(
-             storage=LTMSQLiteStorage(
-                 db_path="./memory/long_term_memory_storage.db"
-             )
-         )
-         
-         entity_memory = EntityMemory(
-             storage=RAGStorage(
-                 embedder_config={
-                     "provider": "google",
-                     "config": {
-                         "model": 'gemini-embedding-001'
-                     }
-                 },
-                 type="short_term",
-                 path="./memory/"
-             )
-         )
-         
-         
-         return Crew(
+         return cache_llms(Crew(
              agents=self.agents,
-             tasks=self.tasks,
+             tasks=[self.find_trending_companies(), self.research_trending_companies(), self.pick_best_company()],
              process=Process.hierarchical,
              verbose=True,
              manager_agent=manager,
-             memory=True,
-             long_term_memory=long_term_memory,
-             short_term_memory=short_term_memory,
-             entity_memory=entity_memory
-         )
\ No newline at end of file
+             **self.memory()
+         ))
+         
+    def finder_crew(self) -> Crew:
+        """ Finds the trending companies (first stage of the fan-out pipeline)"""
+        return cache_llms(Crew(
+            agents=[self.trending_company_finder()],
+            tasks=[self.find_trending_companies()],
+            process=Process.sequential,
+            verbose=True,
+            **self.memory()
+        ))
+        
+    def research_crew(self) -> Crew:
+        """ Researches one company; copied for each company in the fan-out"""
+        return cache_llms(Crew(
+            agents=[self.financial_researcher()],
+            tasks=[self.research_company()],
+            process=Process.sequential,
+            verbose=True
+        ))
+        
+    def picker_crew(self) -> Crew:
+        """ Picks the best company from the merged research"""
+        return cache_llms(Crew(
+            agents=[self.stock_picker()],
+            tasks=[self.pick_best_company()],
+            process=Process.sequential,
+            verbose=True,
+            **self.memory()
+        ))
@@ -0,0 +1,334 @@
+import atexit
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Type
+
+from crewai import Crew
+from crewai.llms.base_llm import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+from pydantic import BaseModel
+
+# Record/replay cache for LLM responses, shared by every crew.
+# A request is keyed on the model, the messages, the tool schemas, the
+# sampling parameters and the structured-output schema, so any change to a
+# prompt, a task's YAML or an agent's settings is a miss. Set LLM_CACHE_MODE:
+#   off           every call goes to the provider (default)
+#   record        every call goes to the provider and its response is stored
+#   replay        responses come only from the cache; a miss raises LLMCacheMiss
+#   read-through  cached responses are reused, misses go to the provider and are stored
+# Responses are zlib-compressed and stored once per distinct content in
+# ~/.cache/crew_llm/responses.sqlite3 (override with LLM_CACHE_PATH).
+# This module is mirrored in every crew.
+
+DEFAULT_PATH = os.getenv("LLM_CACHE_PATH",
+                         os.path.join(os.path.expanduser("~"), ".cache", "crew_llm", "responses.sqlite3"))
+
+MODES = ("off", "record", "replay", "read-through")
+
+# LLM attributes that change what the provider returns
+SAMPLING_PARAMS = ("temperature", "top_p", "top_k", "max_tokens", "max_output_tokens", "max_completion_tokens",
+                   "seed", "stop", "frequency_penalty", "presence_penalty", "logit_bias", "reasoning_effort",
+                   "response_format", "n", "logprobs", "top_logprobs", "thinking_config", "safety_settings",
+                   "additional_params")
+
+_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+# Hits are counted in memory and added to the responses' on-disk counters
+# in one transaction once this many requests have been hit (or on put, flush
+# and close), so a replay does not write on every lookup.
+HIT_FLUSH = 256
+
+
+class LLMCacheMiss(LookupError):
+    """
+    Raised in replay mode for a request that was never recorded.
+    """
+
+
+def _canonical(value: Any) -> Any:
+    # JSON-compatible form of a request part that does not depend on object identity
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=repr)
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        try:
+            return _canonical(value.model_dump(mode="json"))
+        except Exception:
+            return {"type": type(value).__qualname__, "name": getattr(value, "name", None)}
+    if callable(value):
+        return getattr(value, "__qualname__", type(value).__qualname__)
+    return _ADDRESS.sub("", repr(value))
+
+
+def request_key(llm: BaseLLM, messages: Any, tools: Any = None,
+                response_model: Optional[Type[BaseModel]] = None) -> str:
+    """
+    Hash of everything about a call that affects the response.
+    """
+    params = {}
+    for name in SAMPLING_PARAMS:
+        value = getattr(llm, name, None)
+        if value not in (None, [], {}):
+            params[name] = value
+    request = {
+        "provider": getattr(llm, "provider", None),
+        "model": llm.model,
+        "params": params,
+        "messages": messages,
+        "tools": tools,
+        "response_model": response_model,
+    }
+    text = json.dumps(_canonical(request), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode_response(response: Any) -> Optional[dict]:
+    """
+    Storable form of a response, or None for one that cannot be stored.
+    """
+    if isinstance(response, str):
+        return {"kind": "text", "value": response}
+    if isinstance(response, BaseModel):
+        return {"kind": "model", "value": response.model_dump(mode="json")}
+    try:
+        json.dumps(response)
+    except (TypeError, ValueError):
+        return None
+    return {"kind": "json", "value": response}
+
+
+def decode_response(entry: dict, response_model: Optional[Type[BaseModel]] = None) -> Any:
+    if entry["kind"] == "model" and response_model is not None:
+        return response_model.model_validate(entry["value"])
+    return entry["value"]
+
+
+class LLMCache:
+    """
+    SQLite-backed response store. Responses are content-addressed: each
+    distinct response is compressed and stored once, and every request key
+    that produced it points at it. Each request's hit count is kept on disk
+    too, written in batches (see flush).
+    """
+    _shared: Dict[str, "LLMCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_PATH, clock=time.time):
+        self.path = path
+        self.clock = clock
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, blob TEXT NOT NULL, model TEXT NOT NULL,"
+            " created REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._unflushed: Dict[str, int] = {}
+
+    @classmethod
+    def shared(cls, path: str = DEFAULT_PATH) -> "LLMCache":
+        """
+        The process-wide cache for a file.
+        """
+        with cls._shared_lock:
+            cache = cls._shared.get(path)
+            if cache is None:
+                cache = cls._shared[path] = cls(path)
+                atexit.register(cache.flush)
+            return cache
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        The stored response for a request key, or None. Counts a hit or a miss.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT data FROM responses JOIN blobs ON blobs.hash = responses.blob"
+                                   " WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._unflushed[key] = self._unflushed.get(key, 0) + 1
+            if len(self._unflushed) >= HIT_FLUSH:
+                self._write_hits()
+                self._db.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, model: str, entry: dict) -> None:
+        """
+        Stores a response for a request key, replacing any earlier one.
+        """
+        text = json.dumps(entry, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+        digest = hashlib.sha256(text).hexdigest()
+        with self._lock:
+            previous = self._db.execute("SELECT blob FROM responses WHERE key = ?", (key,)).fetchone()
+            self._unflushed.pop(key, None)  # a replaced response starts counting again
+            if self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+                self._db.execute("INSERT INTO blobs (hash, data) VALUES (?, ?)", (digest, zlib.compress(text, 9)))
+            self._db.execute("INSERT OR REPLACE INTO responses (key, blob, model, created) VALUES (?, ?, ?, ?)",
+                             (key, digest, model, self.clock()))
+            if previous is not None and previous[0] != digest:
+                self._db.execute("DELETE FROM blobs WHERE hash = ? AND NOT EXISTS"
+                                 " (SELECT 1 FROM responses WHERE blob = ?)", (previous[0], previous[0]))
+            self._write_hits()
+            self._db.commit()
+            self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hits, misses and stores in this process, the hit rate, and the number
+        of requests, distinct responses and compressed bytes on disk.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+                "blobs": blobs,
+                "bytes": size,
+            }
+
+    def flush(self) -> None:
+        """
+        Writes the hit counts gathered since the last write.
+        """
+        with self._lock:
+            if self._unflushed:
+                self._write_hits()
+                self._db.commit()
+
+    def _write_hits(self) -> None:
+        self._db.executemany("UPDATE responses SET hits = hits + ? WHERE key = ?",
+                             [(count, key) for key, count in self._unflushed.items()])
+        self._unflushed.clear()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+class CachedLLM(BaseLLM):
+    """
+    Wraps an agent's LLM with an LLMCache. Everything but call/acall is
+    forwarded to the wrapped LLM, so settings the agent changes at run time
+    (e.g. its stop words) apply to it and are part of the key.
+    """
+    _OWN = frozenset({"inner", "cache", "mode", "call", "acall", "_lookup", "_store"})
+
+    def __init__(self, inner: BaseLLM, mode: str = "read-through", cache: Optional[LLMCache] = None):
+        if mode not in MODES[1:]:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}; choose from {', '.join(MODES[1:])}.")
+        object.__setattr__(self, "inner", inner)
+        object.__setattr__(self, "mode", mode)
+        object.__setattr__(self, "cache", cache if cache is not None else LLMCache.shared())
+
+    def __getattribute__(self, name: str) -> Any:
+        if name.startswith("__") or name in CachedLLM._OWN:
+            return object.__getattribute__(self, name)
+        return getattr(object.__getattribute__(self, "inner"), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in CachedLLM._OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.inner, name, value)
+
+    def __copy__(self) -> "CachedLLM":
+        return CachedLLM(copy.copy(self.inner), self.mode, self.cache)
+
+    def __deepcopy__(self, memo: dict) -> "CachedLLM":
+        return CachedLLM(copy.deepcopy(self.inner, memo), self.mode, self.cache)
+
+    def __repr__(self) -> str:
+        return f"CachedLLM({self.inner!r}, mode={self.mode!r})"
+
+    def _lookup(self, messages, tools, response_model):
+        key = request_key(self.inner, messages, tools, response_model)
+        if self.mode == "record":
+            return key, None
+        entry = self.cache.get(key)
+        if entry is None and self.mode == "replay":
+            last = messages if isinstance(messages, str) else (messages[-1].get("content", "") if messages else "")
+            raise LLMCacheMiss(f"No recorded response for {self.inner.model} (key {key[:12]}) in {self.cache.path}; "
+                               f"last message: {str(last)[:200]!r}. Record it with LLM_CACHE_MODE=record "
+                               f"or read-through.")
+        return key, entry
+
+    def _store(self, key: str, response: Any) -> None:
+        entry = encode_response(response)
+        if entry is not None:
+            self.cache.put(key, self.inner.model, entry)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        key, entry = self._lookup(messages, tools, response_model)
+        if entry is not None:
+            return decode_response(entry, response_model)
+        response = self.inner.call(messages, tools, callbacks, available_functions, from_task, from_agent,
+                                   response_model)
+        self._store(key, response)
+        return response
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+                    from_agent=None, response_model=None):
+        key, entry = self._lookup(messages, tools, response_model)
+        if entry is not None:
+            return decode_response(entry, response_model)
+        response = await self.inner.acall(messages, tools, callbacks, available_functions, from_task, from_agent,
+                                          response_model)
+        self._store(key, response)
+        return response
+
+
+def cache_llms(crew: Crew, mode: Optional[str] = None, cache: Optional[LLMCache] = None) -> Crew:
+    """
+    Wraps the LLMs of a crew's agents, manager and planner in CachedLLM.
+    `mode` defaults to LLM_CACHE_MODE; "off" returns the crew unchanged.
+    """
+    mode = mode or os.getenv("LLM_CACHE_MODE", "off")
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM cache mode {mode!r}; choose from {', '.join(MODES)}.")
+    if mode == "off":
+        return crew
+    cache = cache if cache is not None else LLMCache.shared()
+
+    def wrap(llm):
+        if llm is None or isinstance(llm, CachedLLM):
+            return llm
+        return CachedLLM(create_llm(llm), mode, cache)
+
+    for agent in [*crew.agents, crew.manager_agent]:
+        if agent is not None:
+            agent.llm = wrap(agent.llm)
+            agent.function_calling_llm = wrap(agent.function_calling_llm)
+    for name in ("manager_llm", "function_calling_llm", "planning_llm"):
+        if getattr(crew, name, None) is not None:
+            setattr(crew, name, wrap(getattr(crew, name)))
+    return crew
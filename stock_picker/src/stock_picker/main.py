@@ -1,10 +1,12 @@
 #!/usr/bin/env python
+import os
 import sys
 import warnings
 
 from datetime import datetime
 
 from stock_picker.crew import StockPicker
+from stock_picker.research import run_pipeline
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -21,7 +23,13 @@ def run():
         'sector': 'Technology',
     }
 
-    result = StockPicker().crew().kickoff(inputs=inputs)
+    # Companies are researched in parallel; RESEARCH_CONCURRENCY and
+    # RESEARCH_TIMEOUT (seconds per company) bound the fan-out.
+    result = run_pipeline(
+        inputs,
+        max_concurrency=int(os.getenv('RESEARCH_CONCURRENCY', '3')),
+        timeout=float(os.getenv('RESEARCH_TIMEOUT', '600')),
+    )
     
     print("\n\n=== FINAL DECISION ===\n\n")
     print(result.raw)
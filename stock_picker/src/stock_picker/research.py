@@ -0,0 +1,102 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from crewai import CrewOutput
+from crewai.tasks.output_format import OutputFormat
+from crewai.tasks.task_output import TaskOutput
+
+from .crew import StockPicker, TrendingCompany, TrendingCompanyList, TrendingCompanyResearch, TrendingCompanyResearchList
+
+# Fan-out pipeline: find the trending companies, research each one in its own
+# copy of the research crew (concurrently, with a limit), merge the results
+# into a TrendingCompanyResearchList and hand that to pick_best_company as
+# the output of research_trending_companies.
+
+
+async def research_companies(picker: StockPicker, companies: List[TrendingCompany], inputs: dict,
+                             max_concurrency: int = 3, timeout: float = 600.0) -> TrendingCompanyResearchList:
+    """
+    Researches every company, at most `max_concurrency` at a time.
+    A company whose research raises or takes longer than `timeout` seconds is
+    listed in `failed` and the others are kept. A timed-out job is abandoned,
+    not interrupted: its thread finishes in the background and keeps its slot
+    until then, so abandoned jobs never push the fan-out past the limit.
+    """
+    template = picker.research_crew()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="research")
+
+    def release(job: asyncio.Future) -> None:
+        semaphore.release()
+        if not job.cancelled():
+            job.exception()  # retrieved here too, in case the caller stopped waiting
+
+    async def research(company: TrendingCompany) -> TrendingCompanyResearch:
+        await semaphore.acquire()
+        try:
+            crew = template.copy()
+            job = loop.run_in_executor(executor, crew.kickoff, {**inputs, **company.model_dump()})
+        except BaseException:
+            semaphore.release()
+            raise
+        # The slot is freed when the thread returns, not when the wait below gives up.
+        job.add_done_callback(release)
+        result = await asyncio.wait_for(asyncio.shield(job), timeout)
+        if not isinstance(result.pydantic, TrendingCompanyResearch):
+            raise ValueError(f"Research on {company.name} returned no structured output")
+        return result.pydantic
+
+    try:
+        outcomes = await asyncio.gather(*(research(company) for company in companies), return_exceptions=True)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    research_list, failed = [], []
+    for company, outcome in zip(companies, outcomes):
+        if isinstance(outcome, BaseException):
+            reason = f"timed out after {timeout:g}s" if isinstance(outcome, asyncio.TimeoutError) else repr(outcome)
+            print(f"Research on {company.name} ({company.ticker}) failed: {reason}")
+            failed.append(company.name)
+        else:
+            research_list.append(outcome)
+    if not research_list:
+        raise RuntimeError(f"Research failed for every company: {', '.join(failed)}")
+    return TrendingCompanyResearchList(research_list=research_list, failed=failed)
+
+
+def publish_research(picker: StockPicker, research: TrendingCompanyResearchList) -> None:
+    """
+    Records the merged research as the output of research_trending_companies,
+    the context of pick_best_company, and writes it to that task's output file.
+    """
+    task = picker.research_trending_companies()
+    raw = research.model_dump_json(indent=2)
+    task.output = TaskOutput(
+        description=task.description,
+        name=task.name,
+        expected_output=task.expected_output,
+        raw=raw,
+        pydantic=research,
+        agent=picker.financial_researcher().role,
+        output_format=OutputFormat.PYDANTIC,
+    )
+    if task.output_file:
+        os.makedirs(os.path.dirname(task.output_file) or ".", exist_ok=True)
+        with open(task.output_file, "w", encoding="utf-8") as f:
+            f.write(raw)
+
+
+def run_pipeline(inputs: dict, max_concurrency: int = 3, timeout: float = 600.0) -> CrewOutput:
+    """
+    Runs the whole fan-out pipeline and returns the stock picker's output.
+    """
+    picker = StockPicker()
+    trending = picker.finder_crew().kickoff(inputs=inputs).pydantic
+    if not isinstance(trending, TrendingCompanyList) or not trending.companies:
+        raise RuntimeError("No trending companies were found")
+    research = asyncio.run(research_companies(picker, trending.companies, inputs, max_concurrency, timeout))
+    publish_research(picker, research)
+    return picker.picker_crew().kickoff(inputs=inputs)
@@ -0,0 +1,290 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from crewai_tools import SerperDevTool
+from pydantic import PrivateAttr
+
+# Persistent, shared cache for SerperDevTool searches.
+# The same file is used by every crew (override with SEARCH_CACHE_PATH), so a
+# query already answered for one agent or crew is not sent upstream again
+# until its TTL expires. This module is mirrored in every crew that searches.
+
+DEFAULT_PATH = os.getenv("SEARCH_CACHE_PATH",
+                         os.path.join(os.path.expanduser("~"), ".cache", "crew_search", "serper.sqlite3"))
+
+# Hits are counted in memory and added to the results' on-disk counters in
+# one transaction once this many results have been hit (or on store, purge,
+# flush and close), so a cached search does not write on every lookup.
+HIT_FLUSH = 256
+
+# Seconds a result stays fresh, per query class
+DEFAULT_TTLS: Dict[str, float] = {
+    "news": 3 * 3600,
+    "profile": 7 * 86400,
+    "general": 86400,
+}
+
+_NEWS_WORDS = {"news", "latest", "today", "todays", "breaking", "trending", "recent", "week", "announced",
+               "earnings"}
+_PROFILE_WORDS = {"profile", "overview", "history", "founded", "headquarters", "ceo", "business", "model",
+                  "products", "competitors", "annual", "10k", "subsidiaries", "about"}
+_STOP_WORDS = {"a", "an", "the", "of", "for", "in", "on", "to", "and", "with", "what", "is", "are"}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a search query: case, Unicode compatibility forms,
+    punctuation and filler words do not matter. Word order does ("apple buys
+    nvidia" is not "nvidia buys apple").
+    """
+    text = unicodedata.normalize("NFKC", query).casefold().replace("'", "").replace("\u2019", "")
+    text = re.sub(r"[^\w\s$.&-]", " ", text)
+    words = (word.strip(".-") for word in text.split())
+    return " ".join(word for word in words if word and word not in _STOP_WORDS)
+
+
+def classify_query(query: str, search_type: str = "search") -> str:
+    """
+    Query class used to pick a TTL: "news" for news searches and time-sensitive
+    queries, "profile" for stable company facts, "general" otherwise.
+    """
+    words = set(normalize_query(query).split())
+    if search_type == "news" or words & _NEWS_WORDS:
+        return "news"
+    if words & _PROFILE_WORDS:
+        return "profile"
+    return "general"
+
+
+class SearchCache:
+    """
+    SQLite-backed search results, shared by every tool in the process that
+    uses the same file. Concurrent lookups of the same missing key are
+    coalesced: one caller queries upstream and the others wait for its result.
+    """
+    _shared: Dict[str, "SearchCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_PATH, ttls: Optional[Dict[str, float]] = None,
+                 classify: Callable[[str, str], str] = classify_query,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.classify = classify
+        self.clock = clock
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, query TEXT NOT NULL, search_type TEXT NOT NULL,"
+            " query_class TEXT NOT NULL, response TEXT NOT NULL,"
+            " created REAL NOT NULL, expires REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.by_class: Dict[str, Dict[str, int]] = {}
+        self._unflushed: Dict[str, int] = {}
+
+    @classmethod
+    def shared(cls, path: str = DEFAULT_PATH) -> "SearchCache":
+        """
+        The process-wide cache for a file, so in-flight queries are shared across agents.
+        """
+        with cls._shared_lock:
+            cache = cls._shared.get(path)
+            if cache is None:
+                cache = cls._shared[path] = cls(path)
+                atexit.register(cache.flush)
+            return cache
+
+    @staticmethod
+    def key(query: str, search_type: str, params: Optional[Dict[str, Any]] = None) -> str:
+        params = json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(f"{search_type}\x00{params}\x00{normalize_query(query)}".encode()).hexdigest()
+
+    def _count(self, query_class: str, outcome: str) -> None:
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        counts = self.by_class.setdefault(query_class, {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0})
+        counts[outcome] += 1
+
+    def _load(self, key: str) -> Optional[dict]:
+        row = self._db.execute("SELECT response FROM results WHERE key = ? AND expires > ?",
+                               (key, self.clock())).fetchone()
+        if row is None:
+            return None
+        self._unflushed[key] = self._unflushed.get(key, 0) + 1
+        if len(self._unflushed) >= HIT_FLUSH:
+            self._write_hits()
+            self._db.commit()
+        return json.loads(row[0])
+
+    def _store(self, key: str, query: str, search_type: str, query_class: str, response: dict) -> None:
+        now = self.clock()
+        self._unflushed.pop(key, None)  # a replaced result starts counting again
+        self._write_hits()
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, query, search_type, query_class, response, created, expires)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, query, search_type, query_class, json.dumps(response), now, now + self.ttls[query_class]))
+        self._db.commit()
+
+    def get_or_fetch(self, query: str, search_type: str, fetch: Callable[[], dict],
+                     params: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Returns a fresh cached response, or calls `fetch()` once for all concurrent
+        callers and caches its result. Errors are passed to every waiting caller
+        and never cached.
+        """
+        key = self.key(query, search_type, params)
+        query_class = self.classify(query, search_type)
+        with self._lock:
+            cached = self._load(key)
+            if cached is not None:
+                self._count(query_class, "hits")
+                return cached
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self._count(query_class, "misses")
+            else:
+                self._count(query_class, "coalesced")
+        if not owner:
+            return future.result()
+
+        try:
+            response = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._count(query_class, "errors")
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(key, query, search_type, query_class, response)
+            del self._in_flight[key]
+        future.set_result(response)
+        return response
+
+    def purge_expired(self) -> int:
+        """
+        Deletes expired results. Returns the number removed.
+        """
+        with self._lock:
+            self._write_hits()
+            removed = self._db.execute("DELETE FROM results WHERE expires <= ?", (self.clock(),)).rowcount
+            self._db.commit()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hits, misses (upstream calls), coalesced waits and errors in this process,
+        the hit rate, per-class counts and the number of fresh entries on disk.
+        """
+        with self._lock:
+            served = self.hits + self.coalesced
+            total = served + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM results WHERE expires > ?",
+                                       (self.clock(),)).fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "hit_rate": served / total if total else 0.0,
+                "by_class": {name: dict(counts) for name, counts in self.by_class.items()},
+                "entries": entries,
+            }
+
+    def flush(self) -> None:
+        """
+        Writes the hit counts gathered since the last write.
+        """
+        with self._lock:
+            if self._unflushed:
+                self._write_hits()
+                self._db.commit()
+
+    def _write_hits(self) -> None:
+        self._db.executemany("UPDATE results SET hits = hits + ? WHERE key = ?",
+                             [(count, key) for key, count in self._unflushed.items()])
+        self._unflushed.clear()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+class FakeSearchBackend:
+    """
+    Offline stand-in for the Serper API, for tests and dry runs: deterministic
+    results shaped like Serper's, an optional simulated latency, and a count of
+    upstream calls.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, search_query: str, search_type: str, n_results: int = 10) -> dict:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        slug = re.sub(r"\W+", "-", search_query.lower()).strip("-")
+        items = [{
+            "title": f"{search_query} - result {i}",
+            "link": f"https://example.com/{slug}/{i}",
+            "snippet": f"Offline result {i} for '{search_query}'.",
+            "position": i,
+        } for i in range(1, n_results + 1)]
+        if search_type == "news":
+            return {"searchParameters": {"q": search_query, "type": "news"},
+                    "news": [{**item, "date": "1 hour ago", "source": "Example News", "imageUrl": ""}
+                             for item in items],
+                    "credits": 1}
+        return {"searchParameters": {"q": search_query, "type": "search"}, "organic": items, "credits": 1}
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """
+    SerperDevTool with a persistent, shared result cache. Results are formatted
+    exactly as SerperDevTool formats them; only the upstream request is cached.
+    `backend` replaces the Serper API, e.g. with a FakeSearchBackend.
+    """
+    _cache: Optional[SearchCache] = PrivateAttr(default=None)
+    _backend: Optional[Callable[..., dict]] = PrivateAttr(default=None)
+
+    def __init__(self, cache: Optional[SearchCache] = None, backend: Optional[Callable[..., dict]] = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self._cache = cache if cache is not None else SearchCache.shared()
+        self._backend = backend
+
+    @property
+    def cache(self) -> SearchCache:
+        return self._cache
+
+    def _make_api_request(self, search_query: str, search_type: str) -> dict:
+        params = {"num": self.n_results, "gl": self.country, "location": self.location, "hl": self.locale}
+        if self._backend is not None:
+            fetch = lambda: self._backend(search_query, search_type, self.n_results)
+        else:
+            fetch = lambda: super(CachedSerperDevTool, self)._make_api_request(search_query, search_type)
+        return self._cache.get_or_fetch(search_query, search_type.lower(), fetch, params)
@@ -0,0 +1,163 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from pydantic import BaseModel
+
+from stock_picker.llm_cache import CachedLLM, LLMCache, LLMCacheMiss, cache_llms, request_key
+
+
+class Pick(BaseModel):
+    name: str
+    ticker: str
+
+
+class FakeLLM(BaseLLM):
+    """
+    Offline LLM that answers every prompt with a final answer and counts calls.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(model="fake-model", **kwargs)
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        self.calls += 1
+        if response_model is not None:
+            return response_model(name="Nvidia", ticker="NVDA")
+        return f"Thought: I now know the final answer\nFinal Answer: answer {self.calls}"
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 8192
+
+
+MESSAGES = [{"role": "system", "content": "You pick stocks."}, {"role": "user", "content": "Pick one."}]
+
+
+class TestCachedLLM(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "responses.sqlite3")
+        self.cache = LLMCache(self.path)
+        self.inner = FakeLLM(temperature=0.2)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_read_through_calls_the_provider_once(self):
+        llm = CachedLLM(self.inner, "read-through", self.cache)
+        first = llm.call(MESSAGES)
+        self.assertEqual(llm.call(MESSAGES), first)
+        self.assertEqual(self.inner.calls, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_hits_are_written_in_batches(self):
+        llm = CachedLLM(self.inner, "read-through", self.cache)
+        llm.call(MESSAGES)
+        writes = self.cache._db.total_changes
+        for _ in range(3):
+            llm.call(MESSAGES)
+        self.assertEqual(self.cache._db.total_changes, writes)
+        self.cache.close()
+
+        reopened = LLMCache(self.path)
+        self.assertEqual(reopened._db.execute("SELECT hits FROM responses").fetchone()[0], 3)
+        reopened.close()
+
+    def test_key_covers_messages_tools_and_sampling_params(self):
+        base = request_key(self.inner, MESSAGES)
+        self.assertEqual(request_key(self.inner, [dict(m) for m in MESSAGES]), base)
+        self.assertNotEqual(request_key(self.inner, MESSAGES[:1]), base)
+        self.assertNotEqual(request_key(self.inner, MESSAGES, tools=[{"name": "search"}]), base)
+        self.assertNotEqual(request_key(self.inner, MESSAGES, response_model=Pick), base)
+        self.assertNotEqual(request_key(FakeLLM(temperature=0.7), MESSAGES), base)
+
+    def test_stop_words_set_by_the_agent_reach_the_inner_llm(self):
+        llm = CachedLLM(self.inner, "read-through", self.cache)
+        before = request_key(llm.inner, MESSAGES)
+        llm.stop = ["\nObservation:"]
+        self.assertEqual(self.inner.stop, ["\nObservation:"])
+        self.assertNotEqual(request_key(llm.inner, MESSAGES), before)
+        self.assertEqual(llm.model, "fake-model")
+        self.assertEqual(llm.get_context_window_size(), 8192)
+
+    def test_replay_fails_on_miss(self):
+        CachedLLM(self.inner, "record", self.cache).call(MESSAGES)
+        replay = CachedLLM(FakeLLM(temperature=0.2), "replay", self.cache)
+        self.assertEqual(replay.call(MESSAGES), "Thought: I now know the final answer\nFinal Answer: answer 1")
+        with self.assertRaises(LLMCacheMiss):
+            replay.call(MESSAGES[:1])
+        self.assertEqual(replay.inner.calls, 0)
+
+    def test_record_refreshes_stored_responses(self):
+        record = CachedLLM(self.inner, "record", self.cache)
+        record.call(MESSAGES)
+        record.call(MESSAGES)
+        self.assertEqual(self.inner.calls, 2)
+        self.assertTrue(CachedLLM(self.inner, "replay", self.cache).call(MESSAGES).endswith("answer 2"))
+        self.assertEqual(self.cache.stats()["blobs"], 1)
+
+    def test_identical_responses_are_stored_once(self):
+        llm = CachedLLM(self.inner, "read-through", self.cache)
+        llm.call(MESSAGES, response_model=Pick)
+        llm.call(MESSAGES[1:], response_model=Pick)
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["blobs"]), (2, 1))
+
+    def test_structured_responses_round_trip(self):
+        CachedLLM(self.inner, "record", self.cache).call(MESSAGES, response_model=Pick)
+        reopened = LLMCache(self.path)
+        try:
+            pick = CachedLLM(FakeLLM(temperature=0.2), "replay", reopened).call(MESSAGES, response_model=Pick)
+        finally:
+            reopened.close()
+        self.assertEqual(pick, Pick(name="Nvidia", ticker="NVDA"))
+
+    def test_copies_keep_the_cache(self):
+        llm = CachedLLM(self.inner, "read-through", self.cache)
+        copied = copy.copy(llm)
+        self.assertIsInstance(copied, CachedLLM)
+        self.assertIs(copied.cache, self.cache)
+        self.assertIsNot(copied.inner, self.inner)
+
+
+class TestCacheLLMs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = LLMCache(os.path.join(self.directory, "responses.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def crew(self, llm):
+        agent = Agent(role="Picker", goal="Pick a stock", backstory="An analyst", llm=llm)
+        task = Task(description="Pick a stock in {sector}", expected_output="A company", agent=agent)
+        return Crew(agents=[agent], tasks=[task], process=Process.sequential)
+
+    def test_cached_rerun_does_not_call_the_provider(self):
+        recorded = FakeLLM()
+        first = cache_llms(self.crew(recorded), "read-through", self.cache).kickoff(inputs={"sector": "chips"})
+        replayed = FakeLLM()
+        second = cache_llms(self.crew(replayed), "replay", self.cache).kickoff(inputs={"sector": "chips"})
+        self.assertEqual(second.raw, first.raw)
+        self.assertEqual((recorded.calls, replayed.calls), (1, 0))
+        with self.assertRaises(Exception):
+            cache_llms(self.crew(FakeLLM()), "replay", self.cache).kickoff(inputs={"sector": "banks"})
+
+    def test_off_leaves_the_crew_alone(self):
+        llm = FakeLLM()
+        crew = cache_llms(self.crew(llm), "off", self.cache)
+        self.assertIs(crew.agents[0].llm, llm)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+
+from crewai.llms.base_llm import BaseLLM
+
+# The crew's agents are built with their configured LLM before the test swaps it.
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+os.environ.setdefault("SERPER_API_KEY", "offline")
+
+from stock_picker.crew import StockPicker, TrendingCompany, TrendingCompanyResearch
+from stock_picker.research import research_companies
+
+INPUTS = {"sector": "Technology"}
+
+
+class FakeLLM(BaseLLM):
+    """
+    Offline LLM: each call takes `latency` seconds (`slow_latency` for companies
+    named "Slow..."), research on companies named "Doomed..." fails, and
+    overlapping calls are counted (copies share the counters).
+    """
+    def __init__(self, latency=0.1, slow_latency=1.0, **kwargs):
+        super().__init__(model="fake-model", **kwargs)
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.overlap = {"active": 0, "peak": 0}
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        prompt = messages if isinstance(messages, str) else "\n".join(str(m["content"]) for m in messages)
+        name = next(word for word in ("Doomed", "Slow", "Alpha", "Beta", "Gamma", "Delta") if word in prompt)
+        with self._lock:
+            self.overlap["active"] += 1
+            self.overlap["peak"] = max(self.overlap["peak"], self.overlap["active"])
+        try:
+            time.sleep(self.slow_latency if name == "Slow" else self.latency)
+            if name == "Doomed":
+                raise RuntimeError("provider unavailable")
+        finally:
+            with self._lock:
+                self.overlap["active"] -= 1
+        research = TrendingCompanyResearch(name=f"{name} Inc", market_position="leader", future_outlook="bright",
+                                           investment_potential="high")
+        if response_model is not None:
+            return research
+        return f"Thought: I now know the final answer\nFinal Answer: {research.model_dump_json()}"
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 8192
+
+
+class OfflinePicker:
+    """
+    Hands research_companies the stock picker's research crew, on the fake LLM.
+    """
+    def __init__(self, llm):
+        self.llm = llm
+
+    def research_crew(self):
+        crew = StockPicker().research_crew()
+        for agent in crew.agents:
+            agent.llm = self.llm
+            agent.max_retry_limit = 0
+        return crew
+
+
+def companies(*names):
+    return [TrendingCompany(name=f"{name} Inc", ticker=name[:4].upper(), reason="in the news") for name in names]
+
+
+class TestResearchCompanies(unittest.TestCase):
+    def setUp(self):
+        self.llm = FakeLLM()
+        self.picker = OfflinePicker(self.llm)
+
+    def research(self, names, **kwargs):
+        return asyncio.run(research_companies(self.picker, companies(*names), INPUTS, **kwargs))
+
+    def test_fan_out_is_bounded_and_merged_in_order(self):
+        names = ["Alpha", "Beta", "Gamma", "Delta"]
+        start = time.perf_counter()
+        research = self.research(names, max_concurrency=2)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([item.name for item in research.research_list], [f"{name} Inc" for name in names])
+        self.assertEqual(research.failed, [])
+        self.assertEqual(self.llm.overlap["peak"], 2)
+        self.assertLess(elapsed, len(names) * self.llm.latency * 4)
+
+    def test_failed_research_is_listed_and_the_rest_kept(self):
+        research = self.research(["Alpha", "Doomed", "Beta"], max_concurrency=3)
+        self.assertEqual([item.name for item in research.research_list], ["Alpha Inc", "Beta Inc"])
+        self.assertEqual(research.failed, ["Doomed Inc"])
+
+    def test_every_company_failing_raises(self):
+        with self.assertRaisesRegex(RuntimeError, "Research failed for every company: Doomed Inc"):
+            self.research(["Doomed"])
+
+    def test_timed_out_research_keeps_its_slot_until_its_thread_returns(self):
+        start = time.perf_counter()
+        research = self.research(["Slow", "Alpha"], max_concurrency=1, timeout=0.3)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(research.failed, ["Slow Inc"])
+        self.assertEqual([item.name for item in research.research_list], ["Alpha Inc"])
+        # Alpha only started once the abandoned thread let go of the single slot.
+        self.assertEqual(self.llm.overlap["peak"], 1)
+        self.assertGreaterEqual(elapsed, self.llm.slow_latency)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from stock_picker.tools.search_cache import (CachedSerperDevTool, FakeSearchBackend, SearchCache, classify_query,
+                                             normalize_query)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryKeys(unittest.TestCase):
+    def test_near_identical_queries_normalize_alike(self):
+        self.assertEqual(normalize_query("NVIDIA's latest news!"), normalize_query("nvidias   latest news"))
+        self.assertEqual(normalize_query("The CEO of Apple"), normalize_query("ceo apple"))
+        self.assertNotEqual(normalize_query("apple ceo"), normalize_query("apple cfo"))
+
+    def test_word_order_is_kept(self):
+        self.assertEqual(normalize_query("Apple buys Nvidia"), "apple buys nvidia")
+        self.assertNotEqual(normalize_query("Apple buys Nvidia"), normalize_query("Nvidia buys Apple"))
+
+    def test_query_classes(self):
+        self.assertEqual(classify_query("Nvidia latest news"), "news")
+        self.assertEqual(classify_query("Nvidia", "news"), "news")
+        self.assertEqual(classify_query("Nvidia company profile and history"), "profile")
+        self.assertEqual(classify_query("Nvidia stock profile"), "profile")
+        self.assertEqual(classify_query("Nvidia stock price history"), "profile")
+        self.assertEqual(classify_query("Nvidia Blackwell GPU"), "general")
+
+
+class TestCachedSerperDevTool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "search.sqlite3")
+        self.clock = FakeClock()
+        self.cache = SearchCache(self.path, clock=self.clock)
+        self.backend = FakeSearchBackend()
+        self.tool = CachedSerperDevTool(cache=self.cache, backend=self.backend)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_repeated_query_is_served_from_cache(self):
+        first = self.tool.run(search_query="Nvidia company profile")
+        second = self.tool.run(search_query="  NVIDIA: company PROFILE! ")
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(first["organic"], second["organic"])
+        self.assertEqual(len(first["organic"]), 10)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["by_class"]["profile"]["hits"], 1)
+
+    def test_hits_are_written_in_batches(self):
+        self.tool.run(search_query="Nvidia company profile")
+        writes = self.cache._db.total_changes
+        for _ in range(3):
+            self.tool.run(search_query="Nvidia company profile")
+        self.assertEqual(self.cache._db.total_changes, writes)
+        self.cache.close()
+
+        reopened = SearchCache(self.path, clock=self.clock)
+        self.assertEqual(reopened._db.execute("SELECT hits FROM results").fetchone()[0], 3)
+        reopened.close()
+
+    def test_request_parameters_are_part_of_the_key(self):
+        self.tool.run(search_query="Nvidia")
+        CachedSerperDevTool(cache=self.cache, backend=self.backend, n_results=3).run(search_query="Nvidia")
+        self.tool.run(search_query="Nvidia", search_type="news")
+        self.assertEqual(self.backend.calls, 3)
+
+    def test_ttl_depends_on_query_class(self):
+        self.tool.run(search_query="Nvidia latest news")
+        self.tool.run(search_query="Nvidia company profile")
+        self.clock.now += 4 * 3600
+        self.tool.run(search_query="Nvidia latest news")
+        self.tool.run(search_query="Nvidia company profile")
+        self.assertEqual(self.backend.calls, 3)
+        self.assertEqual(self.cache.purge_expired(), 0)
+        self.clock.now += 8 * 86400
+        self.assertEqual(self.cache.purge_expired(), 2)
+
+    def test_results_persist_across_instances(self):
+        self.tool.run(search_query="Nvidia Blackwell GPU")
+        reopened = SearchCache(self.path, clock=self.clock)
+        try:
+            CachedSerperDevTool(cache=reopened, backend=self.backend).run(search_query="Nvidia Blackwell GPU")
+            self.assertEqual(self.backend.calls, 1)
+            self.assertEqual(reopened.stats()["hits"], 1)
+        finally:
+            reopened.close()
+
+    def test_concurrent_identical_queries_go_upstream_once(self):
+        self.backend.latency = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.tool.run(search_query="Nvidia earnings")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.cache.stats()["coalesced"], 7)
+
+    def test_errors_are_not_cached(self):
+        calls = []
+
+        def flaky(search_query, search_type, n_results):
+            calls.append(search_query)
+            if len(calls) == 1:
+                raise ConnectionError("upstream unavailable")
+            return self.backend(search_query, search_type, n_results)
+
+        tool = CachedSerperDevTool(cache=self.cache, backend=flaky)
+        with self.assertRaises(ConnectionError):
+            tool.run(search_query="Nvidia")
+        self.assertIn("organic", tool.run(search_query="Nvidia"))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.cache.stats()["errors"], 1)